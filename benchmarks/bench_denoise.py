@@ -0,0 +1,192 @@
+"""
+Benchmark de la reducción de ruido (NoiseSuppressor)
+
+Procesa en streaming, con bloques como los del micrófono, grabaciones WAV (o
+voz sintética con ruido de ventilador, ruido blanco y teclado) y reporta en
+JSON la velocidad respecto al tiempo real en un núcleo, la mejora de SNR (si
+hay referencia limpia), el ruido en las pausas, los bloques de pausa que el
+detector de silencio toma por sonido y el audio que se subiría tras compactar
+silencios (y qué fracción de la voz conserva), con y sin reducción.
+
+Uso:
+    python benchmarks/bench_denoise.py
+    python benchmarks/bench_denoise.py --wav-dir grabaciones/ --out denoise.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+# Un solo núcleo para NumPy/BLAS (la captura procesa en un hilo)
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from bench_pipeline import git_revision, load_wav
+from core.audio import NoiseSuppressor, compact_speech, float_to_pcm16, speech_regions
+
+BLOCK_SIZE = 4096           # Bloque de sd.InputStream en AudioCapture
+SILENCE_THRESHOLD = 0.08    # Umbral RMS de silencio por defecto de AudioCapture
+
+
+def synthetic_speech(seconds: float, sample_rate: int, rng: np.random.Generator) -> tuple:
+    """Frases sintéticas (vocales con formantes y entonación) separadas por pausas
+
+    Returns:
+        Tupla (señal, máscara de voz)
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    speech = np.zeros_like(t)
+    mask = np.zeros(len(t), dtype=bool)
+    position = 0.5
+    while position < seconds - 1.0:
+        length = rng.uniform(0.8, 2.5)
+        region = (t >= position) & (t < position + length)
+        local = t[region] - position
+        pitch = rng.uniform(110, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(2, 5) * local))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voice = sum(np.sin(k * phase) / k * np.exp(-((k * pitch - formant) / 300) ** 2)
+                    for k in range(1, 25) for formant in (rng.uniform(500, 800), rng.uniform(1200, 2200)))
+        speech[region] = 0.3 * voice / np.max(np.abs(voice)) * np.sin(np.pi * local / length)
+        mask[region] = True
+        position += length + rng.uniform(0.6, 2.0)
+    return speech.astype(np.float32), mask
+
+
+def synthetic_noise(kind: str, samples: int, sample_rate: int, rng: np.random.Generator) -> np.ndarray:
+    t = np.arange(samples) / sample_rate
+    if kind == "blanco":
+        return (0.03 * rng.standard_normal(samples)).astype(np.float32)
+    if kind == "ventilador":
+        hum = sum(0.01 / k * np.sin(2 * np.pi * 100 * k * t + rng.uniform(0, 6.28)) for k in range(1, 6))
+        rumble = np.cumsum(rng.standard_normal(samples))
+        rumble = 0.02 * (rumble - np.convolve(rumble, np.ones(400) / 400, mode="same")) / 20
+        return (hum + rumble + 0.01 * rng.standard_normal(samples)).astype(np.float32)
+    if kind == "teclado":
+        noise = 0.005 * rng.standard_normal(samples)
+        for click in rng.uniform(0, samples / sample_rate, int(samples / sample_rate * 6)):
+            start = int(click * sample_rate)
+            burst = rng.standard_normal(min(160, samples - start)) * np.exp(-np.arange(min(160, samples - start)) / 30)
+            noise[start:start + len(burst)] += 0.25 * burst
+        return noise.astype(np.float32)
+    raise ValueError(f"Ruido desconocido: {kind}")
+
+
+def stream(suppressor: NoiseSuppressor, signal: np.ndarray) -> tuple:
+    """Procesa por bloques como el callback de audio
+
+    Returns:
+        Tupla (salida alineada con la entrada, segundos de CPU)
+    """
+    started = time.process_time()
+    parts = [suppressor.process(signal[start:start + BLOCK_SIZE]) for start in range(0, len(signal), BLOCK_SIZE)]
+    parts.append(suppressor.flush())
+    cpu = time.process_time() - started
+    output = np.concatenate(parts)[suppressor.latency_samples:suppressor.latency_samples + len(signal)]
+    return output, cpu
+
+
+def loud_pause_blocks(signal: np.ndarray, mask: np.ndarray) -> int:
+    """Bloques sin voz que el detector de silencio RMS tomaría por sonido"""
+    count = 0
+    for start in range(0, len(signal) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        if not mask[start:start + BLOCK_SIZE].any() and np.sqrt(np.mean(signal[start:start + BLOCK_SIZE] ** 2)) \
+                > SILENCE_THRESHOLD:
+            count += 1
+    return count
+
+
+def upload_recall(signal: np.ndarray, sample_rate: int, mask: np.ndarray) -> float:
+    """Fracción de la voz real que conserva la compactación de silencios (el resto no se transcribe)"""
+    kept = np.zeros(len(signal), dtype=bool)
+    for start, end in speech_regions(signal, sample_rate, threshold=None, pad_ms=250.0, min_gap_ms=300.0):
+        kept[start:end] = True
+    return float(kept[mask].mean())
+
+
+def snr_db(reference: np.ndarray, signal: np.ndarray) -> float:
+    return float(10 * np.log10(np.sum(reference ** 2) / max(np.sum((signal - reference) ** 2), 1e-12)))
+
+
+def measure(name: str, noisy: np.ndarray, sample_rate: int, clean=None, mask=None, repeat: int = 3) -> dict:
+    best_cpu = float("inf")
+    for _ in range(repeat):
+        output, cpu = stream(NoiseSuppressor(sample_rate), noisy)
+        best_cpu = min(best_cpu, cpu)
+    seconds = len(noisy) / sample_rate
+    raw_upload, _ = compact_speech(float_to_pcm16(noisy), sample_rate)
+    clean_upload, _ = compact_speech(float_to_pcm16(output), sample_rate)
+    result = {
+        "name": name,
+        "seconds": round(seconds, 2),
+        "cpu_s": round(best_cpu, 4),
+        "realtime_factor": round(seconds / best_cpu, 1) if best_cpu else 0.0,
+        "upload_kb_raw": len(raw_upload) // 1024,
+        "upload_kb_denoised": len(clean_upload) // 1024,
+    }
+    if clean is not None:
+        pause = ~mask
+        result.update({
+            "snr_in_db": round(snr_db(clean, noisy), 2),
+            "snr_out_db": round(snr_db(clean, output), 2),
+            "pause_rms_in": round(float(np.sqrt(np.mean(noisy[pause] ** 2))), 5),
+            "pause_rms_out": round(float(np.sqrt(np.mean(output[pause] ** 2))), 5),
+            "loud_pause_blocks_in": loud_pause_blocks(noisy, mask),
+            "loud_pause_blocks_out": loud_pause_blocks(output, mask),
+            "upload_speech_recall_raw": round(upload_recall(noisy, sample_rate, mask), 3),
+            "upload_speech_recall_denoised": round(upload_recall(output, sample_rate, mask), 3),
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la reducción de ruido")
+    parser.add_argument("--wav-dir", help="Carpeta con grabaciones .wav (por defecto, audio sintético)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Duración del audio sintético")
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones (se toma la más rápida)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    cases = []
+    if args.wav_dir:
+        for path in sorted(Path(args.wav_dir).glob("*.wav")):
+            pcm, rate = load_wav(path)
+            cases.append(measure(path.name, np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0,
+                                 rate, repeat=args.repeat))
+    else:
+        rng = np.random.default_rng(args.seed)
+        speech, mask = synthetic_speech(args.seconds, args.sample_rate, rng)
+        for kind in ("blanco", "ventilador", "teclado"):
+            noisy = speech + synthetic_noise(kind, len(speech), args.sample_rate, rng)
+            cases.append(measure(kind, noisy, args.sample_rate, clean=speech, mask=mask, repeat=args.repeat))
+            print(f"⏱️ {kind}: {cases[-1]['realtime_factor']}x tiempo real", file=sys.stderr)
+
+    output = json.dumps({
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "out"},
+        "cases": cases,
+    }, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(output, encoding="utf-8")
+        print(f"✅ Resultados en {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
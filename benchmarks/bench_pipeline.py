@@ -0,0 +1,247 @@
+"""
+Benchmark del pipeline de reuniones (transcripción + análisis) contra Gemini simulado
+
+Ejecuta el código real de `AudioTranscriber` y `AIBrain` con grabaciones WAV
+(o audio sintético reproducible) y reporta, por modo de pipeline, rendimiento,
+percentiles de latencia de extremo a extremo, pico de memoria y tiempo de CPU
+en JSON, para comparar versiones.
+
+Uso:
+    python benchmarks/bench_pipeline.py --wav-dir grabaciones/ --out resultado.json
+    python benchmarks/bench_pipeline.py --time-scale 0 --compare base.json
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Agregar src al path
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from fake_gemini import FakeGemini, install
+from core.ai_brain import AIBrain
+from core.metrics import usage_metrics
+from core.tracing import tracer
+from core.transcriber import AudioTranscriber
+
+PIPELINE_MODES = ("transcripcion", "transcripcion_sin_compactar", "analisis", "completo")
+
+# Métricas comparadas con --compare (mayor = peor)
+COMPARED_METRICS = ("latency_p50_s", "latency_p95_s", "cpu_s_per_item", "memory_peak_kb")
+
+
+def load_wav(path: Path) -> tuple:
+    """PCM 16-bit mono de un WAV (mezcla los canales si es estéreo)
+
+    Returns:
+        Tupla (pcm16_bytes, sample_rate)
+    """
+    with wave.open(str(path), "rb") as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError(f"{path.name}: solo se admite PCM de 16 bits")
+        channels = wav_file.getnchannels()
+        rate = wav_file.getframerate()
+        frames = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+    if channels > 1:
+        frames = frames.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return frames.tobytes(), rate
+
+
+def synthetic_recording(seconds: float, sample_rate: int = 16000, seed: int = 0) -> bytes:
+    """Audio reproducible con ráfagas de "voz" (tonos modulados + ruido) y pausas"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    audio = rng.normal(0, 0.003, n)  # Ruido de fondo
+
+    position = 0.0
+    while position < seconds:
+        talk = rng.uniform(1.5, 6.0)
+        start, end = int(position * sample_rate), int(min(seconds, position + talk) * sample_rate)
+        pitch = rng.uniform(110, 240)
+        syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t[start:end])
+        audio[start:end] += 0.2 * syllables * (np.sin(2 * np.pi * pitch * t[start:end])
+                                               + 0.4 * np.sin(2 * np.pi * 2 * pitch * t[start:end]))
+        position += talk + rng.uniform(0.3, 2.5)
+
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def load_recordings(args) -> list:
+    """Lista de (nombre, pcm16_bytes, sample_rate)"""
+    if args.wav_dir:
+        paths = sorted(Path(args.wav_dir).glob("*.wav"))
+        if not paths:
+            raise SystemExit(f"❌ No hay archivos .wav en {args.wav_dir}")
+        return [(path.name, *load_wav(path)) for path in paths]
+    return [(f"sintetico_{i:02d}", synthetic_recording(args.synthetic_seconds, seed=args.seed + i), 16000)
+            for i in range(args.synthetic_count)]
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run_item(mode: str, recording: tuple, transcriber: AudioTranscriber, brain: AIBrain) -> tuple:
+    """Procesa una grabación; devuelve (latencia, ok)"""
+    _, pcm, rate = recording
+    start = time.perf_counter()
+    if mode == "analisis":
+        # Texto de tamaño realista para la duración (~2.5 palabras/s)
+        words = max(10, int(len(pcm) / 2 / rate * 2.5))
+        result = brain.analyze(" ".join(["palabra"] * words), mode="negocios")
+    else:
+        result = transcriber.transcribe_audio(pcm, sample_rate=rate)
+        if mode == "completo" and not result.startswith(("❌", "⚠️")):
+            result = brain.analyze(result, mode="negocios")
+    return time.perf_counter() - start, not result.startswith(("❌", "⚠️"))
+
+
+def run_mode(mode: str, recordings: list, args) -> dict:
+    """Ejecuta un modo del pipeline sobre todas las grabaciones (con repeticiones)"""
+    fake = FakeGemini(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                      error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                      rpm_limit=args.rpm_limit, time_scale=args.time_scale, seed=args.seed)
+    install(fake)
+    transcriber = AudioTranscriber(api_key="benchmark", compact_silence=mode != "transcripcion_sin_compactar")
+    brain = AIBrain(api_key="benchmark")
+    items = [recording for _ in range(args.repeat) for recording in recordings]
+
+    tracer.histograms.clear()
+    usage_before = usage_metrics.snapshot()["session"]
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda rec: run_item(mode, rec, transcriber, brain), items))
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    _, memory_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    usage_after = usage_metrics.snapshot()["session"]
+
+    latencies = [latency for latency, _ in results]
+    audio_seconds = sum(len(pcm) / 2 / rate for _, pcm, rate in items)
+    return {
+        "items": len(items),
+        "ok": sum(1 for _, ok in results if ok),
+        "wall_s": round(wall, 4),
+        "throughput_items_s": round(len(items) / wall, 3) if wall else 0.0,
+        "audio_s_per_wall_s": round(audio_seconds / wall, 2) if wall and mode != "analisis" else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 4),
+        "latency_p95_s": round(percentile(latencies, 95), 4),
+        "latency_p99_s": round(percentile(latencies, 99), 4),
+        "latency_mean_s": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "cpu_s": round(cpu, 4),
+        "cpu_s_per_item": round(cpu / len(items), 5) if items else 0.0,
+        "memory_peak_kb": memory_peak // 1024,
+        "fake_server": dict(fake.stats),
+        "tokens": {key: round(usage_after[key] - usage_before[key], 2)
+                   for key in ("requests", "input_tokens", "output_tokens", "audio_seconds")},
+        "stages": {name: {key: round(value, 5) if isinstance(value, float) else value
+                          for key, value in stats.items()}
+                   for name, stats in tracer.summary().items()},
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(current: dict, baseline_path: Path, tolerance: float) -> list:
+    """Regresiones respecto a un resultado anterior (métricas que empeoran más que `tolerance`)"""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = []
+    print(f"\n{'Modo':<30} {'Métrica':<16} {'Base':>10} {'Actual':>10} {'Cambio':>8}")
+    for mode, result in current["modes"].items():
+        before = baseline.get("modes", {}).get(mode)
+        if not before:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric, 0), result.get(metric, 0)
+            change = (new - old) / old if old else 0.0
+            flag = " ⚠️" if change > tolerance else ""
+            print(f"{mode:<30} {metric:<16} {old:>10} {new:>10} {change:>+8.1%}{flag}")
+            if flag:
+                regressions.append(f"{mode}.{metric}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline contra Gemini simulado")
+    parser.add_argument("--wav-dir", help="Carpeta con grabaciones .wav (por defecto, audio sintético)")
+    parser.add_argument("--synthetic-count", type=int, default=6, help="Grabaciones sintéticas")
+    parser.add_argument("--synthetic-seconds", type=float, default=60.0, help="Duración de cada grabación sintética")
+    parser.add_argument("--modes", default=",".join(PIPELINE_MODES), help="Modos separados por coma")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por grabación")
+    parser.add_argument("--workers", type=int, default=1, help="Peticiones concurrentes")
+    parser.add_argument("--latency", default="lognormal:0.35,0.4", help="Distribución hasta el primer byte")
+    parser.add_argument("--tokens-per-second", type=float, default=150.0, help="Velocidad de generación")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probabilidad de 429")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Peticiones/min antes de 429 (0 = sin límite)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplicador de esperas (0 = solo CPU)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="Archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Empeoramiento tolerado al comparar")
+    args = parser.parse_args()
+
+    tracer.configure(True)
+    recordings = load_recordings(args)
+    result = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "recordings": [{"name": name, "seconds": round(len(pcm) / 2 / rate, 2)} for name, pcm, rate in recordings],
+        "modes": {},
+    }
+
+    for mode in args.modes.split(","):
+        if mode not in PIPELINE_MODES:
+            raise SystemExit(f"❌ Modo desconocido: {mode} (opciones: {', '.join(PIPELINE_MODES)})")
+        print(f"⏱️ {mode}...", file=sys.stderr)
+        # Los mensajes de la app van a stderr para no mezclarse con el JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result["modes"][mode] = run_mode(mode, recordings, args)
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(output, encoding="utf-8")
+        print(f"✅ Resultados en {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        regressions = compare(result, Path(args.compare), args.tolerance)
+        if regressions:
+            print(f"\n❌ Regresiones: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Gemini simulado para benchmarks
+Sustituye al módulo `google.generativeai` dentro de `core.ai_brain` y
+`core.transcriber`, de modo que se ejecuta el código real de la app sin red
+ni cuota
+
+Latencia configurable (constante, normal, lognormal o uniforme), respuestas
+en streaming, errores y 429 inyectados y límite de peticiones por minuto.
+Todo es determinista a partir de la semilla.
+"""
+
+import base64
+import io
+import random
+import threading
+import time
+import wave
+from typing import Optional
+
+AUDIO_TOKENS_PER_SECOND = 32
+CHARS_PER_TOKEN = 4
+
+# Texto de relleno para transcripciones y análisis simulados
+FILLER_WORDS = (
+    "cliente propuesta precio entrega equipo objetivo trimestre presupuesto "
+    "reunión seguimiento contrato riesgo plazo acuerdo producto demo soporte"
+).split()
+
+
+class ResourceExhausted(Exception):
+    """Equivalente a google.api_core.exceptions.ResourceExhausted (HTTP 429)"""
+    code = 429
+
+
+class ServiceUnavailable(Exception):
+    """Equivalente a google.api_core.exceptions.ServiceUnavailable (HTTP 503)"""
+    code = 503
+
+
+class LatencyModel:
+    """Distribución de latencia a partir de una especificación de texto
+
+    Formatos: "const:0.3", "normal:media,desv", "lognormal:mediana,sigma",
+    "uniform:min,max" (segundos)
+    """
+
+    def __init__(self, spec: str = "const:0.0"):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+        if kind not in ("const", "normal", "lognormal", "uniform"):
+            raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "const":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "normal":
+            mean, std = self.params
+            return max(0.0, rng.gauss(mean, std))
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0.0, sigma)
+        low, high = self.params
+        return rng.uniform(low, high)
+
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """Respuesta completa (o trozo de streaming) con `.text` y `.usage_metadata`"""
+
+    def __init__(self, text: str, usage_metadata: Optional[UsageMetadata] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeStreamResponse:
+    """Respuesta en streaming: se itera por trozos; `.text` queda completo al terminar"""
+
+    def __init__(self, chunks: list, delays: list, usage_metadata: UsageMetadata, time_scale: float):
+        self._chunks = chunks
+        self._delays = delays
+        self._time_scale = time_scale
+        self.usage_metadata = usage_metadata
+        self.text = ""
+
+    def __iter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            time.sleep(delay * self._time_scale)
+            self.text += chunk
+            yield FakeResponse(chunk)
+
+    def resolve(self):
+        for _ in self:
+            pass
+
+
+class FakeGemini:
+    """Sustituto del módulo `google.generativeai` (configure + GenerativeModel)"""
+
+    def __init__(self, latency: str = "lognormal:0.35,0.4", tokens_per_second: float = 150.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, rpm_limit: int = 0,
+                 time_scale: float = 1.0, seed: int = 1234):
+        """
+        Args:
+            latency: Distribución del tiempo hasta el primer byte (ver LatencyModel)
+            tokens_per_second: Velocidad de generación de la respuesta
+            error_rate: Probabilidad de un 503 por petición
+            rate_limit_rate: Probabilidad de un 429 por petición
+            rpm_limit: Peticiones por minuto antes de responder 429 (0 = sin límite)
+            time_scale: Multiplicador de todas las esperas (0 = solo CPU)
+            seed: Semilla para que las ejecuciones sean reproducibles
+        """
+        self.latency = LatencyModel(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm_limit = rpm_limit
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+        self._request_times = []
+        self._lock = threading.Lock()
+        self.api_key = None
+
+        fake = self
+
+        class GenerativeModel:
+            def __init__(self, model_name: str = "gemini-2.0-flash", **kwargs):
+                self.model_name = model_name
+                self.kwargs = kwargs
+
+            def generate_content(self, contents, stream: bool = False, **kwargs):
+                # La system_instruction también cuenta como tokens de entrada
+                if self.kwargs.get("system_instruction"):
+                    contents = [self.kwargs["system_instruction"]] + (contents if isinstance(contents, list) else [contents])
+                return fake.generate_content(contents, stream=stream)
+
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, api_key: str = None, **kwargs):
+        self.api_key = api_key
+
+    # --- Simulación de una petición ---
+
+    def generate_content(self, contents, stream: bool = False):
+        prompt_tokens, audio_seconds = self._measure_input(contents)
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            self._request_times = [t for t in self._request_times if now - t < 60] + [now]
+            over_rpm = self.rpm_limit and len(self._request_times) > self.rpm_limit
+            roll = self.rng.random()
+            first_byte = self.latency.sample(self.rng)
+
+        time.sleep(first_byte * self.time_scale)
+        if over_rpm or roll < self.rate_limit_rate:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise ServiceUnavailable("503 The service is currently unavailable.")
+
+        text = self._response_text(audio_seconds)
+        usage = UsageMetadata(prompt_tokens, max(1, len(text) // CHARS_PER_TOKEN))
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + 8]) + " " for i in range(0, len(words), 8)]
+        delays = [len(chunk) / CHARS_PER_TOKEN / self.tokens_per_second for chunk in chunks]
+
+        if stream:
+            delays[0] = 0.0
+            return FakeStreamResponse(chunks, delays, usage, self.time_scale)
+        time.sleep(sum(delays) * self.time_scale)
+        return FakeResponse(text, usage)
+
+    def _measure_input(self, contents) -> tuple:
+        """Tokens del prompt y segundos de audio enviados"""
+        parts = contents if isinstance(contents, list) else [contents]
+        tokens = 0
+        audio_seconds = 0.0
+        for part in parts:
+            if isinstance(part, dict) and "data" in part:
+                data = part["data"]
+                raw = base64.b64decode(data) if isinstance(data, str) else data
+                with wave.open(io.BytesIO(raw), "rb") as wav_file:
+                    seconds = wav_file.getnframes() / wav_file.getframerate()
+                audio_seconds += seconds
+                tokens += int(seconds * AUDIO_TOKENS_PER_SECOND)
+            else:
+                tokens += len(str(part)) // CHARS_PER_TOKEN
+        return tokens, audio_seconds
+
+    def _response_text(self, audio_seconds: float) -> str:
+        if audio_seconds:
+            # ~2.5 palabras por segundo de voz
+            count = max(4, int(audio_seconds * 2.5))
+        else:
+            count = 110  # Análisis de ~150 palabras como piden los prompts
+        with self._lock:
+            return " ".join(self.rng.choice(FILLER_WORDS) for _ in range(count))
+
+
+def install(fake: FakeGemini):
+    """Conecta el Gemini simulado a los módulos de la app (sin tocar el paquete real)"""
+    import core.ai_brain
+    import core.transcriber
+    for module in (core.ai_brain, core.transcriber):
+        module.genai = fake
+        module.GENAI_AVAILABLE = True
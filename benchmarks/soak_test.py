@@ -0,0 +1,256 @@
+"""
+Prueba de resistencia de memoria (soak test)
+Simula sesiones largas con ciclos grabar/detener/transcribir/analizar/guardar,
+sin micrófono ni red, y falla si la memoria crece por ciclo más de un umbral
+
+El micrófono se sustituye por un stream que entrega audio sintético al callback
+real de `AudioCapture`, y Gemini por `fake_gemini`. Con --gui se maneja la
+`MainWindow` real (Qt offscreen) sobre una carpeta de datos temporal.
+
+Uso:
+    python benchmarks/soak_test.py --cycles 200 --cycle-seconds 60
+    python benchmarks/soak_test.py --gui --cycles 100 --max-growth-kb 32 --out soak.json
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Agregar src al path
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+import core.audio
+from bench_pipeline import synthetic_recording
+from fake_gemini import FakeGemini, install
+from core.memdebug import rss_kb
+
+BLOCK_SIZE = 4096
+
+
+class FakeInputStream:
+    """Sustituto de `sounddevice.InputStream`: el harness empuja el audio con `feed()`"""
+
+    instances = []
+
+    def __init__(self, channels: int = 1, samplerate: int = 16000, callback=None, blocksize: int = BLOCK_SIZE, **kwargs):
+        self.channels = channels
+        self.samplerate = samplerate
+        self.callback = callback
+        self.blocksize = blocksize
+        self.active = False
+        FakeInputStream.instances.append(self)
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.callback = None
+        FakeInputStream.instances.remove(self)
+
+    def feed(self, samples: "np.ndarray"):
+        """Entrega el audio al callback en bloques, como el driver"""
+        for start in range(0, len(samples) - self.blocksize + 1, self.blocksize):
+            if not self.active:
+                return
+            block = samples[start:start + self.blocksize].reshape(-1, 1)
+            self.callback(block, self.blocksize, None, None)
+
+
+class FakeSoundDevice:
+    InputStream = FakeInputStream
+
+    @staticmethod
+    def query_devices():
+        return [{"name": "Micrófono simulado", "max_input_channels": 1}]
+
+
+def install_fake_microphone():
+    core.audio.sd = FakeSoundDevice
+    core.audio.AUDIO_AVAILABLE = True
+
+
+def current_stream():
+    return FakeInputStream.instances[-1] if FakeInputStream.instances else None
+
+
+class CoreSession:
+    """Ciclo completo sin UI: captura -> transcripción -> análisis -> historial -> índice"""
+
+    def __init__(self, data_dir: Path, archive: bool):
+        from core.ai_brain import AIBrain
+        from core.audio import AudioCapture
+        from core.audio_archive import AudioArchive
+        from core.history_store import HistoryStore
+        from core.retrieval import MeetingIndex
+        from core.transcriber import AudioTranscriber
+
+        self.capture = AudioCapture()
+        self.transcriber = AudioTranscriber(api_key="soak")
+        self.brain = AIBrain(api_key="soak")
+        self.store = HistoryStore(data_dir / "history.db")
+        self.index = MeetingIndex(self.store, cache_path=data_dir / "history_index.npz")
+        self.index.build()
+        self.archive = AudioArchive(data_dir / "audio_archive") if archive else None
+
+    def cycle(self, audio: "np.ndarray"):
+        self.capture.start_recording(on_silence=lambda: None, on_level=lambda: None)
+        current_stream().feed(audio)
+        self.capture.take_levels()
+        audio_bytes = self.capture.stop_recording()
+        transcript = self.transcriber.transcribe_audio(audio_bytes)
+        context = "\n".join(result["texto"] for result in self.index.search(transcript, k=3))
+        analysis = self.brain.analyze(transcript, context=context)
+        meeting_id = self.store.add("Soak", "NEGOCIOS", analysis, transcript)
+        self.index.add_meeting(meeting_id, transcript)
+        if self.archive:
+            self.archive.save(meeting_id, audio_bytes)
+
+    def close(self):
+        self.store.close()
+
+
+class GuiSession:
+    """Ciclo completo a través de la MainWindow real (Qt offscreen)"""
+
+    def __init__(self, data_dir: Path, archive: bool):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+        import ui.main_window
+        from ui.main_window import MainWindow, TAB_HISTORY
+
+        (data_dir / "config.json").write_text(json.dumps({
+            "api_key": "soak", "modo": "negocios",
+            "contexto_historial": True, "archivar_audio": archive,
+        }), encoding="utf-8")
+        ui.main_window.show_message = lambda *args, **kwargs: None  # Sin diálogos modales
+
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.window = MainWindow(data_dir=data_dir)
+        self.window._history_ready.wait()
+        self.window._ensure_tab(TAB_HISTORY)
+        self.app.processEvents()
+
+    def cycle(self, audio: "np.ndarray"):
+        window = self.window
+        window._on_start_recording()
+        current_stream().feed(audio)
+        self.app.processEvents()
+        window._on_stop_and_analyze()
+        # Recorrer el historial como lo haría el usuario (paginación y búsqueda)
+        scrollbar = window.history_table.verticalScrollBar()
+        window._on_history_scroll(scrollbar.maximum())
+        window.history_search.setText("cliente")
+        window._on_history_search()
+        window.history_search.setText("")
+        window._load_history_table()
+        self._run_event_loop()
+    
+    def _run_event_loop(self):
+        """Una vuelta del event loop, incluidos los deleteLater de las filas reemplazadas"""
+        from PyQt6.QtCore import QCoreApplication, QEvent
+        self.app.processEvents()
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    def close(self):
+        self.window.close()
+        self.app.processEvents()
+
+
+def slope(xs: list, ys: list) -> float:
+    """Pendiente por mínimos cuadrados (crecimiento por ciclo)"""
+    if len(xs) < 2:
+        return 0.0
+    return float(np.polyfit(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float), 1)[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria")
+    parser.add_argument("--cycles", type=int, default=60, help="Ciclos grabar/detener")
+    parser.add_argument("--cycle-seconds", type=float, default=60.0, help="Audio simulado por ciclo")
+    parser.add_argument("--warmup", type=int, default=5, help="Ciclos iniciales excluidos de la medición")
+    parser.add_argument("--snapshot-every", type=int, default=5, help="Ciclos entre mediciones")
+    parser.add_argument("--max-growth-kb", type=float, default=32.0, help="Crecimiento máximo por ciclo (KB)")
+    parser.add_argument("--gui", action="store_true", help="Manejar la MainWindow real (Qt offscreen)")
+    parser.add_argument("--archive", action="store_true", help="Archivar el audio de cada ciclo")
+    parser.add_argument("--top", type=int, default=10, help="Asignadores a mostrar al final")
+    parser.add_argument("--out", help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    install_fake_microphone()
+    install(FakeGemini(time_scale=0.0))
+    audio = np.frombuffer(synthetic_recording(args.cycle_seconds), dtype=np.int16).astype(np.float32) / 32768.0
+
+    # Los mensajes de la app van a stderr para no mezclarse con el JSON
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(sys.stderr):
+        session = (GuiSession if args.gui else CoreSession)(Path(tmp), args.archive)
+        tracemalloc.start(10)
+        samples = []
+        baseline = None
+        started = time.perf_counter()
+
+        for cycle in range(1, args.cycles + 1):
+            session.cycle(audio)
+            if cycle < args.warmup or cycle % args.snapshot_every:
+                continue
+            gc.collect()
+            traced, _ = tracemalloc.get_traced_memory()
+            samples.append({"cycle": cycle, "traced_kb": traced // 1024, "rss_kb": rss_kb()})
+            print(f"🔁 Ciclo {cycle}: Python {traced // 1024} KB | RSS {samples[-1]['rss_kb'] // 1024} MB",
+                  file=sys.stderr)
+            if baseline is None:
+                baseline = tracemalloc.take_snapshot()
+
+        final = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        session.close()
+
+    cycles = [sample["cycle"] for sample in samples]
+    traced_growth = slope(cycles, [sample["traced_kb"] for sample in samples])
+    rss_growth = slope(cycles, [sample["rss_kb"] for sample in samples if sample["rss_kb"]]) \
+        if all(sample["rss_kb"] for sample in samples) else 0.0
+    top = [str(stat) for stat in final.compare_to(baseline, "lineno")[:args.top]] if baseline else []
+    result = {
+        "mode": "gui" if args.gui else "core",
+        "cycles": args.cycles,
+        "cycle_seconds": args.cycle_seconds,
+        "simulated_hours": round(args.cycles * args.cycle_seconds / 3600, 2),
+        "wall_s": round(time.perf_counter() - started, 2),
+        "growth_kb_per_cycle": round(traced_growth, 2),
+        "rss_growth_kb_per_cycle": round(rss_growth, 2),
+        "max_growth_kb": args.max_growth_kb,
+        "passed": traced_growth <= args.max_growth_kb,
+        "samples": samples,
+        "top_growth": top,
+    }
+
+    print("\nMayor crecimiento desde el primer muestreo:", file=sys.stderr)
+    for line in top:
+        print(f"  {line}", file=sys.stderr)
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    if not result["passed"]:
+        print(f"❌ La memoria crece {traced_growth:.1f} KB por ciclo (máximo {args.max_growth_kb})", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Crecimiento {traced_growth:.1f} KB por ciclo", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+AI_FERRXOS - Modo por lotes (sin interfaz)
+Transcribe y analiza una carpeta de grabaciones en paralelo y guarda los
+resultados en el historial
+
+Uso:
+    python src/main.py batch grabaciones/ --mode negocios
+    python src/main.py batch "grabaciones/**/*.wav" --workers 3 --rpm 15
+    python src/main.py export historial.jsonl --mode negocios --from 2026-01-01
+    python src/main.py import historial.jsonl
+
+Es reanudable: las grabaciones ya procesadas quedan anotadas en un diario
+(.ferrxos_batch.jsonl) y se omiten al volver a ejecutar.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import as_completed
+from datetime import datetime
+from pathlib import Path
+
+# Agregar src al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.crypto import PURPOSE_CONFIG, PURPOSE_HISTORY, cipher_for, open_config
+from core.history_io import EXPORT_FORMATS, export_to_file, import_file
+from core.history_store import HistoryStore
+from core.pipeline import MeetingPipeline, RateLimiter, DEFAULT_REQUESTS_PER_MINUTE
+
+SRC_DIR = Path(__file__).parent
+AUDIO_EXTENSIONS = (".wav",)
+MODES = ("negocios", "entrevista", "presentacion", "custom")
+
+
+def find_recordings(sources: list) -> list:
+    """Archivos de audio de una lista de carpetas, archivos o patrones glob"""
+    found = []
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            found.extend(p for p in path.rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS)
+        elif path.is_file():
+            found.append(path)
+        else:
+            found.extend(Path(p) for p in glob.glob(source, recursive=True)
+                         if Path(p).suffix.lower() in AUDIO_EXTENSIONS)
+    # Sin duplicados, en orden estable
+    return sorted({p.resolve() for p in found})
+
+
+def load_recording(path: Path) -> tuple:
+    """PCM 16-bit mono de un WAV (mezcla los canales si es estéreo)
+
+    Returns:
+        Tupla (pcm16_bytes, sample_rate)
+    """
+    with wave.open(str(path), "rb") as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError("solo se admite WAV PCM de 16 bits")
+        channels = wav_file.getnchannels()
+        rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+    if channels > 1:
+        import numpy as np
+        pcm = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels)
+        frames = pcm.mean(axis=1).astype(np.int16).tobytes()
+    return frames, rate
+
+
+def recording_key(path: Path) -> str:
+    """Identidad de una grabación para reanudar (ruta + tamaño + fecha de modificación)"""
+    stat = path.stat()
+    return hashlib.sha1(f"{path}|{stat.st_size}|{int(stat.st_mtime)}".encode("utf-8")).hexdigest()
+
+
+class BatchJournal:
+    """Diario de grabaciones terminadas (JSONL, una línea por grabación)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Línea cortada por una interrupción
+                    self.done[entry["key"]] = entry
+
+    def record(self, entry: dict):
+        with self._lock:
+            self.done[entry["key"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def load_api_key(explicit: str = None) -> str:
+    """API Key: argumento, variable GEMINI_API_KEY o config.json de la app"""
+    if explicit:
+        return explicit
+    if os.environ.get("GEMINI_API_KEY"):
+        return os.environ["GEMINI_API_KEY"]
+    config_path = SRC_DIR / "config.json"
+    if config_path.exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        try:
+            return open_config(config, cipher_for(SRC_DIR, PURPOSE_CONFIG)).get("api_key", "")
+        except ValueError as e:
+            print(f"❌ No se pudo descifrar config.json: {e}")
+    return ""
+
+
+def process_file(pipeline: MeetingPipeline, path: Path, mode: str, custom_prompt: str) -> dict:
+    audio_bytes, sample_rate = load_recording(path)
+    fecha = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    return pipeline.process(audio_bytes, sample_rate, mode=mode, custom_prompt=custom_prompt,
+                            titulo=f"Lote - {path.stem}", fecha=fecha)
+
+
+def run_batch(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Procesa grabaciones sin interfaz")
+    parser.add_argument("sources", nargs="+", help="Carpetas, archivos .wav o patrones glob")
+    parser.add_argument("--mode", default="negocios", choices=MODES, help="Modo del análisis")
+    parser.add_argument("--prompt", default="", help="Prompt propio (modo custom)")
+    parser.add_argument("--workers", type=int, default=2, help="Grabaciones en paralelo")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_REQUESTS_PER_MINUTE, help="Peticiones por minuto")
+    parser.add_argument("--chunk-seconds", type=float, default=300.0, help="Duración máxima de cada tramo")
+    parser.add_argument("--speakers", action="store_true", help="Etiquetar hablantes (detección local)")
+    parser.add_argument("--db", default=str(SRC_DIR / "history.db"), help="Base del historial")
+    parser.add_argument("--journal", help="Diario para reanudar (por defecto, junto a la base)")
+    parser.add_argument("--api-key", help="API Key de Gemini (por defecto, GEMINI_API_KEY o config.json)")
+    args = parser.parse_args(argv)
+
+    api_key = load_api_key(args.api_key)
+    if not api_key:
+        print("❌ Falta la API Key (--api-key, GEMINI_API_KEY o config.json)")
+        return 2
+
+    recordings = find_recordings(args.sources)
+    journal = BatchJournal(Path(args.journal) if args.journal else Path(args.db).with_name(".ferrxos_batch.jsonl"))
+    pending = [path for path in recordings if recording_key(path) not in journal.done]
+    print(f"📂 {len(recordings)} grabaciones ({len(recordings) - len(pending)} ya procesadas, {len(pending)} pendientes)")
+    if not pending:
+        return 0
+
+    store = open_store(args.db)
+    pipeline = MeetingPipeline(api_key, history_store=store, rate_limiter=RateLimiter(args.rpm),
+                               workers=args.workers, chunk_seconds=args.chunk_seconds, speaker_turns=args.speakers)
+    started = time.perf_counter()
+    audio_seconds = 0.0
+    processed = failed = 0
+
+    futures = {pipeline.submit(process_file, pipeline, path, args.mode, args.prompt): path for path in pending}
+    try:
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": f"❌ {e}", "meeting_id": None, "audio_seconds": 0.0}
+
+            if result["error"]:
+                failed += 1
+                print(f"❌ {path.name}: {result['error']}")
+                continue
+
+            processed += 1
+            audio_seconds += result["audio_seconds"]
+            journal.record({"key": recording_key(path), "path": str(path),
+                            "meeting_id": result["meeting_id"], "uso": result["uso"]})
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            print(f"✅ {path.name} -> reunión {result['meeting_id']} | "
+                  f"{processed + failed}/{len(pending)} | "
+                  f"{processed / elapsed * 60:.1f} archivos/min | "
+                  f"{audio_seconds / elapsed:.1f} h de audio/h")
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrumpido - vuelve a ejecutar el mismo comando para continuar")
+        pipeline.shutdown(wait=False)
+        store.close()
+        return 130
+
+    pipeline.shutdown()
+    store.close()
+    elapsed = time.perf_counter() - started
+    print(f"🏁 {processed} procesadas, {failed} con error en {elapsed / 60:.1f} min "
+          f"({processed / max(elapsed, 1e-6) * 60:.1f} archivos/min, "
+          f"{audio_seconds / max(elapsed, 1e-6):.1f} h de audio/h)")
+    return 1 if failed else 0
+
+
+def open_store(db: str) -> HistoryStore:
+    """Historial de la línea de comandos (cifrado con la clave de su carpeta)"""
+    return HistoryStore(Path(db), cipher=cipher_for(Path(db).parent, PURPOSE_HISTORY))
+
+
+def run_export(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="main.py export", description="Exporta el historial sin interfaz")
+    parser.add_argument("output", help="Archivo de salida (.jsonl, .csv o .md)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Formato (por defecto, según la extensión)")
+    parser.add_argument("--mode", help="Solo reuniones de este modo")
+    parser.add_argument("--from", dest="desde", help="Desde esta fecha (AAAA-MM-DD)")
+    parser.add_argument("--to", dest="hasta", help="Hasta esta fecha, incluida (AAAA-MM-DD)")
+    parser.add_argument("--db", default=str(SRC_DIR / "history.db"), help="Base del historial")
+    args = parser.parse_args(argv)
+
+    try:
+        store = open_store(args.db)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    try:
+        export_to_file(store, Path(args.output), fmt=args.format, modo=args.mode, desde=args.desde, hasta=args.hasta)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    finally:
+        store.close()
+    return 0
+
+
+def run_import(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="main.py import", description="Importa reuniones al historial")
+    parser.add_argument("sources", nargs="+", help="Archivos .jsonl o .csv exportados")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="Formato (por defecto, según la extensión)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Reuniones por transacción")
+    parser.add_argument("--db", default=str(SRC_DIR / "history.db"), help="Base del historial")
+    args = parser.parse_args(argv)
+
+    try:
+        store = open_store(args.db)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    try:
+        for source in args.sources:
+            import_file(store, Path(source), fmt=args.format, batch_size=args.batch_size)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+    finally:
+        store.close()
+    return 0
+
+
+def main(argv: list = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "export":
+        return run_export(argv[1:])
+    if argv and argv[0] == "import":
+        return run_import(argv[1:])
+    if argv and argv[0] == "batch":
+        argv = argv[1:]
+    return run_batch(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,106 @@ Módulo de IA usando Google Gemini
 Procesamiento de análisis de reuniones
 """
 
+import datetime
+import re
+import threading
+import time
 from typing import Optional
 
+from core.dedup import change_detector
+from core.metrics import estimate_tokens, usage_metrics, usage_from_response
+from core.tracing import tracer
+
 try:
     import google.generativeai as genai
     GENAI_AVAILABLE = True
 except ImportError:
     GENAI_AVAILABLE = False
 
+try:
+    from google.generativeai import caching as genai_caching
+    CACHING_AVAILABLE = GENAI_AVAILABLE
+except ImportError:
+    CACHING_AVAILABLE = False
+
+# Caché de contexto en el servidor (la API exige un modelo con versión fija y un mínimo de tokens)
+CACHE_MODEL = "models/gemini-2.0-flash-001"
+CACHE_MIN_TOKENS = 4096
+CACHE_TTL_SECONDS = 15 * 60
+CACHE_REFRESH_RATIO = 0.5  # Recrear la caché cuando lo no cacheado supera la mitad de lo cacheado
+
+# Intervenciones etiquetadas por el transcribidor ("Hablante 2: ...")
+SPEAKER_TAG = re.compile(r"^Hablante \d+:", re.MULTILINE)
+
+
+class AnalysisContext:
+    """Lo que ya se envió al modelo en una sesión (reunión) con un modo concreto"""
+
+    def __init__(self, session: str, mode: str, system_prompt: str):
+        self.session = session
+        self.mode = mode
+        self.system_prompt = system_prompt
+        self.transcript = ""   # Transcripción ya analizada
+        self.analysis = ""     # Último análisis de la sesión
+        self.cached = None     # CachedContent del servidor (prompt + transcripción hasta cached_chars)
+        self.cached_chars = 0
+        self.remote_failed = False
+        self.expires = 0.0
+
+
+class ContextCache:
+    """Contexto reutilizable entre análisis de una misma reunión
+
+    Compartido por todos los `AIBrain` del proceso (los hilos del pipeline
+    analizan la misma sesión con clientes distintos). Una entrada vale para una
+    sesión y un modo/prompt: si cambian, o vence el TTL, se invalida.
+    """
+
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.stats = {"full": 0, "incremental": 0, "remote": 0, "saved_tokens": 0}
+        self._lock = threading.Lock()
+
+    def get(self, session: str, mode: str, system_prompt: str) -> AnalysisContext:
+        """Contexto de la sesión (uno nuevo si no había o ya no es válido)"""
+        with self._lock:
+            entry = self.entries.get(session)
+            if entry and (entry.mode != mode or entry.system_prompt != system_prompt or time.time() > entry.expires):
+                self.release_remote(entry)
+                entry = None
+            if entry is None:
+                entry = self.entries[session] = AnalysisContext(session, mode, system_prompt)
+            entry.expires = time.time() + self.ttl_seconds
+            return entry
+
+    def invalidate(self, session: str):
+        """Olvida el contexto de una sesión terminada (y borra su caché del servidor)"""
+        with self._lock:
+            entry = self.entries.pop(session, None)
+        if entry:
+            self.release_remote(entry)
+
+    def count(self, kind: str, saved_tokens: int = 0):
+        with self._lock:
+            self.stats[kind] += 1
+            self.stats["saved_tokens"] += saved_tokens
+
+    @staticmethod
+    def release_remote(entry: AnalysisContext):
+        """Borra la caché del servidor de una entrada (si tenía)"""
+        if entry.cached is not None:
+            try:
+                entry.cached.delete()
+            except Exception as e:
+                print(f"⚠️ No se pudo borrar la caché de contexto: {e}")
+            entry.cached = None
+            entry.cached_chars = 0
+
+
+# Contextos de análisis compartidos por todo el proceso
+context_cache = ContextCache()
+
 class AIBrain:
     """Gestor de IA con Gemini"""
     
@@ -44,6 +136,7 @@ Sé constructivo (máx 150 palabras por análisis).""",
     def __init__(self, api_key: Optional[str] = None):
         """Inicializa el cliente de Gemini"""
         self.api_key = api_key
+        self.last_usage = None  # Uso (tokens) de la última llamada
         
         if GENAI_AVAILABLE and api_key:
             try:
@@ -64,8 +157,23 @@ Sé constructivo (máx 150 palabras por análisis).""",
                 return False
         return False
     
-    def analyze(self, text: str, mode: str = "negocios", custom_prompt: str = "") -> str:
-        """Analiza un texto usando IA"""
+    def analyze(self, text: str, mode: str = "negocios", custom_prompt: str = "", context: str = "",
+                session: Optional[str] = None) -> str:
+        """Analiza un texto usando IA
+        
+        Args:
+            text: Transcripción a analizar
+            mode: Modo (persona) del análisis
+            custom_prompt: Prompt propio para el modo "custom"
+            context: Fragmentos relevantes de reuniones anteriores (opcional)
+            session: Reunión a la que pertenece el análisis; los siguientes análisis
+                de la misma reunión solo envían la transcripción nueva (ver `_analyze_incremental`)
+        
+        Si la transcripción no cambió en contenido desde el último análisis (misma
+        reunión y modo), se devuelve ese análisis sin llamar al modelo (ver core/dedup.py).
+        Solo con `session`: sin ella no se sabe si dos textos son de la misma reunión.
+        """
+        self.last_usage = None
         if not self.api_key:
             return "❌ IA no configurada. Configura tu API Key primero."
         
@@ -75,30 +183,158 @@ Sé constructivo (máx 150 palabras por análisis).""",
         else:
             system_prompt = self.SYSTEM_PROMPTS.get(mode, self.SYSTEM_PROMPTS["negocios"])
         
+        # Contexto de reuniones anteriores (si se recuperó alguno)
+        context_block = ""
+        if context:
+            context_block = f"""
+CONTEXTO DE REUNIONES ANTERIORES (úsalo solo si es relevante):
+{context}
+"""
+        
+        # Transcripción con hablantes: pedir que se atribuya cada punto
+        if SPEAKER_TAG.search(text):
+            system_prompt += ("\nLa transcripción indica quién habla en cada intervención (Hablante N): "
+                              "atribuye objeciones, compromisos y preguntas a cada hablante.")
+        
+        # Sin cambios relevantes desde el último análisis de la misma reunión: reutilizarlo
+        dedup_key = (session, mode, system_prompt) if session is not None else None
+        previous = change_detector.reusable(dedup_key, text) if dedup_key else None
+        if previous is not None:
+            usage_metrics.record_skip("analisis")
+            print("♻️ Transcripción sin cambios relevantes - se reutiliza el análisis anterior")
+            return previous
+        
+        if session is not None:
+            result = self._analyze_incremental(text, mode, system_prompt, context, session)
+        else:
+            result = self._analyze_full(text, mode, system_prompt, context_block)
+        if dedup_key and not result.startswith("❌"):
+            change_detector.remember(dedup_key, text, result)
+        return result
+    
+    def _analyze_full(self, text: str, mode: str, system_prompt: str, context_block: str) -> str:
+        """Análisis en una sola llamada con el prompt completo"""
         # Crear mensaje
         full_prompt = f"""{system_prompt}
-
+{context_block}
 TRANSCRIPCIÓN A ANALIZAR:
 {text}
 
 ANÁLISIS:"""
         
+        model = response = None
         try:
             model = genai.GenerativeModel('gemini-2.0-flash')
-            response = model.generate_content(full_prompt)
+            tracer.mark("analysis_sent")
+            with tracer.span("ai.analyze.request", mode=mode):
+                response = model.generate_content(full_prompt)
+            tracer.mark("analysis_first_byte")
             return response.text if response else "Sin respuesta"
         except Exception as e:
             return f"❌ Error en análisis IA: {str(e)}"
+        finally:
+            if model is not None:
+                self._record_usage("analisis", response, full_prompt, mode)
+    
+    def _analyze_incremental(self, text: str, mode: str, system_prompt: str, context: str, session: str) -> str:
+        """Análisis de una reunión en curso reutilizando lo ya enviado
+        
+        - Con caché en el servidor: el prompt del modo y la transcripción ya
+          cacheada no se reenvían; solo va la continuación.
+        - Si no (API sin caché, o poco texto para el mínimo): el prompt va como
+          `system_instruction` y solo se envía el análisis anterior + lo nuevo.
+        - Primer análisis, transcripción distinta o contexto de otras reuniones: completo.
+        """
+        entry = context_cache.get(session, mode, system_prompt)
+        grows = bool(entry.transcript) and text.startswith(entry.transcript) and not context
+        
+        model = response = None
+        try:
+            if grows and entry.cached is not None:
+                model = genai.GenerativeModel.from_cached_content(cached_content=entry.cached)
+                pending = text[entry.cached_chars:].strip()
+                prompt = (f"CONTINUACIÓN DE LA TRANSCRIPCIÓN:\n{pending}\n\n" if pending else "") + \
+                    "ANÁLISIS (de toda la reunión):"
+                context_cache.count("remote", estimate_tokens(system_prompt + text[:entry.cached_chars]))
+            elif grows and entry.analysis:
+                model = genai.GenerativeModel('gemini-2.0-flash', system_instruction=system_prompt)
+                prompt = f"""ANÁLISIS ANTERIOR DE ESTA REUNIÓN:
+{entry.analysis}
+
+NUEVA PARTE DE LA TRANSCRIPCIÓN:
+{text[len(entry.transcript):].strip()}
+
+ANÁLISIS ACTUALIZADO (de toda la reunión):"""
+                context_cache.count("incremental", max(0, estimate_tokens(entry.transcript) -
+                                                       estimate_tokens(entry.analysis)))
+            else:
+                model = genai.GenerativeModel('gemini-2.0-flash', system_instruction=system_prompt)
+                context_block = f"CONTEXTO DE REUNIONES ANTERIORES (úsalo solo si es relevante):\n{context}\n\n" \
+                    if context else ""
+                prompt = f"{context_block}TRANSCRIPCIÓN A ANALIZAR:\n{text}\n\nANÁLISIS:"
+                context_cache.count("full")
+            
+            tracer.mark("analysis_sent")
+            with tracer.span("ai.analyze.request", mode=mode, incremental=grows):
+                response = model.generate_content(prompt)
+            tracer.mark("analysis_first_byte")
+            result = response.text if response else "Sin respuesta"
+        except Exception as e:
+            return f"❌ Error en análisis IA: {str(e)}"
+        finally:
+            if model is not None:
+                self._record_usage("analisis", response, system_prompt + prompt, mode)
+        
+        entry.transcript = text
+        entry.analysis = result
+        self._refresh_remote_cache(entry)
+        return result
+    
+    def _refresh_remote_cache(self, entry: AnalysisContext):
+        """Crea (o rehace) la caché del servidor con el prompt del modo y la transcripción actual"""
+        if not CACHING_AVAILABLE or entry.remote_failed:
+            return
+        if estimate_tokens(entry.system_prompt + entry.transcript) < CACHE_MIN_TOKENS:
+            return
+        pending = len(entry.transcript) - entry.cached_chars
+        if entry.cached is not None and pending <= entry.cached_chars * CACHE_REFRESH_RATIO:
+            return
+        try:
+            cached = genai_caching.CachedContent.create(
+                model=CACHE_MODEL,
+                display_name=f"ferrxos-{entry.session}-{entry.mode}",
+                system_instruction=entry.system_prompt,
+                contents=[f"TRANSCRIPCIÓN DE LA REUNIÓN (hasta ahora):\n{entry.transcript}"],
+                ttl=datetime.timedelta(seconds=context_cache.ttl_seconds),
+            )
+        except Exception as e:
+            # Sin soporte o sin permisos: seguir con el modo local en esta sesión
+            print(f"⚠️ Caché de contexto no disponible, se usa el modo local: {e}")
+            entry.remote_failed = True
+            return
+        context_cache.release_remote(entry)
+        entry.cached = cached
+        entry.cached_chars = len(entry.transcript)
+    
+    def _record_usage(self, kind: str, response, prompt: str, mode: Optional[str] = None):
+        """Registra tokens de la llamada (también las fallidas: cuentan para la cuota)"""
+        self.last_usage = usage_from_response(response, prompt)
+        usage_metrics.record(kind, self.last_usage, mode=mode)
     
     def test_connection(self) -> bool:
         """Prueba la conexión con Gemini"""
         if not self.api_key:
             return False
         
+        prompt = "Responde con 'OK'"
+        model = response = None
         try:
             model = genai.GenerativeModel('gemini-2.0-flash')
-            response = model.generate_content("Responde con 'OK'")
+            response = model.generate_content(prompt)
             return response and len(response.text) > 0
         except Exception as e:
             print(f"Error en test_connection: {e}")
             return False
+        finally:
+            if model is not None:
+                self._record_usage("prueba", response, prompt)
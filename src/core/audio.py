@@ -7,17 +7,25 @@ import threading
 from typing import Callable, Optional
 import time
 
+from core.tracing import tracer
+
 try:
-    import sounddevice as sd
     import numpy as np
-    AUDIO_AVAILABLE = True
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import sounddevice as sd
+    AUDIO_AVAILABLE = NUMPY_AVAILABLE
 except ImportError:
     AUDIO_AVAILABLE = False
 
 class AudioCapture:
     """Gestor de captura de audio con detección de silencio"""
     
-    def __init__(self, sample_rate: int = 16000, channels: int = 1, silence_threshold: float = 0.08, silence_duration: float = 5.0):
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, silence_threshold: float = 0.08, silence_duration: float = 5.0,
+                 level_rate_hz: float = 15.0, envelope_decimation: int = 256, noise_suppression: bool = False):
         """Inicializa el capturador de audio
         
         Args:
@@ -25,25 +33,47 @@ class AudioCapture:
             channels: Número de canales
             silence_threshold: Umbral de amplitud para detectar silencio (0-1)
             silence_duration: Segundos de silencio antes de considerar pausa (default: 5s)
+            level_rate_hz: Máximo de notificaciones de nivel por segundo hacia la UI
+            envelope_decimation: Muestras por punto de la envolvente min/max
+            noise_suppression: Limpiar el ruido de fondo (NoiseSuppressor) antes de detectar
+                silencio y de guardar el audio que se sube
         """
         self.sample_rate = sample_rate
         self.channels = channels
         self.is_recording = False
-        self.audio_data = []
+        self.audio_data = []  # Bloques PCM 16-bit mono de la grabación en curso
+        self.recorded_samples = 0
         self.stream = None
-        self.audio_buffer = []
         self.silence_threshold = silence_threshold
         self.silence_duration = silence_duration
         self.silence_timer = 0.0
         self.last_sound_time = time.time()
         self.on_silence_detected = None  # Callback cuando detecta silencio
+        self.noise_suppression = noise_suppression
+        self.suppressor = None
+        
+        # Medidor de nivel: envolventes pendientes de entregar a la UI
+        self.level_rate_hz = level_rate_hz
+        self.envelope_decimation = max(1, int(envelope_decimation))
+        self.max_pending_points = 2048
+        self.on_level = None  # Callback (sin argumentos) cuando hay niveles nuevos
+        self._level_lock = threading.Lock()
+        self._pending_mins = []
+        self._pending_maxs = []
+        self._pending_points = 0
+        self._pending_level = 0.0
+        self._level_notified = False
+        self._last_level_emit = 0.0
     
-    def start_recording(self, callback: Optional[Callable] = None, on_silence: Optional[Callable] = None) -> bool:
+    def start_recording(self, callback: Optional[Callable] = None, on_silence: Optional[Callable] = None,
+                        on_level: Optional[Callable] = None) -> bool:
         """Inicia la grabación de audio
         
         Args:
             callback: Función a llamar con cada chunk de audio
             on_silence: Función a llamar cuando detecta pausa/silencio
+            on_level: Función (sin argumentos) a llamar, como máximo `level_rate_hz`
+                veces por segundo, cuando hay niveles nuevos en `take_levels()`
         """
         if not AUDIO_AVAILABLE:
             print("❌ Librerías de audio no disponibles")
@@ -51,23 +81,36 @@ class AudioCapture:
         
         self.is_recording = True
         self.audio_data = []
-        self.audio_buffer = []
+        self.recorded_samples = 0
         self.silence_timer = 0.0
         self.last_sound_time = time.time()
         self.on_silence_detected = on_silence
+        self.on_level = on_level
+        self._reset_levels()
+        self.trace_id = tracer.new_trace()
+        self._segment_traced = False
+        self.suppressor = NoiseSuppressor(self.sample_rate) if self.noise_suppression else None
         
         def audio_callback(indata, frames, time_info, status):
             if status:
                 print(f"⚠️ Audio status: {status}")
             
-            # Agregar datos
-            audio_chunk = indata.copy().flatten()
-            self.audio_buffer.append(audio_chunk)
-            self.audio_data.append(indata.copy())
+            # Una sola copia por bloque, en int16 (la mitad que float32; horas de reunión)
+            audio_chunk = indata[:, 0] if indata.ndim > 1 else indata
+            if self.suppressor is not None:
+                # Audio limpio para el detector de silencio, el medidor y la subida
+                audio_chunk = self.suppressor.process(audio_chunk)
+                if not len(audio_chunk):
+                    return
+            self.audio_data.append((audio_chunk * 32767).astype(np.int16))
+            self.recorded_samples += len(audio_chunk)
             
             # Detectar nivel de audio (amplitud RMS)
             rms_level = np.sqrt(np.mean(audio_chunk ** 2))
             
+            # Envolvente para el medidor de nivel (sin copiar audio crudo a la UI)
+            self._push_levels(audio_chunk, float(rms_level))
+            
             # Si hay sonido, resetear contador de silencio
             if rms_level > self.silence_threshold:
                 self.last_sound_time = time.time()
@@ -76,9 +119,12 @@ class AudioCapture:
                 # Calcular tiempo en silencio
                 elapsed_silence = time.time() - self.last_sound_time
                 
-                # Si pasó el umbral de silencio, disparar callback
+                # Si pasó el umbral de silencio, disparar callback (una vez por grabación:
+                # cada bloque siguiente encolaría otra parada en la UI)
                 if elapsed_silence > self.silence_duration and self.on_silence_detected:
-                    self.on_silence_detected()
+                    self._trace_segment_closed(elapsed_silence)
+                    on_silence_detected, self.on_silence_detected = self.on_silence_detected, None
+                    on_silence_detected()
             
             # Callback opcional
             if callback:
@@ -99,6 +145,84 @@ class AudioCapture:
             print(f"❌ Error iniciando grabación: {e}")
             return False
     
+    def _trace_segment_closed(self, elapsed_silence: float):
+        """Marca fin de voz y cierre de segmento en la traza de la grabación (una vez)"""
+        if self._segment_traced or not self.trace_id:
+            return
+        self._segment_traced = True
+        now = time.perf_counter()
+        tracer.mark("speech_end", at=now - elapsed_silence, trace_id=self.trace_id)
+        tracer.mark("segment_closed", at=now, trace_id=self.trace_id)
+    
+    def _reset_levels(self):
+        """Descarta los niveles pendientes de entregar"""
+        with self._level_lock:
+            self._pending_mins = []
+            self._pending_maxs = []
+            self._pending_points = 0
+            self._pending_level = 0.0
+            self._level_notified = False
+            self._last_level_emit = 0.0
+    
+    def _push_levels(self, audio_chunk, rms_level: float):
+        """Acumula la envolvente min/max del bloque y notifica a la UI (con límite de tasa)
+        
+        Se ejecuta en el hilo de audio. Solo hay una notificación en vuelo a la vez:
+        los bloques que llegan mientras la UI no ha llamado a `take_levels()` se
+        agregan a la misma entrega.
+        """
+        decimation = self.envelope_decimation
+        usable = (len(audio_chunk) // decimation) * decimation
+        if usable:
+            frames = audio_chunk[:usable].reshape(-1, decimation)
+            mins = frames.min(axis=1)
+            maxs = frames.max(axis=1)
+        else:
+            mins = maxs = audio_chunk[:0]
+        
+        notify = False
+        with self._level_lock:
+            self._pending_mins.append(mins)
+            self._pending_maxs.append(maxs)
+            self._pending_points += len(mins)
+            self._pending_level = max(self._pending_level, rms_level)
+            
+            # Si la UI se atrasa, conservar solo lo más reciente
+            while self._pending_points > self.max_pending_points and len(self._pending_mins) > 1:
+                self._pending_points -= len(self._pending_mins.pop(0))
+                self._pending_maxs.pop(0)
+            
+            now = time.monotonic()
+            min_interval = 1.0 / self.level_rate_hz if self.level_rate_hz > 0 else 0.0
+            if (self.on_level and not self._level_notified
+                    and now - self._last_level_emit >= min_interval):
+                self._level_notified = True
+                self._last_level_emit = now
+                notify = True
+        
+        if notify:
+            self.on_level()
+    
+    def take_levels(self) -> tuple:
+        """Entrega y vacía los niveles acumulados (llamar desde el hilo de UI)
+        
+        Returns:
+            Tupla (nivel_rms, mins, maxs) con la envolvente decimada desde la última entrega
+        """
+        with self._level_lock:
+            mins = self._pending_mins
+            maxs = self._pending_maxs
+            level = self._pending_level
+            self._pending_mins = []
+            self._pending_maxs = []
+            self._pending_points = 0
+            self._pending_level = 0.0
+            self._level_notified = False
+        
+        if not mins:
+            return 0.0, [], []
+        return level, np.concatenate(mins), np.concatenate(maxs)
+    
     def stop_recording(self) -> bytes:
         """Detiene la grabación y retorna los datos"""
         if not self.is_recording:
@@ -111,11 +235,14 @@ class AudioCapture:
                 self.stream.stop()
                 self.stream.close()
             
-            # Combinar datos de audio
+            # Lo que retiene el reductor de ruido (medio frame)
+            if self.suppressor is not None:
+                self.audio_data.append((self.suppressor.flush() * 32767).astype(np.int16))
+            
+            # Combinar datos de audio (ya en PCM 16-bit)
             if self.audio_data:
-                audio_array = np.concatenate(self.audio_data)
-                # Convertir a bytes (formato PCM 16-bit)
-                audio_bytes = (audio_array * 32767).astype(np.int16).tobytes()
+                with tracer.span("audio.concat_pcm16"):
+                    audio_bytes = np.concatenate(self.audio_data).tobytes()
                 print(f"✅ Grabación detenida ({len(audio_bytes)} bytes)")
                 return audio_bytes
             
@@ -123,6 +250,21 @@ class AudioCapture:
         except Exception as e:
             print(f"❌ Error deteniendo grabación: {e}")
             return b""
+        finally:
+            self._release()
+    
+    def _release(self):
+        """Suelta el stream, los bloques y los callbacks de la grabación terminada
+        
+        El stream guarda el closure del callback de audio (y con él los callbacks de
+        la UI); sin esto, cada grabación quedaba retenida hasta la siguiente.
+        """
+        self.stream = None
+        self.audio_data = []
+        self.suppressor = None
+        self.on_silence_detected = None
+        self.on_level = None
+        self._reset_levels()
     
     def get_microphones(self) -> list:
         """Obtiene lista de micrófonos disponibles"""
@@ -139,13 +281,548 @@ class AudioCapture:
         """Simula una grabación leyendo texto (para testing)"""
         self.is_recording = True
         self.audio_data = []
+        self.recorded_samples = 0
         print(f"✅ Simulando grabación: {text}")
         return True
     
     def get_audio_duration(self) -> float:
         """Obtiene duración del audio en segundos"""
-        if not self.audio_buffer:
+        return self.recorded_samples / self.sample_rate
+
+
+def pcm16_to_float(audio_bytes: bytes) -> "np.ndarray":
+    """PCM 16-bit (bytes) a float32 en [-1, 1]"""
+    return np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def float_to_pcm16(samples: "np.ndarray") -> bytes:
+    """float en [-1, 1] a PCM 16-bit (bytes), con saturación"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def frame_rms(samples: "np.ndarray", frame_len: int) -> "np.ndarray":
+    """RMS por tramas consecutivas (vectorizado; descarta la cola incompleta)"""
+    usable = (len(samples) // frame_len) * frame_len
+    if not usable:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:usable].reshape(-1, frame_len).astype(np.float32)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def adaptive_threshold(rms: "np.ndarray", floor: float = 0.01, ratio: float = 3.0,
+                       peak_fraction: float = 0.25) -> float:
+    """Umbral de voz a partir del ruido de fondo estimado (percentil 20 del RMS)
+
+    Sin pausas (habla continua) el percentil 20 ya es voz: el umbral se limita a
+    una fracción del nivel de las tramas más fuertes (percentil 95) para no
+    descartar todo el audio.
+    """
+    if not len(rms):
+        return floor
+    noise, peak = np.percentile(rms, [20, 95])
+    return max(floor, min(float(noise) * ratio, float(peak) * peak_fraction))
+
+
+def speech_regions(samples: "np.ndarray", sample_rate: int, threshold: Optional[float] = 0.02,
+                   frame_ms: float = 30.0, pad_ms: float = 200.0, min_gap_ms: float = 300.0) -> list:
+    """Detecta regiones con voz por energía (VAD simple)
+    
+    Args:
+        samples: Audio float en [-1, 1]
+        sample_rate: Tasa de muestreo (Hz)
+        threshold: RMS mínimo de una trama con voz (None = adaptativo al ruido de fondo)
+        frame_ms: Duración de cada trama
+        pad_ms: Margen que se conserva antes y después de cada región
+        min_gap_ms: Silencios más cortos que esto no separan regiones
+    
+    Returns:
+        Lista de tuplas (inicio, fin) en muestras
+    """
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    rms = frame_rms(samples, frame_len)
+    if threshold is None:
+        threshold = adaptive_threshold(rms)
+    voiced = rms > threshold
+    if not voiced.any():
+        return []
+    
+    # Dilatar las tramas con voz: margen + silencios cortos
+    pad = int(np.ceil(pad_ms / frame_ms))
+    bridge = int(np.ceil(min_gap_ms / frame_ms / 2))
+    width = max(pad, bridge)
+    if width:
+        voiced = np.convolve(voiced.astype(np.int32), np.ones(2 * width + 1, dtype=np.int32), mode="same") > 0
+    
+    # Bordes de cada racha de tramas con voz
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame_len
+    ends = np.minimum(np.flatnonzero(edges == -1) * frame_len, len(samples))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def trailing_silence(samples: "np.ndarray", sample_rate: int, frame_ms: float = 30.0,
+                     max_seconds: float = 2.0) -> float:
+    """Segundos de silencio al final del audio (umbral adaptativo al ruido de fondo)"""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    rms = frame_rms(samples, frame_len)
+    if not len(rms):
+        return 0.0
+    tail = rms[-max(1, int(max_seconds * 1000 / frame_ms)):]
+    loud = np.flatnonzero(tail > adaptive_threshold(rms))
+    silent_frames = len(tail) - (loud[-1] + 1) if len(loud) else len(tail)
+    return silent_frames * frame_len / sample_rate
+
+
+def split_at_pauses(samples: "np.ndarray", sample_rate: int, chunk_seconds: float = 300.0,
+                    search_seconds: float = 20.0, frame_ms: float = 30.0, cut_points: Optional[list] = None) -> list:
+    """Divide una grabación larga en tramos de ~`chunk_seconds`, cortando en la
+    trama más silenciosa de los últimos `search_seconds` de cada tramo (no a mitad de palabra)
+    
+    Args:
+        cut_points: Cortes preferidos en muestras (p. ej. cambios de hablante); si
+            alguno cae en la ventana de búsqueda se corta en la pausa más cercana a él
+    
+    Returns:
+        Lista de tuplas (inicio, fin) en muestras, contiguas y sin solape
+    """
+    chunk_len = int(chunk_seconds * sample_rate)
+    if len(samples) <= chunk_len:
+        return [(0, len(samples))] if len(samples) else []
+    
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    rms = frame_rms(samples, frame_len)
+    search_frames = max(1, int(search_seconds * sample_rate / frame_len))
+    
+    spans = []
+    start = 0
+    while len(samples) - start > chunk_len:
+        last_frame = (start + chunk_len) // frame_len
+        first_frame = max(start // frame_len + 1, last_frame - search_frames)
+        preferred = [point // frame_len for point in cut_points or () if first_frame <= point // frame_len < last_frame]
+        if preferred:
+            # Pausa más silenciosa a ±0,5 s del último cambio de hablante de la ventana
+            near = max(1, int(500 / frame_ms))
+            first_frame, last_frame = max(first_frame, preferred[-1] - near), min(last_frame, preferred[-1] + near)
+        window = rms[first_frame:last_frame]
+        cut = (first_frame + int(np.argmin(window))) * frame_len if len(window) else start + chunk_len
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, len(samples)))
+    return spans
+
+
+# --- Reducción de ruido: puerta espectral con perfil de ruido adaptativo ---
+
+MEDIAN_LOOKAHEAD = 2  # Tramas futuras de la mediana temporal de la ganancia (ventana de 5)
+
+
+class NoiseSuppressor:
+    """Reducción de ruido por puerta espectral, en streaming (STFT por lotes + solapamiento-suma)
+
+    El perfil de ruido de cada banda se estima sin pausas explícitas: es el
+    mínimo de la potencia suavizada en los últimos ~1,5 s (estadística de
+    mínimos), así sigue al ventilador que se enciende sin aprender la voz. Cada
+    banda se atenúa según su relación señal/ruido; la ganancia pasa por una
+    mediana de 5 tramas (quita clics de teclado y el "ruido musical", que duran
+    una o dos tramas) y después por un ataque rápido con liberación lenta.
+
+    `process` acepta bloques de cualquier tamaño y devuelve el audio limpio
+    desplazado `latency_samples` (media trama); cada muestra sale 2 tramas más
+    tarde por la mediana (48 ms en total a 16 kHz). `flush` entrega el resto.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: float = 32.0, reduction_db: float = 18.0,
+                 over_subtraction: float = 1.5, min_window_s: float = 1.5, release_ms: float = 80.0):
+        """
+        Args:
+            frame_ms: Duración de la trama de la STFT (se redondea a potencia de 2; salto de media trama)
+            reduction_db: Atenuación máxima de las bandas con solo ruido
+            over_subtraction: Margen sobre el ruido estimado antes de dejar pasar una banda
+            min_window_s: Ventana de la estadística de mínimos (más larga = se adapta más lento)
+            release_ms: Tiempo de liberación de la ganancia (evita cortes bruscos al final de las palabras)
+        """
+        self.sample_rate = sample_rate
+        self.n_fft = 1 << (int(sample_rate * frame_ms / 1000) - 1).bit_length()
+        self.hop = self.n_fft // 2
+        # Raíz de Hann periódica en análisis y síntesis: con salto de media trama suma 1 (reconstrucción exacta)
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.n_fft) / self.n_fft)).astype(np.float32)
+        self.floor = 10 ** (-reduction_db / 20)
+        self.over_subtraction = over_subtraction
+        frames_per_second = sample_rate / self.hop
+        self.subwindow_frames = max(1, int(min_window_s * frames_per_second / 8))
+        self.release = float(np.exp(-1.0 / max(1.0, release_ms / 1000 * frames_per_second)))
+        self.reset()
+
+    @property
+    def latency_samples(self) -> int:
+        return self.hop
+
+    def reset(self):
+        bins = self.n_fft // 2 + 1
+        self._input = np.zeros(self.hop, dtype=np.float32)   # Media trama anterior (la 1ª, silencio)
+        self._overlap = np.zeros(self.hop, dtype=np.float32)  # Segunda mitad de la última trama sintetizada
+        self._smoothed = None
+        self._noise = None
+        self._minima = np.full((8, bins), np.inf, dtype=np.float32)  # Mínimos de las subventanas anteriores
+        self._current_min = np.full(bins, np.inf, dtype=np.float32)
+        self._subwindow_count = 0
+        self._gain = np.ones(bins, dtype=np.float32)
+        # Mediana temporal: ganancias crudas de las 2 tramas ya emitidas + las pendientes, y sus espectros
+        self._raw = np.full((MEDIAN_LOOKAHEAD, bins), self.floor, dtype=np.float32)
+        self._spectra = np.zeros((0, bins), dtype=np.complex64)
+        self._received = self._emitted = 0
+
+    def process(self, samples: "np.ndarray") -> "np.ndarray":
+        """Limpia un bloque (float en [-1, 1]); devuelve tantas muestras como medias tramas completas hay"""
+        samples = np.asarray(samples, dtype=np.float32)
+        self._received += len(samples)
+        buffer = np.concatenate([self._input, samples])
+        count = (len(buffer) - self.hop) // self.hop  # Tramas completas (trama = 2 saltos)
+        if count <= 0:
+            self._input = buffer
+            return np.zeros(0, dtype=np.float32)
+        frames = np.lib.stride_tricks.sliding_window_view(buffer[:(count + 1) * self.hop], self.n_fft)[::self.hop]
+        spectrum = np.fft.rfft(frames * self.window, axis=1).astype(np.complex64)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        raw = np.concatenate([self._raw, self._raw_gains(power)])
+        spectra = np.concatenate([self._spectra, spectrum])
+        self._input = buffer[count * self.hop:].copy()
+        ready = len(spectra) - MEDIAN_LOOKAHEAD  # Tramas con sus 2 siguientes ya calculadas
+        if ready <= 0:
+            self._raw, self._spectra = raw, spectra
+            return np.zeros(0, dtype=np.float32)
+        gains = np.median(np.lib.stride_tricks.sliding_window_view(raw, 2 * MEDIAN_LOOKAHEAD + 1, axis=0), axis=-1)
+        self._raw, self._spectra, spectrum = raw[ready:], spectra[ready:], spectra[:ready]
+        gains = self._release(gains.astype(np.float32))
+        # Suavizado entre bandas vecinas ([1, 2, 1] / 4), en todas las tramas a la vez
+        gains[:, 1:-1] = 0.25 * gains[:, :-2] + 0.5 * gains[:, 1:-1] + 0.25 * gains[:, 2:]
+        cleaned = np.fft.irfft(spectrum * gains, n=self.n_fft, axis=1).astype(np.float32) * self.window
+        # Solapamiento-suma: 1ª mitad de cada trama + 2ª mitad de la anterior
+        tails = np.concatenate([self._overlap[None, :], cleaned[:-1, self.hop:]])
+        output = (cleaned[:, :self.hop] + tails).reshape(-1)
+        self._overlap = cleaned[-1, self.hop:].copy()
+        self._emitted += len(output)
+        return output
+
+    def flush(self) -> "np.ndarray":
+        """Entrega el audio retenido (rellena con silencio la última trama)"""
+        pending = self._received + self.latency_samples - self._emitted
+        output = self.process(np.zeros(self.hop * (2 + MEDIAN_LOOKAHEAD), dtype=np.float32))
+        self.reset()
+        return output[:pending]
+
+    def _raw_gains(self, power: "np.ndarray") -> "np.ndarray":
+        """Ganancia por trama y banda según la SNR; actualiza el perfil de ruido (recursión corta por trama)"""
+        gains = np.empty_like(power)
+        if self._smoothed is None:
+            self._smoothed = power[0].copy()
+            self._noise = power[0].copy()
+        for index, frame_power in enumerate(power):
+            self._smoothed = 0.8 * self._smoothed + 0.2 * frame_power
+            self._current_min = np.minimum(self._current_min, self._smoothed)
+            self._subwindow_count += 1
+            if self._subwindow_count >= self.subwindow_frames:
+                self._minima = np.roll(self._minima, 1, axis=0)
+                self._minima[0] = self._current_min
+                self._current_min = self._smoothed.copy()
+                self._subwindow_count = 0
+            # Sesgo de la estadística de mínimos: el mínimo queda por debajo de la media del ruido
+            self._noise = 1.5 * np.minimum(self._minima.min(axis=0), self._current_min)
+            gain = 1.0 - self.over_subtraction * np.sqrt(self._noise / np.maximum(frame_power, 1e-12))
+            gains[index] = np.clip(gain, self.floor, 1.0)
+        return gains
+
+    def _release(self, gains: "np.ndarray") -> "np.ndarray":
+        """Ataque inmediato, liberación gradual"""
+        for index, gain in enumerate(gains):
+            self._gain = np.maximum(gain, self._gain * self.release)
+            gains[index] = self._gain
+        return gains
+
+
+def denoise(samples: "np.ndarray", sample_rate: int, **kwargs) -> "np.ndarray":
+    """Reducción de ruido de una grabación completa (misma longitud, sin retardo)"""
+    suppressor = NoiseSuppressor(sample_rate, **kwargs)
+    output = np.concatenate([suppressor.process(samples), suppressor.flush()])
+    return output[suppressor.latency_samples:suppressor.latency_samples + len(samples)]
+
+
+# --- Hablantes: características espectrales y agrupamiento en línea ---
+
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int = 40, fmin: float = 60.0,
+                   fmax: Optional[float] = None) -> "np.ndarray":
+    """Banco de filtros triangulares en escala mel, forma (n_mels, n_fft // 2 + 1)"""
+    fmax = fmax or sample_rate / 2
+    to_mel = lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0)
+    edges = 700.0 * (10 ** (np.linspace(to_mel(fmin), to_mel(fmax), n_mels + 2) / 2595.0) - 1.0)
+    freqs = np.linspace(0, sample_rate / 2, n_fft // 2 + 1)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def log_mel_features(samples: "np.ndarray", sample_rate: int, frame_ms: float = 25.0, hop_ms: float = 10.0,
+                     n_mels: int = 40, batch_frames: int = 4096) -> "np.ndarray":
+    """Log-mel por trama, con FFT por lotes (memoria acotada en grabaciones largas)
+
+    Returns:
+        Matriz (tramas, n_mels); la trama i empieza en la muestra i * hop
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    if len(samples) < frame_len:
+        return np.zeros((0, n_mels), dtype=np.float32)
+    n_fft = 1 << (frame_len - 1).bit_length()
+    window = np.hanning(frame_len).astype(np.float32)
+    filters = mel_filterbank(sample_rate, n_fft, n_mels).T
+    frames = np.lib.stride_tricks.sliding_window_view(np.asarray(samples, dtype=np.float32), frame_len)[::hop]
+    features = np.empty((len(frames), n_mels), dtype=np.float32)
+    for start in range(0, len(frames), batch_frames):
+        spectrum = np.fft.rfft(frames[start:start + batch_frames] * window, n=n_fft, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        features[start:start + batch_frames] = np.log(power @ filters + 1e-10)
+    return features
+
+
+def mfcc(log_mel: "np.ndarray", n_coeffs: int = 13) -> "np.ndarray":
+    """Coeficientes cepstrales (DCT-II de la log-mel)"""
+    n_mels = log_mel.shape[1]
+    k = np.arange(n_coeffs)[:, None]
+    n = np.arange(n_mels)[None, :]
+    dct = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)).astype(np.float32)
+    return log_mel @ dct.T
+
+
+class SpeakerTracker:
+    """Agrupamiento en línea (un solo paso) de ventanas de voz por hablante
+
+    Las características se normalizan con media y varianza acumuladas, así el
+    mismo tracker sirve para los tramos sucesivos de una reunión en vivo y los
+    números de hablante se mantienen entre tramos.
+    """
+
+    def __init__(self, threshold: float = 0.8, max_speakers: int = 6):
+        """
+        Args:
+            threshold: Distancia (en desviaciones típicas) a partir de la cual una ventana es otro hablante
+            max_speakers: Hablantes como máximo (después se asigna al más parecido)
+        """
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.centroids = []
+        self.counts = []
+        self._n = 0
+        self._mean = None
+        self._m2 = None
+
+    def normalize(self, features: "np.ndarray") -> "np.ndarray":
+        """Acumula media/varianza con estas tramas y las devuelve normalizadas"""
+        if len(features):
+            count = len(features)
+            batch_mean = features.mean(axis=0)
+            batch_m2 = ((features - batch_mean) ** 2).sum(axis=0)
+            if self._mean is None:
+                self._n, self._mean, self._m2 = count, batch_mean, batch_m2
+            else:
+                total = self._n + count
+                delta = batch_mean - self._mean
+                self._mean = self._mean + delta * count / total
+                self._m2 = self._m2 + batch_m2 + delta ** 2 * self._n * count / total
+                self._n = total
+        if self._mean is None:
+            return features
+        std = np.sqrt(self._m2 / max(self._n - 1, 1)) + 1e-6
+        return (features - self._mean) / std
+
+    def assign(self, embedding: "np.ndarray") -> int:
+        """Hablante (0, 1, ...) de una ventana; crea uno nuevo si no se parece a ninguno"""
+        if self.centroids:
+            distances = np.sqrt(np.mean((np.asarray(self.centroids) - embedding) ** 2, axis=1))
+            best = int(np.argmin(distances))
+            if distances[best] <= self.threshold or len(self.centroids) >= self.max_speakers:
+                self.counts[best] += 1
+                self.centroids[best] += (embedding - self.centroids[best]) / self.counts[best]
+                return best
+        self.centroids.append(embedding.astype(np.float32).copy())
+        self.counts.append(1)
+        return len(self.centroids) - 1
+
+
+def speaker_turns(samples: "np.ndarray", sample_rate: int, tracker: Optional[SpeakerTracker] = None,
+                  window_s: float = 1.5, hop_s: float = 0.75, min_turn_s: float = 1.5,
+                  threshold: Optional[float] = None) -> list:
+    """Turnos de palabra detectados localmente (sin llamadas a la API)
+
+    MFCC por trama -> ventanas de `window_s` con voz -> hablante de cada ventana
+    (agrupamiento en línea) -> un cambio solo cuenta si dura al menos `min_turn_s`.
+
+    Args:
+        samples: Audio float en [-1, 1]
+        tracker: Tracker a reutilizar entre tramos de una misma reunión (None = uno nuevo)
+        threshold: Distancia para abrir un hablante nuevo en el tracker creado aquí
+            (None = la de `SpeakerTracker`)
+
+    Returns:
+        Lista de tuplas (inicio_s, fin_s, hablante) contiguas; hablante empieza en 1
+    """
+    tracker = tracker or SpeakerTracker(**({"threshold": threshold} if threshold is not None else {}))
+    hop_ms = 10.0
+    features = mfcc(log_mel_features(samples, sample_rate, hop_ms=hop_ms))[:, 1:]  # Sin c0 (volumen)
+    duration = len(samples) / sample_rate
+    if not len(features):
+        return []
+
+    # Tramas con voz: umbral adaptativo al ruido, sin pasar de 1/4 del nivel de voz
+    # (en habla continua, sin pausas, el percentil bajo ya es voz)
+    rms = frame_rms(samples, int(sample_rate * hop_ms / 1000))[:len(features)]
+    energy_threshold = min(adaptive_threshold(rms), 0.25 * float(np.percentile(rms, 95)))
+    voiced = np.zeros(len(features), dtype=bool)
+    voiced[:len(rms)] = rms > energy_threshold
+    if not voiced.any():
+        return []
+    normalized = tracker.normalize(features[voiced])
+    features = features.copy()
+    features[voiced] = normalized
+
+    # Hablante de cada ventana (None si casi no hay voz)
+    window = int(window_s * 1000 / hop_ms)
+    hop = int(hop_s * 1000 / hop_ms)
+    labels = []
+    for start in range(0, max(len(features) - window, 0) + 1, hop):
+        mask = voiced[start:start + window]
+        if mask.mean() < 0.5:
+            labels.append(None)
+            continue
+        labels.append(tracker.assign(features[start:start + window][mask].mean(axis=0)))
+
+    # Suavizado: un cambio de hablante se acepta si se mantiene min_turn_s
+    confirm = max(1, int(round(min_turn_s / hop_s)))
+    smoothed = []
+    current = None
+    for index, label in enumerate(labels):
+        if label is not None and label != current:
+            run = labels[index:index + confirm]
+            if current is None or (len(run) == confirm and all(item == label for item in run)):
+                current = label
+        smoothed.append(current)
+
+    # Ventanas -> turnos (cada ventana cubre su tramo central de `hop_s`)
+    turns = []
+    offset = (window_s - hop_s) / 2
+    for index, label in enumerate(smoothed):
+        if label is None:
+            continue
+        start = 0.0 if not turns else offset + index * hop_s
+        if turns and turns[-1][2] == label:
+            continue
+        if turns:
+            turns[-1][1] = start
+        turns.append([start, duration, label])
+    return [(round(start, 2), round(end, 2), speaker + 1) for start, end, speaker in turns]
+
+
+def turn_cut_points(turns: list, sample_rate: int) -> list:
+    """Muestras donde empieza cada cambio de hablante (para cortar tramos ahí)"""
+    return [int(start * sample_rate) for start, _, _ in turns[1:]]
+
+
+def downsample(samples: "np.ndarray", factor: int, taps: int = 63) -> "np.ndarray":
+    """Reduce la tasa de muestreo por un factor entero (FIR pasa-bajos + diezmado)"""
+    if factor <= 1:
+        return samples
+    # Sinc con ventana de Hamming, corte en la nueva frecuencia de Nyquist
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(n / factor) * np.hamming(taps)
+    kernel /= kernel.sum()
+    filtered = np.convolve(samples.astype(np.float32), kernel.astype(np.float32), mode="same")
+    return filtered[::factor]
+
+
+def upsample(samples: "np.ndarray", factor: int) -> "np.ndarray":
+    """Aumenta la tasa de muestreo por un factor entero (interpolación lineal)"""
+    if factor <= 1 or not len(samples):
+        return samples
+    positions = np.arange(len(samples) * factor) / factor
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class OffsetMap:
+    """Correspondencia entre el audio compactado y la grabación original
+    
+    Cada tramo es (inicio_compactado, inicio_original, longitud) en muestras.
+    """
+    
+    def __init__(self, sample_rate: int, segments: Optional[list] = None, original_samples: int = 0):
+        self.sample_rate = sample_rate
+        self.segments = segments or []
+        self.original_samples = original_samples
+    
+    @property
+    def compact_samples(self) -> int:
+        if not self.segments:
+            return 0
+        start, _, length = self.segments[-1]
+        return start + length
+    
+    def to_original(self, seconds: float) -> float:
+        """Convierte un tiempo del audio compactado al de la grabación original"""
+        position = int(seconds * self.sample_rate)
+        for compact_start, original_start, length in self.segments:
+            if position < compact_start + length:
+                offset = max(0, position - compact_start)
+                return (original_start + offset) / self.sample_rate
+        if self.segments:
+            compact_start, original_start, length = self.segments[-1]
+            return (original_start + length) / self.sample_rate
+        return seconds
+    
+    def to_compact(self, seconds: float) -> float:
+        """Convierte un tiempo de la grabación original al del audio compactado
+        (un instante dentro de un silencio eliminado pasa al inicio de la siguiente región)"""
+        position = int(seconds * self.sample_rate)
+        for compact_start, original_start, length in self.segments:
+            if position < original_start + length:
+                return (compact_start + max(0, position - original_start)) / self.sample_rate
+        return self.compact_samples / self.sample_rate if self.segments else seconds
+    
+    def removed_ratio(self) -> float:
+        """Fracción de la grabación original que se eliminó"""
+        if not self.original_samples:
             return 0.0
-        
-        total_samples = sum(len(chunk) for chunk in self.audio_buffer)
-        return total_samples / self.sample_rate
+        return 1.0 - self.compact_samples / self.original_samples
+
+
+def compact_speech(audio_bytes: bytes, sample_rate: int = 16000, threshold: Optional[float] = None,
+                   pad_ms: float = 250.0, gap_ms: float = 300.0) -> tuple:
+    """Elimina los silencios antes de subir el audio, dejando pausas cortas entre frases
+    
+    Args:
+        audio_bytes: PCM 16-bit mono
+        sample_rate: Tasa de muestreo (Hz)
+        threshold: RMS mínimo de voz (None = adaptativo al ruido de fondo)
+        pad_ms: Margen que se conserva alrededor de cada región con voz
+        gap_ms: Silencio que se deja entre regiones (las pausas largas se acortan a esto)
+    
+    Returns:
+        Tupla (pcm16_bytes, OffsetMap). Si no hay voz, los bytes están vacíos.
+    """
+    pcm = np.frombuffer(audio_bytes, dtype=np.int16)
+    regions = speech_regions(pcm.astype(np.float32) / 32768.0, sample_rate, threshold=threshold,
+                             pad_ms=pad_ms, min_gap_ms=gap_ms)
+    offset_map = OffsetMap(sample_rate, original_samples=len(pcm))
+    if not regions:
+        return b"", offset_map
+    
+    gap = np.zeros(int(sample_rate * gap_ms / 1000), dtype=np.int16)
+    pieces = []
+    position = 0
+    for index, (start, end) in enumerate(regions):
+        if index:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(pcm[start:end])
+        offset_map.segments.append((position, start, end - start))
+        position += end - start
+    
+    return np.concatenate(pieces).tobytes(), offset_map
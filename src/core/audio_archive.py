@@ -0,0 +1,224 @@
+"""
+Módulo de Archivo de Audio
+Guarda el audio de cada reunión de forma compacta (sin silencios, a menor tasa de
+muestreo y comprimido sin pérdida) para poder re-transcribirlo más tarde
+
+Formato de cada archivo (.fxa):
+    MAGIC | bloque 0 | bloque 1 | ... | índice JSON | offset del índice (uint64 LE)
+
+Cada bloque son ~2 s de PCM int16 codificado en diferencias, con los bytes
+separados (altos/bajos) y comprimido con zlib. El índice permite leer cualquier
+tramo decodificando solo los bloques que lo cubren.
+
+Con un cifrador (`core.crypto`) el archivo empieza por MAGIC_ENCRYPTED y cada
+bloque y el índice van cifrados por separado con AES-GCM: leer un tramo
+descifra solo sus bloques.
+"""
+
+import bisect
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from core.audio import NUMPY_AVAILABLE, pcm16_to_float, speech_regions, downsample
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+MAGIC = b"FXA1"
+MAGIC_ENCRYPTED = b"FXA2"
+FOOTER_POINTER = struct.Struct("<Q")
+
+
+def encode_chunk(pcm: "np.ndarray") -> bytes:
+    """Compresión sin pérdida de PCM int16: diferencias + separación de bytes + zlib"""
+    delta = np.diff(pcm, prepend=np.int16(0)).astype(np.int16)  # desborda igual que cumsum
+    shuffled = delta.view(np.uint8).reshape(-1, 2).T.tobytes()
+    return zlib.compress(shuffled, 9)
+
+
+def decode_chunk(blob: bytes, n_samples: int) -> "np.ndarray":
+    """Inversa de `encode_chunk`"""
+    planes = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(2, n_samples)
+    delta = np.ascontiguousarray(planes.T).view(np.int16).ravel()
+    return np.cumsum(delta, dtype=np.int16)
+
+
+class AudioArchive:
+    """Archivo de audio por reunión, enlazado por el ID del historial"""
+
+    def __init__(self, root_dir: Path, target_rate: int = 8000, chunk_seconds: float = 2.0,
+                 trim_silence: bool = True, vad_threshold: Optional[float] = None, cipher=None):
+        """
+        Args:
+            root_dir: Carpeta donde se guardan los archivos .fxa
+            target_rate: Tasa de muestreo de archivo (8 kHz basta para voz)
+            chunk_seconds: Duración de cada bloque de acceso aleatorio
+            trim_silence: Quitar los silencios (se conserva el mapa de tiempos)
+            vad_threshold: RMS mínimo considerado voz al recortar (None = adaptativo al
+                ruido de fondo, como `compact_speech`)
+            cipher: RecordCipher para cifrar bloques e índice (opcional)
+        """
+        self.root_dir = Path(root_dir)
+        self.target_rate = target_rate
+        self.chunk_seconds = chunk_seconds
+        self.trim_silence = trim_silence
+        self.vad_threshold = vad_threshold
+        self.cipher = cipher
+
+    def path_for(self, meeting_id: int) -> Path:
+        """Ruta del archivo de una reunión"""
+        return self.root_dir / f"{int(meeting_id):06d}.fxa"
+
+    def exists(self, meeting_id: int) -> bool:
+        return self.path_for(meeting_id).exists()
+
+    def save(self, meeting_id: int, audio_bytes: bytes, sample_rate: int = 16000) -> Optional[Path]:
+        """Archiva el audio PCM 16-bit mono de una reunión
+
+        Returns:
+            Ruta del archivo creado, o None si el audio estaba vacío
+        """
+        if len(audio_bytes) < 2:
+            return None
+        samples = pcm16_to_float(audio_bytes)
+        factor = sample_rate // self.target_rate if sample_rate % self.target_rate == 0 else 1
+        rate = sample_rate // factor
+        samples = downsample(samples, factor)
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+        # Regiones conservadas: (inicio original, inicio en archivo, longitud), en muestras a `rate`
+        spans = speech_regions(samples, rate, threshold=self.vad_threshold) if self.trim_silence else []
+        if not spans:
+            # Sin recorte, o no se detectó voz (p. ej. grabación muy baja): se guarda entera
+            spans = [(0, len(pcm))]
+
+        regions = []
+        kept = []
+        archive_pos = 0
+        for start, end in spans:
+            regions.append([start, archive_pos, end - start])
+            kept.append(pcm[start:end])
+            archive_pos += end - start
+        kept = np.concatenate(kept)
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(meeting_id)
+        tmp_path = path.with_suffix(".tmp")
+        chunk_len = max(1, int(rate * self.chunk_seconds))
+        chunks = []
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC if self.cipher is None else MAGIC_ENCRYPTED)
+            for start in range(0, len(kept), chunk_len):
+                blob = encode_chunk(kept[start:start + chunk_len])
+                if self.cipher is not None:
+                    blob = self.cipher.encrypt(blob, f"{int(meeting_id)}:{len(chunks)}")
+                chunks.append([start, len(kept[start:start + chunk_len]), f.tell(), len(blob)])
+                f.write(blob)
+
+            footer = {
+                "version": 1,
+                "meeting_id": int(meeting_id),
+                "sample_rate": rate,
+                "source_rate": sample_rate,
+                "source_samples": len(pcm),
+                "regions": regions,
+                "chunks": chunks,
+            }
+            footer_offset = f.tell()
+            footer_blob = json.dumps(footer).encode("utf-8")
+            if self.cipher is not None:
+                footer_blob = self.cipher.encrypt(footer_blob, f"{int(meeting_id)}:indice")
+            f.write(footer_blob)
+            f.write(FOOTER_POINTER.pack(footer_offset))
+        tmp_path.replace(path)
+
+        ratio = len(audio_bytes) / max(1, path.stat().st_size)
+        print(f"✅ Audio archivado: reunión {meeting_id} ({path.stat().st_size // 1024} KB, {ratio:.1f}x)")
+        return path
+
+    def info(self, meeting_id: int) -> Optional[dict]:
+        """Índice del archivo (tasas, regiones de voz y bloques)"""
+        path = self.path_for(meeting_id)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return self._read_footer(f, meeting_id)
+
+    def _read_footer(self, f, meeting_id: int) -> dict:
+        """Índice del archivo; `encrypted` indica si los bloques van cifrados"""
+        magic = f.read(len(MAGIC))
+        if magic not in (MAGIC, MAGIC_ENCRYPTED):
+            raise ValueError("Archivo de audio inválido")
+        encrypted = magic == MAGIC_ENCRYPTED
+        if encrypted and self.cipher is None:
+            raise ValueError("Audio cifrado: falta la clave (ferrxos.key)")
+        f.seek(-FOOTER_POINTER.size, 2)
+        end = f.tell()
+        (footer_offset,) = FOOTER_POINTER.unpack(f.read(FOOTER_POINTER.size))
+        f.seek(footer_offset)
+        blob = f.read(end - footer_offset)
+        if encrypted:
+            blob = self.cipher.decrypt(blob, f"{int(meeting_id)}:indice")
+        footer = json.loads(blob.decode("utf-8"))
+        footer["encrypted"] = encrypted
+        return footer
+
+    def duration(self, meeting_id: int) -> float:
+        """Duración de la grabación original en segundos (incluye silencios recortados)"""
+        info = self.info(meeting_id)
+        return info["source_samples"] / info["sample_rate"] if info else 0.0
+
+    def read_segment(self, meeting_id: int, start_s: float = 0.0, end_s: Optional[float] = None) -> tuple:
+        """Lee un tramo de la grabación original decodificando solo los bloques necesarios
+
+        Los silencios recortados al archivar no se devuelven: el resultado es la
+        voz contenida en [start_s, end_s) de la grabación original.
+
+        Returns:
+            Tupla (pcm16_bytes, sample_rate)
+        """
+        path = self.path_for(meeting_id)
+        with open(path, "rb") as f:
+            info = self._read_footer(f, meeting_id)
+            rate = info["sample_rate"]
+            first = int(start_s * rate)
+            last = info["source_samples"] if end_s is None else int(end_s * rate)
+
+            # Tramos del archivo que corresponden a [first, last) de la grabación
+            ranges = []
+            for orig_start, archive_start, length in info["regions"]:
+                lo = max(first, orig_start)
+                hi = min(last, orig_start + length)
+                if lo < hi:
+                    ranges.append((archive_start + lo - orig_start, archive_start + hi - orig_start))
+
+            chunk_starts = [chunk[0] for chunk in info["chunks"]]
+            decoded = {}
+            pieces = []
+            for lo, hi in ranges:
+                index = bisect.bisect_right(chunk_starts, lo) - 1
+                while index < len(info["chunks"]) and info["chunks"][index][0] < hi:
+                    chunk_start, n_samples, offset, size = info["chunks"][index]
+                    if index not in decoded:
+                        f.seek(offset)
+                        blob = f.read(size)
+                        if info["encrypted"]:
+                            blob = self.cipher.decrypt(blob, f"{int(meeting_id)}:{index}")
+                        decoded[index] = decode_chunk(blob, n_samples)
+                    pcm = decoded[index]
+                    pieces.append(pcm[max(lo, chunk_start) - chunk_start:min(hi, chunk_start + n_samples) - chunk_start])
+                    index += 1
+
+        audio = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.int16)
+        return audio.tobytes(), rate
+
+    def delete(self, meeting_id: int) -> bool:
+        """Borra el audio archivado de una reunión"""
+        path = self.path_for(meeting_id)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
@@ -0,0 +1,265 @@
+"""
+Módulo de Cifrado en Reposo
+AES-GCM por registro (cuerpos del historial, API Key, cargas de la cola de
+trabajos) y por bloque (audio archivado), con subclaves derivadas una sola vez por sesión de una clave
+maestra local. Cada dato se descifra solo cuando se lee, así abrir una
+reunión o buscar no descifra el resto del historial.
+
+Formato de cada dato cifrado:
+    versión (1 byte) | nonce (12 bytes) | texto cifrado + etiqueta (16 bytes)
+
+El contexto (p. ej. "42:resumen_ia") va como dato asociado: un bloque copiado
+a otra reunión o a otro campo no se descifra.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+    print("⚠️ cryptography no instalado - config, historial y audio se guardarán sin cifrar")
+
+KEY_FILE_NAME = "ferrxos.key"
+PASSPHRASE_ENV = "FERRXOS_PASSPHRASE"  # Opcional: la clave maestra se deriva de esta frase (scrypt)
+
+# Propósitos de las subclaves (una por tipo de dato)
+PURPOSE_CONFIG = "config"
+PURPOSE_HISTORY = "historial"
+PURPOSE_AUDIO = "audio"
+PURPOSE_JOBS = "cola"
+
+# Campos de config.json que se guardan cifrados (como "<campo>_cifrada")
+SECRET_FIELDS = ("api_key",)
+
+FORMAT_VERSION = 1
+NONCE_SIZE = 12
+SCRYPT_N = 2 ** 15  # ~0.1 s por sesión: la frase no se puede probar por fuerza bruta barata
+CHECK_PLAINTEXT = b"AI_FERRXOS"
+
+
+class RecordCipher:
+    """AES-GCM con la subclave de un propósito"""
+
+    def __init__(self, key: bytes, purpose: str):
+        self.purpose = purpose
+        self._aead = AESGCM(key)
+        self._prefix = purpose.encode("utf-8") + b"|"
+        self._term_key = hmac.new(key, b"terminos", hashlib.sha256).digest()
+
+    def encrypt(self, data: bytes, context: str = "") -> bytes:
+        """Cifra un registro o bloque
+
+        Args:
+            data: Bytes en claro
+            context: Dónde vive el dato (ID y campo); hay que repetirlo al descifrar
+        """
+        nonce = os.urandom(NONCE_SIZE)
+        return bytes([FORMAT_VERSION]) + nonce + self._aead.encrypt(nonce, data, self._prefix + context.encode("utf-8"))
+
+    def decrypt(self, blob: bytes, context: str = "") -> bytes:
+        """Inversa de `encrypt`; ValueError si el dato está dañado, se movió o la clave no es la misma"""
+        if not blob or blob[0] != FORMAT_VERSION:
+            raise ValueError("Formato de cifrado desconocido")
+        nonce = blob[1:1 + NONCE_SIZE]
+        try:
+            return self._aead.decrypt(nonce, blob[1 + NONCE_SIZE:], self._prefix + context.encode("utf-8"))
+        except InvalidTag:
+            raise ValueError(f"No se pudo descifrar ({self.purpose} {context}): clave distinta o datos dañados")
+
+    def term(self, word: str) -> str:
+        """Huella con clave de una palabra, para índices de búsqueda sobre datos cifrados
+
+        La misma palabra da siempre la misma huella: se puede buscar sin guardarla
+        en claro, aunque se ve cuántas veces se repite cada una.
+        """
+        return hmac.new(self._term_key, word.encode("utf-8"), hashlib.sha256).hexdigest()[:20]
+
+    def seal_text(self, text: str, context: str = "") -> str:
+        """Cifra un texto corto para guardarlo en JSON (base64)"""
+        return base64.b64encode(self.encrypt(text.encode("utf-8"), context)).decode("ascii")
+
+    def open_text(self, token: str, context: str = "") -> str:
+        return self.decrypt(base64.b64decode(token), context).decode("utf-8")
+
+
+class KeyRing:
+    """Clave maestra local y subclaves por propósito (derivadas una vez y en caché)
+
+    La clave maestra es aleatoria y vive en `ferrxos.key` junto a los datos, o
+    se deriva con scrypt de FERRXOS_PASSPHRASE (el archivo guarda entonces solo
+    la sal y un testigo para detectar una frase equivocada).
+    """
+
+    def __init__(self, key_path: Path, passphrase: Optional[str] = None):
+        self.key_path = Path(key_path)
+        self.passphrase = passphrase
+        self._master = None
+        self._ciphers = {}
+        self._lock = threading.Lock()
+
+    def cipher(self, purpose: str) -> RecordCipher:
+        """Cifrador de un propósito (la derivación solo ocurre la primera vez)"""
+        with self._lock:
+            if purpose not in self._ciphers:
+                if self._master is None:
+                    self._master = self._load_master()
+                self._ciphers[purpose] = RecordCipher(self._derive(self._master, purpose), purpose)
+            return self._ciphers[purpose]
+
+    @staticmethod
+    def _derive(master: bytes, purpose: str) -> bytes:
+        return HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                    info=f"ferrxos/{purpose}".encode("utf-8")).derive(master)
+
+    @staticmethod
+    def _stretch(passphrase: str, salt: bytes) -> bytes:
+        return Scrypt(salt=salt, length=32, n=SCRYPT_N, r=8, p=1).derive(passphrase.encode("utf-8"))
+
+    def _load_master(self) -> bytes:
+        if not self.key_path.exists():
+            # Una clave nueva no abre lo ya cifrado y mezclaría claves para siempre
+            found = encrypted_data_in(self.key_path.parent)
+            if found:
+                raise ValueError(f"Falta {KEY_FILE_NAME} y hay datos cifrados ({', '.join(found)}): "
+                                 "restaura la clave original (no se crea una nueva)")
+            return self._create_master()
+
+        with open(self.key_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("kdf") != "scrypt":
+            return base64.b64decode(data["key"])
+
+        if not self.passphrase:
+            raise ValueError(f"Los datos están cifrados con una frase de acceso: define {PASSPHRASE_ENV}")
+        master = self._stretch(self.passphrase, base64.b64decode(data["salt"]))
+        check = RecordCipher(self._derive(master, "check"), "check")
+        try:
+            check.decrypt(base64.b64decode(data["check"]))
+        except ValueError:
+            raise ValueError(f"Frase de acceso incorrecta ({PASSPHRASE_ENV})")
+        return master
+
+    def _create_master(self) -> bytes:
+        if self.passphrase:
+            salt = os.urandom(16)
+            master = self._stretch(self.passphrase, salt)
+            check = RecordCipher(self._derive(master, "check"), "check").encrypt(CHECK_PLAINTEXT)
+            data = {"version": 1, "kdf": "scrypt", "salt": base64.b64encode(salt).decode("ascii"),
+                    "check": base64.b64encode(check).decode("ascii")}
+        else:
+            master = AESGCM.generate_key(bit_length=256)
+            data = {"version": 1, "kdf": "random", "key": base64.b64encode(master).decode("ascii")}
+
+        # Solo lectura para el usuario; se escribe completo antes de aparecer con su nombre
+        self.key_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.key_path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.key_path)
+        print(f"🔐 Clave de cifrado creada en {self.key_path.name} (sin ella no se pueden leer los datos)")
+        return master
+
+
+def encrypted_data_in(data_dir: Path) -> list:
+    """Nombres de los archivos de `data_dir` con datos cifrados (config, bases, audio, cola)"""
+    data_dir = Path(data_dir)
+    found = []
+    config_path = data_dir / "config.json"
+    if config_path.exists():
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                if any(key.endswith("_cifrada") for key in json.load(f)):
+                    found.append(config_path.name)
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    # Historial (cuerpos "<códec>+aesgcm") y cola de trabajos (cargas "aesgcm:...")
+    probes = ("SELECT 1 FROM meeting_bodies WHERE codec LIKE '%+aesgcm' LIMIT 1",
+              "SELECT 1 FROM jobs WHERE payload LIKE 'aesgcm:%' LIMIT 1")
+    for db_path in sorted(data_dir.glob("*.db")):
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        except sqlite3.Error:
+            continue
+        try:
+            for probe in probes:
+                try:
+                    if conn.execute(probe).fetchone():
+                        found.append(db_path.name)
+                        break
+                except sqlite3.Error:
+                    continue
+        finally:
+            conn.close()
+
+    for fxa_path in sorted(data_dir.glob("audio_archive/*.fxa")):
+        with open(fxa_path, "rb") as f:
+            if f.read(4) == b"FXA2":
+                found.append("audio_archive")
+                break
+    if any(data_dir.glob("*_audio/*.sealed")):
+        found.append("audio en cola")
+    return found
+
+
+_keyrings = {}
+_keyrings_lock = threading.Lock()
+
+
+def keyring_for(data_dir: Path) -> Optional[KeyRing]:
+    """Llavero de una carpeta de datos, compartido por todo el proceso
+
+    Returns:
+        KeyRing, o None si `cryptography` no está instalado (los datos van sin cifrar)
+    """
+    if not CRYPTO_AVAILABLE:
+        return None
+    key_path = (Path(data_dir) / KEY_FILE_NAME).resolve()
+    with _keyrings_lock:
+        if key_path not in _keyrings:
+            _keyrings[key_path] = KeyRing(key_path, passphrase=os.environ.get(PASSPHRASE_ENV) or None)
+        return _keyrings[key_path]
+
+
+def cipher_for(data_dir: Path, purpose: str) -> Optional[RecordCipher]:
+    """Cifrador de un propósito para una carpeta de datos (None sin `cryptography`)"""
+    keyring = keyring_for(data_dir)
+    return keyring.cipher(purpose) if keyring else None
+
+
+def seal_config(config: dict, cipher: Optional[RecordCipher]) -> dict:
+    """Copia de la config lista para escribir: los secretos van cifrados como "<campo>_cifrada" """
+    if cipher is None:
+        return dict(config)
+    sealed = {key: value for key, value in config.items() if key not in SECRET_FIELDS}
+    for field in SECRET_FIELDS:
+        if config.get(field):
+            sealed[f"{field}_cifrada"] = cipher.seal_text(config[field], field)
+    return sealed
+
+
+def open_config(config: dict, cipher: Optional[RecordCipher]) -> dict:
+    """Config leída de disco con los secretos descifrados (acepta config.json antiguos en claro)"""
+    opened = {key: value for key, value in config.items() if not key.endswith("_cifrada")}
+    for field in SECRET_FIELDS:
+        token = config.get(f"{field}_cifrada")
+        if token and cipher is not None:
+            opened[field] = cipher.open_text(token, field)
+    return opened
@@ -0,0 +1,104 @@
+"""
+Módulo de Detección de Cambios
+Decide en local si una transcripción cambió lo suficiente desde el último
+análisis como para pagar otra llamada al modelo (SimHash + tamaño del cambio).
+"""
+
+import hashlib
+import re
+import threading
+from typing import Optional
+
+SHINGLE_WORDS = 3        # Palabras por shingle
+MAX_HAMMING = 3          # SimHash a esta distancia o menos: mismo contenido (reformulado o repetido)
+MIN_NEW_SHINGLES = 8     # Menos shingles nuevos que esto: cambio irrelevante (muletillas, una frase suelta)
+
+# Muletillas que no cambian el contenido de lo dicho
+FILLER_WORDS = frozenset({
+    "eh", "ehh", "em", "emm", "mm", "mmm", "ah", "aja", "ajá", "este", "bueno", "pues", "o", "sea",
+    "vale", "ok", "okay", "sí", "si", "no", "claro", "digamos", "osea", "hablante",
+})
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set:
+    """Hashes (64 bits) de las secuencias de `size` palabras del texto, sin muletillas"""
+    words = [word for word in _WORD.findall(text.lower()) if word not in FILLER_WORDS and not word.isdigit()]
+    if len(words) < size:
+        words = words and [" ".join(words)]
+        size = 1
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(len(words) - size + 1)
+    }
+
+
+def simhash(hashes: set) -> int:
+    """SimHash de 64 bits de un conjunto de shingles"""
+    counts = [0] * 64
+    for value in hashes:
+        for bit in range(64):
+            counts[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if counts[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ChangeDetector:
+    """Recuerda el último texto analizado por clave (reunión + modo) y su resultado
+
+    Un análisis nuevo solo vale la pena si el texto difiere en contenido: no
+    basta con unas muletillas tras una pausa ni con volver a pulsar "Analizar".
+    Si la transcripción solo creció, cuenta el tamaño de lo añadido (shingles
+    nuevos); si se reescribió (p. ej. retranscrita), la distancia SimHash.
+    """
+
+    def __init__(self, max_hamming: int = MAX_HAMMING, min_new_shingles: int = MIN_NEW_SHINGLES):
+        self.max_hamming = max_hamming
+        self.min_new_shingles = min_new_shingles
+        self.entries = {}  # clave -> (texto, shingles, simhash, resultado)
+        self.stats = {"checked": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    def reusable(self, key: tuple, text: str) -> Optional[str]:
+        """Resultado anterior si `text` no trae cambios relevantes; None si hay que analizar"""
+        hashes = shingles(text)
+        with self._lock:
+            self.stats["checked"] += 1
+            entry = self.entries.get(key)
+            if entry is None or not hashes:
+                return None
+            previous_text, previous, previous_hash, result = entry
+            if len(hashes - previous) >= self.min_new_shingles and (
+                    text.startswith(previous_text) or hamming(simhash(hashes), previous_hash) > self.max_hamming):
+                return None
+            self.stats["skipped"] += 1
+            return result
+
+    def remember(self, key: tuple, text: str, result: str):
+        """Guarda el texto recién analizado y su resultado"""
+        hashes = shingles(text)
+        with self._lock:
+            self.entries[key] = (text, hashes, simhash(hashes), result)
+
+    def forget(self, session: str):
+        """Olvida las entradas de una reunión terminada"""
+        with self._lock:
+            for key in [key for key in self.entries if key[0] == session]:
+                del self.entries[key]
+
+    @property
+    def skip_rate(self) -> float:
+        with self._lock:
+            return self.stats["skipped"] / self.stats["checked"] if self.stats["checked"] else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats, skip_rate=round(self.stats["skipped"] / max(1, self.stats["checked"]), 3))
+
+
+# Detector compartido por todo el proceso
+change_detector = ChangeDetector()
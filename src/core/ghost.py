@@ -4,7 +4,8 @@ Usa Windows API para excluir la ventana de capturas
 """
 
 import sys
-from ctypes import windll, c_long
+import ctypes
+from ctypes import c_long
 
 # Constante de Windows API
 WDA_EXCLUDEFROMCAPTURE = 0x00000011
@@ -26,7 +27,7 @@ def enable_ghost_mode(hwnd: int) -> bool:
     
     try:
         # Obtener función SetWindowDisplayAffinity
-        user32 = windll.user32
+        user32 = ctypes.windll.user32
         result = user32.SetWindowDisplayAffinity(c_long(hwnd), WDA_EXCLUDEFROMCAPTURE)
         
         if result:
@@ -53,7 +54,7 @@ def disable_ghost_mode(hwnd: int) -> bool:
         return False
     
     try:
-        user32 = windll.user32
+        user32 = ctypes.windll.user32
         result = user32.SetWindowDisplayAffinity(c_long(hwnd), 0)
         
         if result:
@@ -0,0 +1,187 @@
+"""
+Módulo de Exportación e Importación del Historial
+Exporta reuniones a JSONL, CSV o Markdown reunión por reunión (memoria
+constante, sin cargar el historial entero) e importa JSONL/CSV por lotes
+transaccionales, omitiendo las reuniones que ya están (misma huella de contenido).
+"""
+
+import csv
+import io
+import json
+from pathlib import Path
+from typing import Callable, Optional
+
+from core.history_store import decode_usage, encode_usage
+
+# Campos exportados, en orden (también las columnas del CSV)
+EXPORT_FIELDS = ("id", "fecha", "titulo", "modo", "resumen_ia", "transcript_completo", "uso")
+
+# Formatos por extensión; Markdown solo se exporta (es para leer, no para volver a importar)
+FORMATS_BY_SUFFIX = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".md": "md", ".markdown": "md"}
+EXPORT_FORMATS = ("jsonl", "csv", "md")
+IMPORT_FORMATS = ("jsonl", "csv")
+
+IMPORT_BATCH_SIZE = 500  # Reuniones por transacción al importar
+
+# Las transcripciones largas superan el límite por defecto de un campo CSV (128 KB)
+csv.field_size_limit(2 ** 31 - 1)
+
+
+def format_for(path: Path, fmt: Optional[str] = None) -> str:
+    """Formato explícito o deducido de la extensión del archivo"""
+    fmt = fmt or FORMATS_BY_SUFFIX.get(Path(path).suffix.lower())
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato desconocido para {Path(path).name} (usa .jsonl, .csv o .md)")
+    return fmt
+
+
+def _csv_line(values: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def _jsonl_record(item: dict) -> str:
+    return json.dumps({field: item.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False) + "\n"
+
+
+def _csv_record(item: dict) -> str:
+    return _csv_line([encode_usage(item.get("uso")) or "" if field == "uso" else item.get(field, "")
+                      for field in EXPORT_FIELDS])
+
+
+def _markdown_record(item: dict) -> str:
+    return (
+        f"## {item.get('titulo') or 'Reunión'}\n\n"
+        f"- **Fecha:** {item.get('fecha', '')}\n"
+        f"- **Modo:** {item.get('modo', '')}\n\n"
+        f"### Resumen\n\n{item.get('resumen_ia', '').strip()}\n\n"
+        f"### Transcripción\n\n{item.get('transcript_completo', '').strip()}\n\n"
+        "---\n\n"
+    )
+
+
+# Formato -> (cabecera, una reunión como texto)
+WRITERS = {
+    "jsonl": ("", _jsonl_record),
+    "csv": (_csv_line(EXPORT_FIELDS), _csv_record),
+    "md": ("# Historial de reuniones - AI_FERRXOS\n\n", _markdown_record),
+}
+
+
+def export_lines(store, fmt: str = "jsonl", modo: Optional[str] = None, desde: Optional[str] = None,
+                 hasta: Optional[str] = None):
+    """Genera el export trozo a trozo: la cabecera (si el formato la tiene) y un trozo por reunión
+
+    Args:
+        store: HistoryStore de origen
+        fmt: "jsonl", "csv" o "md"
+        modo, desde, hasta: Filtros opcionales (ver `HistoryStore.iter_meetings`)
+    """
+    header, render = WRITERS[fmt]
+    if header:
+        yield header
+    for item in store.iter_meetings(modo=modo, desde=desde, hasta=hasta):
+        yield render(item)
+
+
+def export_to_file(store, path: Path, fmt: Optional[str] = None, **filters) -> int:
+    """Escribe el export en un archivo (aparece completo o no aparece)
+
+    Returns:
+        Número de reuniones exportadas
+    """
+    path = Path(path)
+    fmt = format_for(path, fmt)
+    tmp_path = path.with_name(path.name + ".tmp")
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        lines = export_lines(store, fmt, **filters)
+        if WRITERS[fmt][0]:
+            f.write(next(lines))
+        for text in lines:
+            f.write(text)
+            count += 1
+    tmp_path.replace(path)
+    print(f"✅ {count} reuniones exportadas a {path.name}")
+    return count
+
+
+def _normalize_record(data) -> Optional[dict]:
+    """Reunión importable a partir de una fila leída, o None si no lo es"""
+    if not isinstance(data, dict):
+        return None
+    item = {field: data.get(field) or "" for field in ("fecha", "titulo", "modo", "resumen_ia", "transcript_completo")}
+    if not all(isinstance(value, str) for value in item.values()):
+        return None
+    if not (item["resumen_ia"] or item["transcript_completo"]):
+        return None
+    uso = data.get("uso")
+    item["uso"] = decode_usage(uso) if isinstance(uso, str) else uso if isinstance(uso, dict) else None
+    return item
+
+
+def read_records(path: Path, fmt: Optional[str] = None):
+    """Lee reuniones de un JSONL o CSV, una a una
+
+    Yields:
+        Dict de la reunión, o None por cada línea/fila que no se pudo interpretar
+    """
+    path = Path(path)
+    fmt = format_for(path, fmt)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError("Solo se puede importar JSONL o CSV")
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield _normalize_record(row)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield _normalize_record(json.loads(line))
+            except ValueError:
+                yield None
+
+
+def import_file(store, path: Path, fmt: Optional[str] = None, batch_size: int = IMPORT_BATCH_SIZE,
+                on_imported: Optional[Callable] = None) -> dict:
+    """Importa un JSONL/CSV en lotes transaccionales, sin duplicar reuniones
+
+    Args:
+        store: HistoryStore de destino
+        batch_size: Reuniones por transacción
+        on_imported: Llamada (meeting_id, reunión) por cada reunión guardada (p. ej. para indexarla)
+
+    Returns:
+        {"read", "imported", "duplicates", "invalid"}
+    """
+    stats = {"read": 0, "imported": 0, "duplicates": 0, "invalid": 0}
+    batch = []
+
+    def flush():
+        for meeting_id, item in zip(store.add_many(batch), batch):
+            if meeting_id is None:
+                stats["duplicates"] += 1
+                continue
+            stats["imported"] += 1
+            if on_imported is not None:
+                on_imported(meeting_id, item)
+        batch.clear()
+
+    for item in read_records(path, fmt):
+        stats["read"] += 1
+        if item is None:
+            stats["invalid"] += 1
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    print(f"✅ Importadas {stats['imported']} reuniones de {Path(path).name} "
+          f"({stats['duplicates']} ya estaban, {stats['invalid']} inválidas)")
+    return stats
@@ -0,0 +1,781 @@
+"""
+Módulo de Almacenamiento del Historial
+SQLite en modo WAL: inserciones transaccionales, IDs estables, consultas paginadas
+y búsqueda de texto completo (FTS5)
+
+Cada reunión se guarda en dos partes: una fila ligera de metadatos (lo que muestra
+la tabla) y un cuerpo comprimido con el resumen y la transcripción, que solo se
+descomprime al abrir o copiar la reunión.
+
+Con un cifrador (`core.crypto`), cada campo del cuerpo se comprime y luego se
+cifra con AES-GCM por separado: abrir una reunión o generar los fragmentos de
+una búsqueda descifra solo los cuerpos que toca. El índice FTS5 guarda entonces
+huellas con clave de cada palabra en vez del texto: la búsqueda solo encuentra
+palabras completas (sin prefijos).
+"""
+
+import hashlib
+import json
+import lzma
+import re
+import sqlite3
+import threading
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Columnas ligeras que necesita la tabla del Historial
+META_COLUMNS = ("id", "fecha", "titulo", "modo")
+
+# Campos que viven en el cuerpo comprimido
+BODY_FIELDS = ("resumen_ia", "transcript_completo")
+
+# Marcadores de coincidencia en los fragmentos de búsqueda (la UI los convierte a HTML)
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# Pesos BM25 por columna: título, resumen, transcripción
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Compresores disponibles para los cuerpos: nombre -> (comprimir, descomprimir)
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+# Sufijo del códec de los cuerpos cifrados ("zlib+aesgcm")
+ENCRYPTED_SUFFIX = "+aesgcm"
+
+
+def encode_usage(uso) -> Optional[str]:
+    """Uso de una reunión (dict) como JSON para la columna `uso`"""
+    if not uso:
+        return None
+    return uso if isinstance(uso, str) else json.dumps(uso, separators=(",", ":"))
+
+
+def decode_usage(value: Optional[str]) -> Optional[dict]:
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def content_hash(item: dict) -> str:
+    """Huella del contenido de una reunión (fecha, título, modo, resumen y transcripción)
+
+    Dos reuniones con la misma huella son la misma; la importación la usa para no duplicar.
+    """
+    parts = [str(item.get(field) or "") for field in ("fecha", "titulo", "modo", *BODY_FIELDS)]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas y sin acentos (ñ -> n, á -> a), igual que el tokenizador de FTS5"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def build_match_query(query: str) -> str:
+    """Convierte texto libre en una consulta FTS5 segura (todas las palabras, por prefijo)"""
+    words = re.findall(r"\w+", fold_text(query))
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def make_snippet(text: str, words: list, max_tokens: int = 12) -> str:
+    """Fragmento alrededor de la primera coincidencia, con las palabras resaltadas
+
+    Args:
+        text: Texto original (con acentos)
+        words: Prefijos de búsqueda ya normalizados con `fold_text`
+        max_tokens: Palabras que incluye el fragmento
+    """
+    tokens = list(re.finditer(r"\w+", text))
+
+    def is_hit(token) -> bool:
+        folded = fold_text(token.group())
+        return any(folded.startswith(word) for word in words)
+
+    hit = next((i for i, token in enumerate(tokens) if is_hit(token)), None)
+    if hit is None:
+        return ""
+
+    start = max(0, hit - max_tokens // 3)
+    end = min(len(tokens), start + max_tokens)
+    parts = ["…" if start > 0 else ""]
+    position = tokens[start].start()
+    for token in tokens[start:end]:
+        parts.append(text[position:token.start()])
+        if is_hit(token):
+            parts.append(f"{HIGHLIGHT_START}{token.group()}{HIGHLIGHT_END}")
+        else:
+            parts.append(token.group())
+        position = token.end()
+    parts.append("…" if end < len(tokens) else "")
+    return "".join(parts)
+
+
+class HistoryStore:
+    """Historial de reuniones persistido en SQLite"""
+
+    SCHEMA_VERSION = 5
+
+    def __init__(self, db_path: Path, legacy_json_path: Optional[Path] = None,
+                 codec: str = "zlib", body_cache_size: int = 16, cipher=None):
+        """Abre (o crea) la base de datos del historial
+
+        Args:
+            db_path: Ruta del archivo SQLite
+            legacy_json_path: history.json antiguo a migrar una sola vez (opcional)
+            codec: Compresor para los cuerpos nuevos ("zlib" o "lzma")
+            body_cache_size: Cuerpos descomprimidos que se mantienen en memoria (LRU)
+            cipher: RecordCipher para cifrar los cuerpos (opcional); los cuerpos en
+                claro que ya existían se cifran al abrir
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+        self.body_cache_size = body_cache_size
+        self.cipher = cipher
+        self._body_cache = OrderedDict()
+        self._lock = threading.RLock()
+
+        # Una sola conexión compartida entre hilos, serializada con el lock
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if cipher is not None:
+            # Las páginas liberadas se sobrescriben: no quedan restos en claro
+            self.conn.execute("PRAGMA secure_delete=ON")
+        self.fts_available = self._fts5_supported()
+        self._create_schema()
+
+        if legacy_json_path is not None:
+            self.migrate_from_json(Path(legacy_json_path))
+        if cipher is not None:
+            self.encrypt_existing()
+
+    def _fts5_supported(self) -> bool:
+        """Indica si el SQLite embebido incluye FTS5"""
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+            self.conn.execute("DROP TABLE temp.fts5_probe")
+            return True
+        except sqlite3.OperationalError:
+            print("⚠️ SQLite sin FTS5 - la búsqueda será secuencial")
+            return False
+
+    def _create_schema(self):
+        """Crea las tablas si no existen y aplica migraciones de esquema"""
+        with self._lock:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version in (1, 2):
+                self._migrate_to_split_bodies()
+            elif version in (3, 4):
+                if version == 3:
+                    self._migrate_add_usage()
+                self._migrate_add_hash()
+            else:
+                with self.conn:
+                    self._create_tables()
+                    self.conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+            self._ensure_fts_index()
+
+    @property
+    def _fts_terms(self) -> str:
+        """Qué guarda el índice FTS5: "plain" (el texto) o "keyed" (huellas con clave, con cifrado)"""
+        return "keyed" if self.cipher is not None else "plain"
+
+    def _index_text(self, text: str) -> str:
+        """Texto tal como va al índice FTS5 (ver `_fts_terms`)"""
+        if self.cipher is None:
+            return text or ""
+        return " ".join(self.cipher.term(word) for word in re.findall(r"\w+", fold_text(text or "")))
+
+    def _match_query(self, query: str) -> str:
+        """Consulta FTS5 para `query`: por prefijo en claro, por palabra completa con huellas"""
+        if self.cipher is None:
+            return build_match_query(query)
+        return " ".join(f'"{self.cipher.term(word)}"' for word in re.findall(r"\w+", fold_text(query)))
+
+    def _ensure_fts_index(self):
+        """Crea y llena el índice FTS5 si falta, no cubre todas las reuniones o es de otro tipo
+
+        Pasa con una base creada (o usada) con un SQLite sin FTS5 y abierta después
+        con uno que sí lo trae, y al activar el cifrado (el índice en claro pasa a
+        huellas). En cualquier otro caso abrir la base no descifra ningún cuerpo.
+        """
+        if not self.fts_available:
+            return
+        with self.conn:
+            self._create_tables()
+        total = self.conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+        indexed = self.conn.execute("SELECT COUNT(*) FROM meetings_fts_docsize").fetchone()[0]
+        kind = self.conn.execute("SELECT value FROM store_meta WHERE key = 'fts_terms'").fetchone()
+        # Los índices anteriores a `store_meta` son siempre en claro
+        if indexed == total and (kind[0] if kind else "plain") == self._fts_terms:
+            return
+
+        unreadable = 0
+        try:
+            with self._migration():
+                self.conn.execute("DROP TABLE IF EXISTS meetings_fts")
+                self._create_tables()
+                rows = self.conn.execute(
+                    "SELECT m.id, m.titulo, b.codec, b.resumen_ia, b.transcript_completo "
+                    "FROM meetings m JOIN meeting_bodies b ON b.meeting_id = m.id"
+                ).fetchall()
+                for row in rows:
+                    try:
+                        bodies = [self._decode(row["codec"], row[field], row["id"], field) for field in BODY_FIELDS]
+                    except (ValueError, zlib.error, lzma.LZMAError):
+                        bodies = ["", ""]  # Cuerpo dañado: la reunión se encuentra solo por el título
+                        unreadable += 1
+                    self.conn.execute(
+                        "INSERT INTO meetings_fts (rowid, titulo, resumen_ia, transcript_completo) "
+                        "VALUES (?, ?, ?, ?)",
+                        (row["id"], *(self._index_text(text) for text in (row["titulo"], *bodies))),
+                    )
+                if unreadable and unreadable == len(rows):
+                    # Ninguno se abre: clave distinta o ausente; mejor el índice que había
+                    raise ValueError("ningún cuerpo se pudo descifrar con esta clave")
+                self._set_fts_terms()
+        except ValueError as e:
+            print(f"⚠️ No se reconstruye el índice de búsqueda: {e}")
+            return
+        if unreadable:
+            print(f"⚠️ {unreadable} reuniones ilegibles quedaron en el índice solo por su título")
+        if total:
+            print(f"🔎 Índice de búsqueda reconstruido ({total} reuniones)")
+
+    def _set_fts_terms(self):
+        """Anota qué guarda el índice FTS5 (dentro de la transacción que lo llenó)"""
+        self.conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('fts_terms', ?)",
+                          (self._fts_terms,))
+
+    def _create_tables(self):
+        """Metadatos, cuerpos comprimidos e índice FTS5 sin contenido"""
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS meetings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                legacy_id TEXT,
+                fecha TEXT NOT NULL,
+                titulo TEXT NOT NULL,
+                modo TEXT NOT NULL,
+                uso TEXT,
+                hash TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_fecha ON meetings(fecha)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_hash ON meetings(hash)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS meeting_bodies (
+                meeting_id INTEGER PRIMARY KEY REFERENCES meetings(id) ON DELETE CASCADE,
+                codec TEXT NOT NULL,
+                resumen_ia BLOB NOT NULL,
+                transcript_completo BLOB NOT NULL
+            )
+        """)
+        # Datos de la propia base (p. ej. qué guarda el índice FTS5)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if self.fts_available:
+            # Sin contenido: el índice no duplica el texto; los fragmentos se
+            # generan a partir de los cuerpos de los resultados
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS meetings_fts USING fts5(
+                    titulo, resumen_ia, transcript_completo,
+                    content='',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+
+    @contextmanager
+    def _migration(self):
+        """Transacción explícita (BEGIN IMMEDIATE ... COMMIT) que también cubre CREATE/DROP/ALTER
+
+        En su modo implícito, sqlite3 ejecuta esas sentencias fuera de la
+        transacción: un corte a mitad de una migración perdería el historial.
+        """
+        previous = self.conn.isolation_level
+        self.conn.isolation_level = None
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        finally:
+            self.conn.isolation_level = previous
+
+    def _migrate_to_split_bodies(self):
+        """Esquema 1/2 -> 3: separa los cuerpos de los metadatos y los comprime
+
+        Todo ocurre en una transacción: la tabla antigua se renombra, se copia con
+        INSERT ... SELECT (comprimiendo y cifrando en SQL) y solo al final se borra.
+        """
+        self.conn.create_function("history_encode", 3, lambda text, meeting_id, field:
+                                  self._encode(text or "", meeting_id, field))
+        self.conn.create_function("history_hash", 5, lambda fecha, titulo, modo, resumen, transcript: content_hash({
+            "fecha": fecha, "titulo": titulo, "modo": modo, "resumen_ia": resumen, "transcript_completo": transcript,
+        }))
+        self.conn.create_function("history_terms", 1, self._index_text)
+        with self._migration():
+            for trigger in ("meetings_ai", "meetings_ad", "meetings_au"):
+                self.conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self.conn.execute("DROP TABLE IF EXISTS meetings_fts")
+            self.conn.execute("DROP INDEX IF EXISTS idx_meetings_fecha")
+            self.conn.execute("ALTER TABLE meetings RENAME TO meetings_v2")
+            old_seq = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'meetings_v2'").fetchone()
+
+            self._create_tables()
+            count = self.conn.execute(
+                "INSERT INTO meetings (id, legacy_id, fecha, titulo, modo, hash) "
+                "SELECT id, legacy_id, fecha, titulo, modo, "
+                "history_hash(fecha, titulo, modo, resumen_ia, transcript_completo) FROM meetings_v2"
+            ).rowcount
+            self.conn.execute(
+                "INSERT INTO meeting_bodies (meeting_id, codec, resumen_ia, transcript_completo) "
+                "SELECT id, ?, history_encode(resumen_ia, id, 'resumen_ia'), "
+                "history_encode(transcript_completo, id, 'transcript_completo') FROM meetings_v2",
+                (self._body_codec(),),
+            )
+            if self.fts_available:
+                self.conn.execute(
+                    "INSERT INTO meetings_fts (rowid, titulo, resumen_ia, transcript_completo) "
+                    "SELECT id, history_terms(titulo), history_terms(resumen_ia), "
+                    "history_terms(transcript_completo) FROM meetings_v2"
+                )
+                self._set_fts_terms()
+            if old_seq:
+                # IDs estables: no reutilizar los de reuniones ya borradas
+                self.conn.execute("DELETE FROM sqlite_sequence WHERE name = 'meetings'")
+                self.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('meetings', ?)", (old_seq[0],))
+            self.conn.execute("DROP TABLE meetings_v2")
+            self.conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+
+        # Recuperar el espacio del texto sin comprimir
+        self.conn.execute("VACUUM")
+        print(f"✅ Historial convertido a cuerpos comprimidos ({count} reuniones)")
+
+    def _migrate_add_usage(self):
+        """Esquema 3 -> 4: columna `uso` (JSON con tokens y segundos de audio por reunión)"""
+        with self._migration():
+            self.conn.execute("ALTER TABLE meetings ADD COLUMN uso TEXT")
+            self.conn.execute("PRAGMA user_version=4")
+
+    def _migrate_add_hash(self):
+        """Esquema 4 -> 5: columna `hash` (huella del contenido, para importar sin duplicar)"""
+        with self._migration():
+            self.conn.execute("ALTER TABLE meetings ADD COLUMN hash TEXT")
+            rows = self.conn.execute(
+                "SELECT m.id, m.fecha, m.titulo, m.modo, b.codec, b.resumen_ia, b.transcript_completo "
+                "FROM meetings m JOIN meeting_bodies b ON b.meeting_id = m.id"
+            )
+            for row in rows.fetchall():
+                item = dict(row)
+                for field in BODY_FIELDS:
+                    item[field] = self._decode(row["codec"], row[field], row["id"], field)
+                self.conn.execute("UPDATE meetings SET hash = ? WHERE id = ?", (content_hash(item), row["id"]))
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_meetings_hash ON meetings(hash)")
+            self.conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """Importa un history.json antiguo (una sola vez) y lo renombra
+
+        Si el renombrado falla, el siguiente arranque no duplica nada: las reuniones
+        cuyo `id` antiguo ya está en `legacy_id` se omiten (las que no tienen `id`,
+        si su huella ya está en el historial).
+
+        Returns:
+            Número de reuniones migradas
+        """
+        if not json_path.exists():
+            return 0
+
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer {json_path.name} para migrar: {e}")
+            return 0
+        if not isinstance(items, list):
+            print(f"⚠️ {json_path.name} no contiene una lista de reuniones - no se migra")
+            return 0
+
+        migrated = skipped = 0
+        with self._lock, self.conn:
+            # Los IDs antiguos ("uuid-003") se podían repetir: se cuentan, no solo se buscan
+            already = Counter(row[0] for row in self.conn.execute(
+                "SELECT legacy_id FROM meetings WHERE legacy_id IS NOT NULL"))
+            for item in items:
+                if not isinstance(item, dict):
+                    skipped += 1
+                    continue
+                legacy_id = item.get("legacy_id") or item.get("id")
+                digest = content_hash(item)  # Como viene en el archivo (ver `add_many`)
+                if isinstance(legacy_id, str):
+                    if already[legacy_id]:
+                        already[legacy_id] -= 1
+                        continue
+                elif self.conn.execute("SELECT 1 FROM meetings WHERE hash = ?", (digest,)).fetchone():
+                    continue
+                self._insert(item, digest=digest)
+                migrated += 1
+
+        try:
+            if self.cipher is not None:
+                # Ya está cifrado en la base: no dejar una copia en claro
+                json_path.unlink()
+            else:
+                json_path.replace(json_path.with_name(json_path.name + ".migrated"))
+        except OSError as e:
+            print(f"⚠️ No se pudo retirar {json_path.name} (se reintentará sin duplicar): {e}")
+        print(f"✅ Historial migrado a SQLite ({migrated} reuniones"
+              + (f", {skipped} entradas inválidas omitidas)" if skipped else ")"))
+        return migrated
+
+    def encrypt_existing(self, batch_size: int = 200) -> int:
+        """Cifra los cuerpos guardados en claro (historiales anteriores al cifrado)
+
+        Returns:
+            Número de reuniones cifradas
+        """
+        converted = 0
+        while True:
+            with self._lock, self.conn:
+                rows = self.conn.execute(
+                    "SELECT * FROM meeting_bodies WHERE codec NOT LIKE ? LIMIT ?",
+                    (f"%{ENCRYPTED_SUFFIX}", batch_size),
+                ).fetchall()
+                for row in rows:
+                    meeting_id = row["meeting_id"]
+                    encoded = [
+                        self._encode(self._decode(row["codec"], row[field], meeting_id, field), meeting_id, field)
+                        for field in BODY_FIELDS
+                    ]
+                    self.conn.execute(
+                        "UPDATE meeting_bodies SET codec = ?, resumen_ia = ?, transcript_completo = ? "
+                        "WHERE meeting_id = ?",
+                        (self._body_codec(), *encoded, meeting_id),
+                    )
+            converted += len(rows)
+            if len(rows) < batch_size:
+                break
+
+        if converted:
+            # Reescribir la base para que no queden páginas antiguas con el texto en claro
+            with self._lock:
+                self.conn.execute("VACUUM")
+            print(f"🔐 Historial cifrado ({converted} reuniones)")
+        return converted
+
+    def _body_codec(self) -> str:
+        return self.codec + ENCRYPTED_SUFFIX if self.cipher is not None else self.codec
+
+    def _encode(self, text: str, meeting_id: int, field: str) -> bytes:
+        """Comprime (y cifra, si hay cifrador) un campo del cuerpo"""
+        compress, _ = CODECS[self.codec]
+        blob = compress(text.encode("utf-8"))
+        if self.cipher is not None:
+            blob = self.cipher.encrypt(blob, f"{meeting_id}:{field}")
+        return blob
+
+    def _decode(self, codec: str, blob: bytes, meeting_id: int, field: str) -> str:
+        """Inversa de `_encode` según el códec guardado en la fila"""
+        if codec.endswith(ENCRYPTED_SUFFIX):
+            if self.cipher is None:
+                raise ValueError("Historial cifrado: falta la clave (ferrxos.key)")
+            blob = self.cipher.decrypt(blob, f"{meeting_id}:{field}")
+            codec = codec[:-len(ENCRYPTED_SUFFIX)]
+        _, decompress = CODECS[codec]
+        return decompress(blob).decode("utf-8")
+
+    def _insert(self, item: dict, meeting_id: Optional[int] = None, digest: Optional[str] = None) -> int:
+        """Inserta metadatos, cuerpo e índice (debe llamarse dentro de una transacción)
+
+        Args:
+            digest: Huella a guardar (por defecto, la del item con la fecha ya rellenada)
+        """
+        legacy_id = item.get("legacy_id") or item.get("id")
+        item = dict(item, fecha=item.get("fecha") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        cursor = self.conn.execute(
+            "INSERT INTO meetings (id, legacy_id, fecha, titulo, modo, uso, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                meeting_id,
+                legacy_id if isinstance(legacy_id, str) else None,
+                item["fecha"],
+                item.get("titulo", ""),
+                item.get("modo", ""),
+                encode_usage(item.get("uso")),
+                digest or content_hash(item),
+            ),
+        )
+        meeting_id = cursor.lastrowid
+        resumen = item.get("resumen_ia", "") or ""
+        transcript = item.get("transcript_completo", "") or ""
+
+        self.conn.execute(
+            "INSERT INTO meeting_bodies (meeting_id, codec, resumen_ia, transcript_completo) "
+            "VALUES (?, ?, ?, ?)",
+            (meeting_id, self._body_codec(), self._encode(resumen, meeting_id, "resumen_ia"),
+             self._encode(transcript, meeting_id, "transcript_completo")),
+        )
+        if self.fts_available:
+            self.conn.execute(
+                "INSERT INTO meetings_fts (rowid, titulo, resumen_ia, transcript_completo) "
+                "VALUES (?, ?, ?, ?)",
+                (meeting_id, *(self._index_text(text) for text in (item.get("titulo", ""), resumen, transcript))),
+            )
+        return meeting_id
+
+    def add(self, titulo: str, modo: str, resumen_ia: str, transcript_completo: str,
+            fecha: Optional[str] = None, uso: Optional[dict] = None, legacy_id: Optional[str] = None) -> int:
+        """Guarda una reunión en una transacción; el costo no depende del tamaño del historial
+
+        Args:
+            uso: Peticiones, tokens y segundos de audio gastados en la reunión (opcional)
+            legacy_id: Identificador externo (p. ej. el trabajo de la cola que la generó), ver `find_legacy`
+
+        Returns:
+            ID estable asignado (nunca se reutiliza, aunque se borren reuniones)
+        """
+        item = {
+            "fecha": fecha,
+            "titulo": titulo,
+            "modo": modo,
+            "resumen_ia": resumen_ia,
+            "transcript_completo": transcript_completo,
+            "uso": uso,
+            "legacy_id": legacy_id,
+        }
+        with self._lock, self.conn:
+            return self._insert(item)
+
+    def find_legacy(self, legacy_id: str) -> Optional[int]:
+        """ID de la reunión guardada con ese identificador externo (None si no está)"""
+        with self._lock:
+            row = self.conn.execute("SELECT id FROM meetings WHERE legacy_id = ? LIMIT 1", (legacy_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_many(self, items: list) -> list:
+        """Guarda un lote de reuniones en una sola transacción, sin duplicados
+
+        Se omiten las reuniones cuya huella (`content_hash`) ya está en el historial
+        o repetida dentro del lote. La huella se calcula sobre la reunión tal como
+        llega (sin fecha, si no la trae): al reimportar el mismo archivo coincide.
+
+        Returns:
+            ID asignado a cada reunión, en el mismo orden (None si era duplicada)
+        """
+        hashes = [content_hash(item) for item in items]
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        items = [dict(item, fecha=item.get("fecha") or now) for item in items]
+        ids = []
+        with self._lock, self.conn:
+            seen = set()
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), 500):  # Límite de parámetros de SQLite
+                chunk = unique[start:start + 500]
+                seen.update(row[0] for row in self.conn.execute(
+                    f"SELECT hash FROM meetings WHERE hash IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+            for item, digest in zip(items, hashes):
+                if digest in seen:
+                    ids.append(None)
+                    continue
+                seen.add(digest)
+                ids.append(self._insert(item, digest=digest))
+        return ids
+
+    def get_body(self, meeting_id: int) -> Optional[dict]:
+        """Resumen y transcripción de una reunión (descifrados y descomprimidos, con caché LRU)"""
+        with self._lock:
+            if meeting_id in self._body_cache:
+                self._body_cache.move_to_end(meeting_id)
+                return self._body_cache[meeting_id]
+
+            row = self.conn.execute(
+                "SELECT * FROM meeting_bodies WHERE meeting_id = ?", (meeting_id,)
+            ).fetchone()
+            if not row:
+                return None
+
+            body = {field: self._decode(row["codec"], row[field], meeting_id, field) for field in BODY_FIELDS}
+            self._body_cache[meeting_id] = body
+            if len(self._body_cache) > self.body_cache_size:
+                self._body_cache.popitem(last=False)
+            return body
+
+    def get(self, meeting_id: int) -> Optional[dict]:
+        """Obtiene una reunión completa por ID"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM meetings WHERE id = ?", (meeting_id,)
+            ).fetchone()
+            if not row:
+                return None
+            item = dict(row)
+            item["uso"] = decode_usage(item.get("uso"))
+            item.update(self.get_body(meeting_id) or {field: "" for field in BODY_FIELDS})
+        return item
+
+    def page(self, offset: int = 0, limit: int = 100) -> list:
+        """Página de reuniones (más recientes primero) con solo las columnas de la tabla"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(META_COLUMNS)} FROM meetings ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def ids(self) -> list:
+        """IDs de todas las reuniones, en orden ascendente"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT id FROM meetings ORDER BY id")]
+
+    def iter_meetings(self, after_id: int = 0, batch_size: int = 50, modo: Optional[str] = None,
+                      desde: Optional[str] = None, hasta: Optional[str] = None):
+        """Recorre reuniones completas en orden de ID, por lotes (memoria constante)
+
+        Los cuerpos se descomprimen uno a uno y no pasan por la caché LRU.
+
+        Args:
+            modo: Solo reuniones de este modo (sin distinguir mayúsculas)
+            desde: Solo reuniones con fecha >= "AAAA-MM-DD" (o un prefijo más largo)
+            hasta: Solo reuniones con fecha <= "AAAA-MM-DD" (el día completo incluido)
+        """
+        filters = ""
+        params = []
+        if modo:
+            filters += " AND UPPER(m.modo) = UPPER(?)"
+            params.append(modo)
+        if desde:
+            filters += " AND m.fecha >= ?"
+            params.append(desde)
+        if hasta:
+            filters += " AND m.fecha <= ?"
+            params.append(hasta + "\uffff")  # Cualquier hora de ese día
+
+        last_id = after_id
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT m.*, b.codec, b.resumen_ia, b.transcript_completo "
+                    "FROM meetings m JOIN meeting_bodies b ON b.meeting_id = m.id "
+                    f"WHERE m.id > ?{filters} ORDER BY m.id LIMIT ?",
+                    (last_id, *params, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                item = {key: row[key] for key in row.keys() if key not in BODY_FIELDS and key != "codec"}
+                item["uso"] = decode_usage(item.get("uso"))
+                for field in BODY_FIELDS:
+                    item[field] = self._decode(row["codec"], row[field], row["id"], field)
+                yield item
+            last_id = rows[-1]["id"]
+
+    def search(self, query: str, limit: int = 100) -> list:
+        """Búsqueda de texto completo ordenada por relevancia
+
+        Ignora mayúsculas y acentos, y cada palabra coincide por prefijo
+        ("reunion" encuentra "Reunión", "presupuest" encuentra "presupuestos").
+        Solo se descifran y descomprimen los cuerpos de los resultados.
+
+        Returns:
+            Lista de dicts con las columnas de la tabla más `snippet`, donde las
+            coincidencias van entre HIGHLIGHT_START y HIGHLIGHT_END
+        """
+        match = self._match_query(query)
+        if not match:
+            return []
+
+        if not self.fts_available:
+            return self._search_scan(query, limit)
+
+        weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+        with self._lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT m.id, m.fecha, m.titulo, m.modo
+                FROM meetings_fts
+                JOIN meetings m ON m.id = meetings_fts.rowid
+                WHERE meetings_fts MATCH ?
+                ORDER BY bm25(meetings_fts, {weights})
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+            results = [dict(row) for row in rows]
+            for item in results:
+                item["snippet"] = self._snippet_for(item, query)
+        return results
+
+    def _snippet_for(self, item: dict, query: str) -> str:
+        """Fragmento resaltado del primer campo que contiene la búsqueda"""
+        words = re.findall(r"\w+", fold_text(query))
+        try:
+            body = self.get_body(item["id"]) or {}
+        except ValueError:
+            body = {}  # Cuerpo ilegible (clave distinta): el resultado se lista sin fragmento
+        for text in (body.get("resumen_ia", ""), body.get("transcript_completo", ""), item["titulo"]):
+            snippet = make_snippet(text, words)
+            if snippet:
+                return snippet
+        return ""
+
+    def _search_scan(self, query: str, limit: int) -> list:
+        """Búsqueda secuencial de respaldo cuando SQLite no trae FTS5"""
+        words = re.findall(r"\w+", fold_text(query))
+        results = []
+        with self._lock:
+            for row in self.conn.execute(f"SELECT {', '.join(META_COLUMNS)} FROM meetings ORDER BY id DESC").fetchall():
+                item = dict(row)
+                try:
+                    body = self.get_body(item["id"]) or {}
+                except ValueError:
+                    body = {}
+                text = fold_text(" ".join([item["titulo"], *body.values()]))
+                if all(word in text for word in words):
+                    item["snippet"] = self._snippet_for(item, query)
+                    results.append(item)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def count(self) -> int:
+        """Número total de reuniones"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+
+    def delete(self, meeting_id: int) -> bool:
+        """Borra una reunión"""
+        with self._lock, self.conn:
+            item = self.get(meeting_id)
+            if not item:
+                return False
+            if self.fts_available:
+                # Un índice sin contenido necesita los valores originales para borrar
+                self.conn.execute(
+                    "INSERT INTO meetings_fts (meetings_fts, rowid, titulo, resumen_ia, transcript_completo) "
+                    "VALUES ('delete', ?, ?, ?, ?)",
+                    (meeting_id, *(self._index_text(item[field]) for field in ("titulo", *BODY_FIELDS))),
+                )
+            self.conn.execute("DELETE FROM meeting_bodies WHERE meeting_id = ?", (meeting_id,))
+            self.conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+            self._body_cache.pop(meeting_id, None)
+        return True
+
+    def close(self):
+        """Cierra la conexión"""
+        with self._lock:
+            self.conn.close()
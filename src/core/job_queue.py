@@ -0,0 +1,414 @@
+"""
+Módulo de Cola de Trabajos Persistente
+Transcripciones y análisis pendientes guardados en SQLite (con el audio en
+disco), para que un corte de red o una cuota agotada a mitad de reunión no
+pierda nada: los trabajos sobreviven a reinicios y se procesan por lotes en
+cuanto la API vuelve a responder.
+
+Con un cifrador (`core.crypto`), la carga de cada trabajo (transcripción,
+título...) y su audio en disco se guardan cifrados con AES-GCM.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+JOB_TRANSCRIBE = "transcribe"
+JOB_ANALYZE = "analyze"
+
+# Estados de un trabajo
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+LEASE_SECONDS = 600        # Un trabajo "running" sin terminar tras esto se reintenta (hilo colgado)
+MAX_BACKOFF_SECONDS = 300
+MAX_ATTEMPTS = 50          # Tras tantos errores transitorios seguidos, se marca como fallido
+
+SEALED_PREFIX = "aesgcm:"  # Carga cifrada en la columna `payload`
+SEALED_SUFFIX = ".sealed"  # Audio cifrado en la carpeta de la cola (en claro: .pcm)
+
+
+class JobQueue:
+    """Cola de trabajos en SQLite; el audio de cada trabajo va en un archivo aparte"""
+
+    def __init__(self, db_path: Path, spool_dir: Optional[Path] = None, cipher=None):
+        """
+        Args:
+            db_path: Archivo SQLite de la cola
+            spool_dir: Carpeta del audio pendiente (por defecto, "<db>_audio" junto a la base)
+            cipher: RecordCipher para cifrar cargas y audio (opcional)
+        """
+        self.cipher = cipher
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.spool_dir = Path(spool_dir) if spool_dir else self.db_path.with_name(self.db_path.stem + "_audio")
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")  # Un trabajo encolado no se pierde ni con un corte de luz
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    kind TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    payload_path TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    not_before REAL NOT NULL DEFAULT 0,
+                    lease_until REAL NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    result TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(state, not_before)")
+            # La cola es de un solo proceso: lo que estaba en curso al cerrar se reintenta ya
+            recovered = self.conn.execute("UPDATE jobs SET state = ?, not_before = 0 WHERE state = ?",
+                                          (PENDING, RUNNING)).rowcount
+        if recovered:
+            print(f"🔁 {recovered} trabajos interrumpidos vuelven a la cola")
+
+    def enqueue(self, kind: str, payload: dict, audio: Optional[bytes] = None, key: Optional[str] = None,
+                payload_path: Optional[str] = None) -> int:
+        """Encola un trabajo; con la misma `key` no se duplica (devuelve el existente)
+
+        Args:
+            audio: PCM a guardar en disco como carga del trabajo
+            payload_path: Carga ya guardada por otro trabajo (p. ej. la transcripción que lo encadena)
+        """
+        key = key or uuid.uuid4().hex
+        with self._lock:
+            row = self.conn.execute("SELECT id FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row:
+                return row["id"]
+            if audio is not None:
+                if self.cipher is not None:
+                    path = self.spool_dir / f"{key}{SEALED_SUFFIX}"
+                    audio = self.cipher.encrypt(audio, f"audio:{key}")
+                else:
+                    path = self.spool_dir / f"{key}.pcm"
+                with open(path, "wb") as f:
+                    f.write(audio)
+                    f.flush()
+                    os.fsync(f.fileno())
+                payload_path = str(path)
+            now = time.time()
+            with self.conn:
+                cursor = self.conn.execute(
+                    "INSERT INTO jobs (key, kind, state, payload, payload_path, created, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, PENDING, self._seal_payload(payload, key), payload_path, now, now),
+                )
+            return cursor.lastrowid
+
+    def claim(self, limit: int, lease_seconds: float = LEASE_SECONDS) -> list:
+        """Toma hasta `limit` trabajos listos (incluidos los que quedaron a medias al cerrar la app)"""
+        now = time.time()
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE (state = ? AND not_before <= ?) OR (state = ? AND lease_until < ?) "
+                "ORDER BY id LIMIT ?",
+                (PENDING, now, RUNNING, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, lease_until = ?, updated = ? WHERE id = ?",
+                [(RUNNING, now + lease_seconds, now, row["id"]) for row in rows],
+            )
+        jobs = []
+        for row in rows:
+            try:
+                jobs.append(self._to_job(row))
+            except ValueError as e:
+                # Carga ilegible (clave distinta o datos dañados): reintentarla no sirve
+                self.fail(row["id"], f"❌ {e}")
+                print(f"❌ Trabajo {row['id']} ilegible: {e}")
+        return jobs
+
+    def complete(self, job_id: int, result: Optional[dict] = None, release_payload: bool = True) -> bool:
+        """Marca un trabajo como hecho (idempotente: la segunda vez no cambia nada)
+
+        Args:
+            release_payload: Borrar el audio del trabajo (False si lo hereda otro trabajo)
+
+        Returns:
+            True si el trabajo pasó a "done" en esta llamada
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT state, payload_path FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] == DONE:
+                return False
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, result = ?, last_error = NULL, updated = ? WHERE id = ?",
+                    (DONE, json.dumps(result or {}, ensure_ascii=False), time.time(), job_id),
+                )
+        if release_payload and row["payload_path"]:
+            Path(row["payload_path"]).unlink(missing_ok=True)
+        return True
+
+    def retry(self, job_id: int, error: str, delay: Optional[float] = None) -> float:
+        """Devuelve un trabajo a la cola tras un error transitorio (espera exponencial)
+
+        Returns:
+            Segundos hasta el siguiente intento (0 si se marcó como fallido)
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return 0.0
+            attempts = row["attempts"] + 1
+            if attempts >= MAX_ATTEMPTS:
+                self.fail(job_id, error)
+                return 0.0
+            if delay is None:
+                delay = min(MAX_BACKOFF_SECONDS, 5.0 * 2 ** min(attempts - 1, 10)) * random.uniform(0.8, 1.2)
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = ?, not_before = ?, last_error = ?, updated = ? "
+                    "WHERE id = ? AND state != ?",
+                    (PENDING, attempts, time.time() + delay, error, time.time(), job_id, DONE),
+                )
+            return delay
+
+    def fail(self, job_id: int, error: str):
+        """Error permanente: el trabajo (y su audio) se conservan para revisarlos o reencolarlos"""
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE jobs SET state = ?, last_error = ?, updated = ? WHERE id = ? AND state != ?",
+                              (FAILED, error, time.time(), job_id, DONE))
+
+    def requeue_failed(self) -> int:
+        """Vuelve a poner en cola los trabajos fallidos"""
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, not_before = 0, updated = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED),
+            ).rowcount
+
+    def release_backoff(self) -> int:
+        """La API volvió: los pendientes en espera pasan a estar listos ya"""
+        with self._lock, self.conn:
+            return self.conn.execute("UPDATE jobs SET not_before = 0 WHERE state = ? AND not_before > ?",
+                                     (PENDING, time.time())).rowcount
+
+    def next_ready_in(self) -> Optional[float]:
+        """Segundos hasta que haya un trabajo listo (None si la cola está vacía)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MIN(CASE WHEN state = ? THEN not_before ELSE lease_until END) FROM jobs WHERE state IN (?, ?)",
+                (PENDING, PENDING, RUNNING),
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def load_audio(self, job: dict) -> bytes:
+        path = Path(job["payload_path"])
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.suffix == SEALED_SUFFIX:
+            if self.cipher is None:
+                raise ValueError("Audio en cola cifrado: falta la clave (ferrxos.key)")
+            # Un análisis encadenado hereda el audio: el contexto es la clave del trabajo que lo guardó
+            data = self.cipher.decrypt(data, f"audio:{path.stem}")
+        return data
+
+    def counts(self) -> dict:
+        """Trabajos por estado"""
+        with self._lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({state: count for state, count in rows})
+        return counts
+
+    def purge_done(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """Borra los trabajos terminados hace tiempo"""
+        with self._lock, self.conn:
+            return self.conn.execute("DELETE FROM jobs WHERE state = ? AND updated < ?",
+                                     (DONE, time.time() - older_than_seconds)).rowcount
+
+    def _seal_payload(self, payload: dict, key: str) -> str:
+        text = json.dumps(payload, ensure_ascii=False)
+        if self.cipher is None:
+            return text
+        return SEALED_PREFIX + self.cipher.seal_text(text, f"carga:{key}")
+
+    def _to_job(self, row: sqlite3.Row) -> dict:
+        job = dict(row)
+        payload = job["payload"]
+        if payload.startswith(SEALED_PREFIX):
+            if self.cipher is None:
+                raise ValueError("Cola cifrada: falta la clave (ferrxos.key)")
+            payload = self.cipher.open_text(payload[len(SEALED_PREFIX):], f"carga:{job['key']}")
+        job["payload"] = json.loads(payload)
+        return job
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class JobRunner:
+    """Procesa la cola en segundo plano con el pool y el límite de peticiones del pipeline
+
+    Ante un error transitorio (red, 429, 503) el trabajo vuelve a la cola con
+    espera exponencial y la cola entera se pausa hasta ese momento (no se martillea
+    la API con el lote). En cuanto un trabajo sale bien, se liberan todas las
+    esperas y el atraso se vacía a pleno ritmo.
+    """
+
+    def __init__(self, queue: JobQueue, pipeline, on_saved: Optional[Callable] = None,
+                 batch_size: Optional[int] = None, poll_seconds: float = 30.0):
+        """
+        Args:
+            queue: Cola persistente
+            pipeline: MeetingPipeline (pool, límite de peticiones e historial donde guardar)
+            on_saved: Callback(meeting_id, job, audio_bytes | None) al guardar una reunión encolada
+            batch_size: Trabajos en curso como máximo (por defecto, 2 por hilo del pipeline)
+            poll_seconds: Cada cuánto mirar la cola si no hay avisos
+        """
+        self.queue = queue
+        self.pipeline = pipeline
+        self.on_saved = on_saved
+        self.batch_size = batch_size or max(1, pipeline.workers * 2)
+        self.poll_seconds = poll_seconds
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        """Mirar la cola ya (trabajo nuevo o la red volvió)"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            wait = self.poll_seconds
+            paused = self.paused_until - time.time()
+            if paused > 0:
+                wait = min(wait, paused)
+            else:
+                with self._lock:
+                    free = self.batch_size - self.in_flight
+                jobs = self.queue.claim(free) if free > 0 else []
+                for job in jobs:
+                    with self._lock:
+                        self.in_flight += 1
+                    self.pipeline.submit(self._run, job)
+                ready_in = self.queue.next_ready_in()
+                if ready_in is not None:
+                    wait = min(wait, max(ready_in, 0.5))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _run(self, job: dict):
+        try:
+            handler = {JOB_TRANSCRIBE: self._transcribe, JOB_ANALYZE: self._analyze}.get(job["kind"])
+            if handler is None:
+                self.queue.fail(job["id"], f"Tipo de trabajo desconocido: {job['kind']}")
+                return
+            handler(job)
+        except Exception as e:
+            # Los errores de red y cuota llegan como texto (ver `_outcome`); una excepción
+            # (audio en cola borrado, datos ilegibles...) se repetiría en cada intento
+            self.queue.fail(job["id"], f"❌ {e}")
+            print(f"❌ Trabajo {job['id']} fallido: {e}")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._wake.set()
+
+    def _transient(self, job: dict, error: str):
+        delay = self.queue.retry(job["id"], error)
+        with self._lock:
+            self.failures += 1
+            self.paused_until = max(self.paused_until, time.time() + delay)
+        print(f"⏳ Trabajo {job['id']} ({job['kind']}) en espera {delay:.0f}s: {error[:80]}")
+
+    def _succeeded(self):
+        with self._lock:
+            recovered = self.failures > 0
+            self.failures = 0
+            self.paused_until = 0.0
+        if recovered:
+            released = self.queue.release_backoff()
+            print(f"✅ La API responde de nuevo - {released} trabajos en espera liberados")
+
+    def _outcome(self, job: dict, result: str) -> bool:
+        """Decide qué hacer con un error; True si el resultado es válido"""
+        from core.pipeline import is_retryable
+        if is_retryable(result):
+            self._transient(job, result)
+            return False
+        if result.startswith("❌"):
+            self.queue.fail(job["id"], result)
+            print(f"❌ Trabajo {job['id']} fallido: {result[:80]}")
+            return False
+        return True
+
+    def _transcribe(self, job: dict):
+        payload = job["payload"]
+        text, _ = self.pipeline.transcribe(self.queue.load_audio(job), payload.get("sample_rate", 16000))
+        if text.startswith("⚠️"):
+            self._succeeded()
+            self.queue.complete(job["id"], {"empty": True})  # Sin voz: nada que analizar
+            return
+        if not self._outcome(job, text):
+            return
+        self._succeeded()
+        # Encadenar el análisis (la clave evita duplicarlo si este trabajo se repite)
+        self.queue.enqueue(JOB_ANALYZE, dict(payload, transcript=text), key=f"{job['key']}:analyze",
+                           payload_path=job["payload_path"])
+        self.queue.complete(job["id"], {"chars": len(text)}, release_payload=False)
+
+    def _analyze(self, job: dict):
+        payload = job["payload"]
+        store = self.pipeline.store
+        # La reunión lleva la clave del trabajo: si se guardó y la app se cerró antes de
+        # marcar el trabajo como hecho, al repetirlo no se analiza ni se guarda otra vez
+        legacy_id = f"cola:{job['key']}"
+        meeting_id = store.find_legacy(legacy_id) if store is not None else None
+        if meeting_id is not None:
+            analysis = (store.get_body(meeting_id) or {}).get("resumen_ia", "")
+            print(f"🔁 Trabajo {job['id']} ya estaba guardado como reunión {meeting_id}")
+        else:
+            analysis, usages = self.pipeline.analyze(payload["transcript"], mode=payload.get("mode", "negocios"),
+                                                     custom_prompt=payload.get("custom_prompt", ""))
+            if not self._outcome(job, analysis):
+                return
+            self._succeeded()
+            if store is not None:
+                from core.metrics import merge_usage
+                meeting_id = store.add(
+                    titulo=payload.get("titulo") or "Reunión (en cola)", modo=payload.get("mode", "negocios").upper(),
+                    resumen_ia=analysis, transcript_completo=payload["transcript"], fecha=payload.get("fecha"),
+                    uso=merge_usage(*usages), legacy_id=legacy_id,
+                )
+        if self.on_saved:
+            audio = self.queue.load_audio(job) if job["payload_path"] and Path(job["payload_path"]).exists() else None
+            try:
+                self.on_saved(meeting_id, dict(job, analysis=analysis), audio)
+            except Exception as e:
+                print(f"⚠️ Error tras guardar el trabajo {job['id']}: {e}")
+        self.queue.complete(job["id"], {"meeting_id": meeting_id})
+        print(f"✅ Trabajo en cola terminado -> reunión {meeting_id}")
@@ -0,0 +1,112 @@
+"""
+Módulo de Diagnóstico de Memoria
+Interruptor en caliente de tracemalloc para ver qué está reteniendo memoria en
+la app en ejecución (Ctrl+Shift+M, señal SIGUSR1 o FERRXOS_MEMDEBUG=1)
+"""
+
+import os
+import signal
+import threading
+import tracemalloc
+from typing import Optional
+
+
+def rss_kb() -> int:
+    """Memoria residente del proceso en KB (0 si no se puede leer)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize // 1024
+    except Exception:
+        pass
+    return 0
+
+
+class MemoryDebugger:
+    """Primer uso: activa tracemalloc. Siguientes: muestra los mayores asignadores
+    y lo que creció desde el volcado anterior."""
+
+    def __init__(self, frames: int = 10, limit: int = 15):
+        """
+        Args:
+            frames: Profundidad de pila registrada por asignación
+            limit: Líneas a mostrar en cada volcado
+        """
+        self.frames = frames
+        self.limit = limit
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            print(f"🧠 Diagnóstico de memoria activado (RSS {rss_kb() // 1024} MB)")
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._previous = None
+            print("🧠 Diagnóstico de memoria desactivado")
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        """Instantánea sin las asignaciones del propio tracemalloc"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def dump(self) -> str:
+        """Mayores asignadores actuales y crecimiento desde el volcado anterior
+
+        Si tracemalloc no estaba activo, solo lo activa (el siguiente volcado ya tiene datos).
+        """
+        with self._lock:
+            if not self.active:
+                self.start()
+                return ""
+            current = self.snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+            lines = [f"🧠 Memoria: RSS {rss_kb() // 1024} MB | Python {traced // 1024} KB (pico {peak // 1024} KB)",
+                     f"Top {self.limit} asignadores:"]
+            lines += [f"  {stat}" for stat in current.statistics("lineno")[:self.limit]]
+            if self._previous is not None:
+                lines.append("Crecimiento desde el volcado anterior:")
+                growth = [stat for stat in current.compare_to(self._previous, "lineno") if stat.size_diff > 0]
+                lines += [f"  {stat}" for stat in growth[:self.limit]]
+            self._previous = current
+        report = "\n".join(lines)
+        print(report)
+        return report
+
+    def install_signal_handler(self):
+        """SIGUSR1 vuelca el informe (solo en sistemas POSIX)"""
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump())
+
+
+# Instancia global
+mem_debugger = MemoryDebugger()
+if os.environ.get("FERRXOS_MEMDEBUG") == "1":
+    mem_debugger.start()
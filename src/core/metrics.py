@@ -0,0 +1,181 @@
+"""
+Módulo de Métricas de Uso
+Cuenta peticiones, tokens de entrada/salida y segundos de audio de cada llamada
+al modelo, agregados por sesión, por modo y por minuto
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Estimaciones cuando la respuesta no trae `usage_metadata`
+CHARS_PER_TOKEN = 4
+AUDIO_TOKENS_PER_SECOND = 32  # Gemini tokeniza el audio a 32 tokens/s
+
+# Límites del nivel gratuito de gemini-2.0-flash (avisar antes de llegar)
+FREE_TIER_RPM = 15
+FREE_TIER_TPM = 1_000_000
+QUOTA_WARNING_RATIO = 0.8
+
+COUNTERS = ("requests", "input_tokens", "output_tokens", "cached_tokens", "audio_seconds", "estimated")
+
+
+def empty_usage() -> dict:
+    return {counter: 0 for counter in COUNTERS}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación gruesa de tokens de un texto"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def usage_from_response(response, prompt_text: str = "", audio_seconds: float = 0.0) -> dict:
+    """Uso de una llamada a partir de `response.usage_metadata` (o una estimación local)
+
+    Args:
+        response: Respuesta de `generate_content` (puede ser None si falló)
+        prompt_text: Texto enviado, para estimar si falta la metadata
+        audio_seconds: Segundos de audio enviados en la llamada
+    """
+    usage = empty_usage()
+    usage["requests"] = 1
+    usage["audio_seconds"] = round(audio_seconds, 2)
+
+    metadata = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(metadata, "prompt_token_count", None)
+    output_tokens = getattr(metadata, "candidates_token_count", None)
+    if input_tokens is not None and output_tokens is not None:
+        usage["input_tokens"] = int(input_tokens)
+        usage["output_tokens"] = int(output_tokens)
+        # Parte de la entrada servida desde la caché de contexto (se factura más barata)
+        usage["cached_tokens"] = int(getattr(metadata, "cached_content_token_count", 0) or 0)
+        return usage
+
+    try:
+        output_text = response.text if response else ""
+    except Exception:
+        output_text = ""
+    usage["input_tokens"] = estimate_tokens(prompt_text) + int(audio_seconds * AUDIO_TOKENS_PER_SECOND)
+    usage["output_tokens"] = estimate_tokens(output_text)
+    usage["estimated"] = 1
+    return usage
+
+
+def merge_usage(*usages: Optional[dict]) -> dict:
+    """Suma varios registros de uso (ignora los None)"""
+    total = empty_usage()
+    for usage in usages:
+        for counter in COUNTERS:
+            total[counter] += (usage or {}).get(counter, 0)
+    total["audio_seconds"] = round(total["audio_seconds"], 2)
+    return total
+
+
+class UsageMetrics:
+    """Registro de uso en memoria: totales de sesión, por modo y por minuto"""
+
+    def __init__(self, window_minutes: int = 60):
+        """
+        Args:
+            window_minutes: Minutos de historial por minuto que se conservan
+        """
+        self.session = empty_usage()
+        self.by_kind = {}
+        self.by_mode = {}
+        self.per_minute = deque(maxlen=window_minutes)  # (minuto epoch, uso)
+        self.skipped = {}  # tipo -> llamadas evitadas (resultado anterior reutilizado)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, usage: dict, mode: Optional[str] = None):
+        """Acumula el uso de una llamada
+
+        Args:
+            kind: Tipo de llamada ("transcripcion", "analisis", ...)
+            usage: Registro devuelto por `usage_from_response`
+            mode: Modo del análisis (si aplica)
+        """
+        minute = int(time.time() // 60)
+        with self._lock:
+            targets = [self.session, self.by_kind.setdefault(kind, empty_usage())]
+            if mode:
+                targets.append(self.by_mode.setdefault(mode, empty_usage()))
+            if not self.per_minute or self.per_minute[-1][0] != minute:
+                self.per_minute.append((minute, empty_usage()))
+            targets.append(self.per_minute[-1][1])
+            for target in targets:
+                for counter in COUNTERS:
+                    target[counter] += usage.get(counter, 0)
+
+        self._warn_quota()
+
+    def record_skip(self, kind: str):
+        """Cuenta una llamada evitada porque el resultado anterior seguía valiendo"""
+        with self._lock:
+            self.skipped[kind] = self.skipped.get(kind, 0) + 1
+
+    def skip_rate(self, kind: str) -> float:
+        """Fracción de llamadas de un tipo que se evitaron"""
+        with self._lock:
+            skipped = self.skipped.get(kind, 0)
+            made = self.by_kind.get(kind, {}).get("requests", 0)
+        return skipped / (skipped + made) if skipped + made else 0.0
+
+    def current_minute(self) -> dict:
+        """Uso del minuto en curso"""
+        minute = int(time.time() // 60)
+        with self._lock:
+            if self.per_minute and self.per_minute[-1][0] == minute:
+                return dict(self.per_minute[-1][1])
+        return empty_usage()
+
+    def _warn_quota(self):
+        usage = self.current_minute()
+        tokens = usage["input_tokens"] + usage["output_tokens"]
+        if usage["requests"] >= FREE_TIER_RPM * QUOTA_WARNING_RATIO:
+            print(f"⚠️ {usage['requests']} peticiones en el último minuto (límite gratuito: {FREE_TIER_RPM}/min)")
+        if tokens >= FREE_TIER_TPM * QUOTA_WARNING_RATIO:
+            print(f"⚠️ {tokens} tokens en el último minuto (límite gratuito: {FREE_TIER_TPM}/min)")
+
+    def snapshot(self) -> dict:
+        """Copia de todos los agregados"""
+        with self._lock:
+            return {
+                "session": dict(self.session),
+                "by_kind": {kind: dict(usage) for kind, usage in self.by_kind.items()},
+                "by_mode": {mode: dict(usage) for mode, usage in self.by_mode.items()},
+                "per_minute": [(minute, dict(usage)) for minute, usage in self.per_minute],
+                "skipped": dict(self.skipped),
+            }
+
+    def report(self) -> str:
+        """Resumen legible para la pestaña de Configuración"""
+        data = self.snapshot()
+        minutes = max(1.0, (time.time() - self.started_at) / 60)
+        peak_rpm = max((usage["requests"] for _, usage in data["per_minute"]), default=0)
+
+        def line(label: str, usage: dict) -> str:
+            flag = " ~" if usage["estimated"] else ""
+            return (f"{label:<16} {usage['requests']:>5} {usage['input_tokens']:>10} "
+                    f"{usage['output_tokens']:>9} {usage['audio_seconds']:>8.0f}{flag}")
+
+        lines = [f"{'':<16} {'pet.':>5} {'tok. ent.':>10} {'tok. sal.':>9} {'audio s':>8}",
+                 line("Sesión", data["session"])]
+        lines += [line(f"  {kind}", usage) for kind, usage in sorted(data["by_kind"].items())]
+        lines += [line(f"  modo {mode}", usage) for mode, usage in sorted(data["by_mode"].items())]
+        lines.append(line("Último minuto", self.current_minute()))
+        lines.append(f"Promedio: {data['session']['requests'] / minutes:.1f} pet./min · "
+                     f"pico: {peak_rpm} pet./min (límite gratuito {FREE_TIER_RPM})")
+        for kind, skipped in sorted(data["skipped"].items()):
+            lines.append(f"Llamadas evitadas ({kind}, sin cambios): {skipped} · "
+                         f"{self.skip_rate(kind) * 100:.0f}% de las pedidas")
+        if data["session"]["cached_tokens"]:
+            lines.append(f"Tokens de entrada desde caché de contexto: {data['session']['cached_tokens']}")
+        if data["session"]["estimated"]:
+            lines.append("~ incluye estimaciones locales (respuesta sin usage_metadata)")
+        return "\n".join(lines)
+
+
+# Registro global de la sesión
+usage_metrics = UsageMetrics()
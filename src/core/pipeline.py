@@ -0,0 +1,355 @@
+"""
+Módulo de Pipeline de Reuniones
+Transcripción por tramos + análisis + guardado en el historial, compartido por
+la app, el modo por lotes (cli.py) y el servidor local
+
+Incluye un limitador de peticiones (token bucket) común a todos los hilos y
+reintentos con espera exponencial ante 429/503.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from core.metrics import merge_usage
+
+# Límite por defecto: nivel gratuito de gemini-2.0-flash
+DEFAULT_REQUESTS_PER_MINUTE = 15
+
+# Fragmentos de los mensajes de error que merecen reintento
+RETRYABLE_ERRORS = ("429", "503", "500", "exhausted", "quota", "unavailable", "deadline", "timeout",
+                    "connection", "network", "unreachable", "name resolution")
+
+
+class RateLimiter:
+    """Token bucket: como máximo `per_minute` peticiones por minuto, con ráfagas de `burst`"""
+
+    def __init__(self, per_minute: float = DEFAULT_REQUESTS_PER_MINUTE, burst: Optional[int] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(per_minute // 4)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.granted = deque()  # Momentos de los permisos concedidos en el último minuto
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Espera un permiso para hacer una petición
+
+        Returns:
+            False si se agotó `timeout` sin conseguirlo
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    self.granted.append(now)
+                    return True
+                wait = max(self.blocked_until - now, (1.0 - self.tokens) / self.rate if self.rate else 1.0)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(max(wait, 0.01))
+
+    @property
+    def per_minute(self) -> float:
+        return self.rate * 60.0
+
+    def recent_requests(self) -> int:
+        """Permisos concedidos en el último minuto (el periodo de `per_minute`)"""
+        with self._lock:
+            cutoff = time.monotonic() - 60.0
+            while self.granted and self.granted[0] < cutoff:
+                self.granted.popleft()
+            return len(self.granted)
+
+    def penalize(self, seconds: float):
+        """Tras un 429, nadie envía nada durante `seconds` y se vacía el bucket"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class SegmentController:
+    """Tamaño adaptativo de los tramos de una transcripción en vivo
+
+    Un tramo de S segundos tarda en transcribirse L(S) ≈ a + b·S (latencia fija de
+    la petición + coste por segundo de audio; se estima con mínimos cuadrados con
+    olvido). La latencia media de una palabra es ≈ S/2 + espera en cola + L(S),
+    así que conviene el tramo más corto que todavía sea sostenible:
+      - transcribir no puede tardar más que el audio que llega: a + b·S ≤ S
+      - las peticiones por minuto (60/S) deben caber en lo que queda del límite
+    Con cola acumulada se alargan los tramos (menos peticiones para ponerse al día).
+    """
+
+    def __init__(self, min_seconds: float = 5.0, max_seconds: float = 60.0, initial_seconds: float = 20.0,
+                 headroom: float = 1.3, forgetting: float = 0.85, max_step: float = 1.5):
+        """
+        Args:
+            min_seconds, max_seconds: Límites del tramo
+            initial_seconds: Tramo hasta tener mediciones
+            headroom: Margen sobre el mínimo sostenible (1.3 = 30 % de holgura)
+            forgetting: Peso de las mediciones antiguas (0-1; menor = se adapta antes)
+            max_step: Cambio máximo entre un tramo y el siguiente (factor)
+        """
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.headroom = headroom
+        self.forgetting = forgetting
+        self.max_step = max_step
+        self.current = min(max(initial_seconds, min_seconds), max_seconds)
+        # Sumas ponderadas para la recta latencia = a + b·segundos
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, audio_seconds: float, latency_seconds: float):
+        """Registra cuánto tardó en transcribirse un tramo"""
+        with self._lock:
+            decay = self.forgetting
+            self._w = self._w * decay + 1.0
+            self._x = self._x * decay + audio_seconds
+            self._y = self._y * decay + latency_seconds
+            self._xx = self._xx * decay + audio_seconds ** 2
+            self._xy = self._xy * decay + audio_seconds * latency_seconds
+
+    def latency_model(self) -> tuple:
+        """(a, b) estimados: latencia fija (s) y segundos de proceso por segundo de audio"""
+        with self._lock:
+            if not self._w:
+                return 1.0, 0.05  # Supuesto inicial hasta medir
+            mean_x, mean_y = self._x / self._w, self._y / self._w
+            variance = self._xx / self._w - mean_x ** 2
+            if variance > 1.0:  # Tramos de duraciones distintas: se puede separar a y b
+                slope = (self._xy / self._w - mean_x * mean_y) / variance
+            else:
+                slope = 0.05
+            slope = min(max(slope, 0.0), 0.9)
+            return max(mean_y - slope * mean_x, 0.0), slope
+
+    def next_seconds(self, queue_depth: int = 0, rate_limiter: Optional[RateLimiter] = None,
+                     streams: int = 1) -> float:
+        """Duración del siguiente tramo
+
+        Args:
+            queue_depth: Tramos de esta sesión esperando o en proceso
+            rate_limiter: Limitador compartido (para el presupuesto de peticiones restante)
+            streams: Transcripciones en vivo que comparten el límite
+        """
+        fixed, per_second = self.latency_model()
+        sustainable = fixed / (1.0 - per_second)
+        if rate_limiter is not None:
+            # Peticiones/min disponibles: lo que queda libre + lo que ya usa este flujo
+            own = 60.0 / self.current
+            spare = rate_limiter.per_minute - rate_limiter.recent_requests()
+            available = max(spare + own, rate_limiter.per_minute / max(streams, 1))
+            sustainable = max(sustainable, 60.0 / max(available, 1e-6))
+        target = sustainable * self.headroom
+        if queue_depth > 1:
+            target *= 1.0 + 0.5 * (queue_depth - 1)
+        with self._lock:
+            target = min(max(target, self.current / self.max_step), self.current * self.max_step)
+            self.current = min(max(target, self.min_seconds), self.max_seconds)
+            return self.current
+
+
+def is_retryable(result: str) -> bool:
+    """Indica si el mensaje de error de una llamada es transitorio (cuota, servicio caído)"""
+    lowered = result.lower()
+    return result.startswith("❌") and any(fragment in lowered for fragment in RETRYABLE_ERRORS)
+
+
+class MeetingPipeline:
+    """Procesa grabaciones completas con un pool de hilos y un límite de peticiones común"""
+
+    def __init__(self, api_key: str, history_store=None, rate_limiter: Optional[RateLimiter] = None,
+                 workers: int = 2, chunk_seconds: float = 300.0, max_retries: int = 4,
+                 backoff_seconds: float = 2.0, compact_silence: bool = True, speaker_turns: bool = False):
+        """
+        Args:
+            api_key: API Key de Gemini
+            history_store: HistoryStore donde guardar los resultados (opcional)
+            rate_limiter: Limitador compartido (por defecto, el del nivel gratuito)
+            workers: Grabaciones procesadas en paralelo
+            chunk_seconds: Duración máxima de cada tramo enviado a transcribir
+            max_retries: Reintentos ante errores transitorios
+            backoff_seconds: Espera base del reintento (se duplica en cada intento)
+            compact_silence: Quitar silencios antes de subir cada tramo
+            speaker_turns: Etiquetar hablantes (detección local) y cortar los tramos en cambios de hablante
+        """
+        self.api_key = api_key
+        self.store = history_store
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.chunk_seconds = chunk_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.compact_silence = compact_silence
+        self.speaker_turns = speaker_turns
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+        self._local = threading.local()
+
+    def _clients(self) -> tuple:
+        """Transcribidor y cliente de IA propios de cada hilo (su `last_usage` no se mezcla)"""
+        if not hasattr(self._local, "transcriber"):
+            from core.ai_brain import AIBrain
+            from core.transcriber import AudioTranscriber
+            self._local.transcriber = AudioTranscriber(self.api_key, compact_silence=self.compact_silence)
+            self._local.brain = AIBrain(self.api_key)
+        return self._local.transcriber, self._local.brain
+
+    def _call(self, client, fn: Callable, *args, **kwargs) -> tuple:
+        """Llama al modelo respetando el límite y reintentando errores transitorios
+
+        Returns:
+            Tupla (resultado, lista de usos de cada intento)
+        """
+        usages = []
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            result = fn(*args, **kwargs)
+            usages.append(client.last_usage)
+            if not is_retryable(result) or attempt == self.max_retries:
+                return result, usages
+            wait = self.backoff_seconds * (2 ** attempt) * random.uniform(0.8, 1.2)
+            if "429" in result or "exhausted" in result.lower():
+                self.rate_limiter.penalize(wait)
+            print(f"🔁 Reintento {attempt + 1}/{self.max_retries} en {wait:.1f}s: {result[:80]}")
+            time.sleep(wait)
+        return result, usages
+
+    def transcribe(self, audio_bytes: bytes, sample_rate: int = 16000,
+                   on_event: Optional[Callable] = None, turns: Optional[list] = None) -> tuple:
+        """Transcribe una grabación por tramos cortados en pausas
+
+        Con `speaker_turns`, los hablantes se detectan una vez sobre toda la
+        grabación (números coherentes entre tramos) y los tramos se cortan en
+        los cambios de hablante.
+
+        Args:
+            on_event: Callback(evento, datos) con cada tramo transcrito ("transcript_chunk")
+            turns: Turnos de hablante ya detectados (p. ej. por una sesión en vivo)
+
+        Returns:
+            Tupla (transcripción o mensaje de error, lista de usos)
+        """
+        from core.audio import pcm16_to_float, speaker_turns, split_at_pauses, turn_cut_points
+
+        transcriber, _ = self._clients()
+        samples = pcm16_to_float(audio_bytes)
+        texts = []
+        usages = []
+        if turns is None and self.speaker_turns:
+            turns = speaker_turns(samples, sample_rate)
+            if len({speaker for _, _, speaker in turns}) < 2:
+                turns = None  # Un solo hablante: sin etiquetas
+        spans = split_at_pauses(samples, sample_rate, self.chunk_seconds,
+                                cut_points=turn_cut_points(turns, sample_rate) if turns else None)
+        for index, (start, end) in enumerate(spans):
+            chunk_turns = None
+            if turns is not None:
+                start_s, end_s = start / sample_rate, end / sample_rate
+                # Sin los restos de turno que quedan en el borde del corte
+                chunk_turns = [(max(turn_start, start_s) - start_s, min(turn_end, end_s) - start_s, speaker)
+                               for turn_start, turn_end, speaker in turns
+                               if min(turn_end, end_s) - max(turn_start, start_s) >= 0.5]
+            text, chunk_usages = self._call(
+                transcriber, transcriber.transcribe_audio, audio_bytes[start * 2:end * 2], sample_rate=sample_rate,
+                turns=chunk_turns,
+            )
+            usages.extend(chunk_usages)
+            if text.startswith("❌"):
+                return text, usages
+            if not text.startswith("⚠️"):  # Tramo sin voz: se omite
+                texts.append(text)
+                if on_event:
+                    on_event("transcript_chunk", {"index": index, "total": len(spans), "text": text,
+                                                  "start_s": start / sample_rate, "end_s": end / sample_rate})
+        if not texts:
+            return "⚠️ No se detectó audio claro.", usages
+        return "\n".join(texts), usages
+
+    def analyze(self, transcript: str, mode: str = "negocios", custom_prompt: str = "", context: str = "",
+                session: Optional[str] = None) -> tuple:
+        """Análisis de una transcripción
+
+        Args:
+            session: Reunión en curso (los análisis repetidos solo envían lo nuevo, ver AIBrain.analyze)
+
+        Returns:
+            Tupla (análisis o mensaje de error, lista de usos)
+        """
+        _, brain = self._clients()
+        return self._call(brain, brain.analyze, transcript, mode=mode, custom_prompt=custom_prompt, context=context,
+                          session=session)
+
+    def end_session(self, session: str):
+        """Libera el contexto de análisis (y la caché del servidor) de una reunión terminada"""
+        from core.ai_brain import context_cache
+        from core.dedup import change_detector
+        context_cache.invalidate(session)
+        change_detector.forget(session)
+
+    def process(self, audio_bytes: bytes, sample_rate: int = 16000, mode: str = "negocios",
+                custom_prompt: str = "", titulo: Optional[str] = None, fecha: Optional[str] = None,
+                on_event: Optional[Callable] = None) -> dict:
+        """Transcribe, analiza y guarda una grabación
+
+        Args:
+            on_event: Callback(evento, datos) con el progreso: "transcript_chunk",
+                "transcript", "analysis" y "saved"
+
+        Returns:
+            Dict con meeting_id (None si no se guardó), transcript, analysis, uso,
+            audio_seconds y error (None si todo fue bien)
+        """
+        result = {
+            "meeting_id": None, "transcript": "", "analysis": "", "uso": None,
+            "audio_seconds": len(audio_bytes) / 2 / sample_rate, "error": None,
+        }
+        emit = on_event or (lambda event, data: None)
+        transcript, usages = self.transcribe(audio_bytes, sample_rate, on_event=on_event)
+        if transcript.startswith(("❌", "⚠️")):
+            result["error"] = transcript
+            result["uso"] = merge_usage(*usages)
+            return result
+        emit("transcript", {"text": transcript})
+
+        analysis, analysis_usages = self.analyze(transcript, mode=mode, custom_prompt=custom_prompt)
+        usages.extend(analysis_usages)
+        result.update(transcript=transcript, analysis=analysis, uso=merge_usage(*usages))
+        if analysis.startswith("❌"):
+            result["error"] = analysis
+            return result
+        emit("analysis", {"text": analysis})
+
+        if self.store is not None:
+            result["meeting_id"] = self.store.add(
+                titulo=titulo or f"Reunión - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                modo=mode.upper(),
+                resumen_ia=analysis,
+                transcript_completo=transcript,
+                fecha=fecha,
+                uso=result["uso"],
+            )
+            emit("saved", {"meeting_id": result["meeting_id"]})
+        return result
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Ejecuta una tarea en el pool del pipeline"""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,312 @@
+"""
+Módulo de Recuperación Semántica
+Índice vectorial local sobre fragmentos del historial (n-gramas de caracteres con hashing)
+
+Con un cifrador (`core.crypto`), la caché de vectores se guarda cifrada con
+AES-GCM: los vectores de n-gramas delatan en parte el texto de las reuniones.
+"""
+
+import io
+import threading
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from core.history_store import fold_text
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Estimación gruesa de caracteres por token para el presupuesto de contexto
+CHARS_PER_TOKEN = 4
+
+
+def chunk_spans(text: str, chunk_words: int = 200, overlap_words: int = 40) -> list:
+    """Divide un texto en ventanas de palabras solapadas
+
+    Returns:
+        Lista de tuplas (inicio, fin) en caracteres del texto original
+    """
+    words = []
+    position = 0
+    for word in text.split():
+        start = text.index(word, position)
+        position = start + len(word)
+        words.append((start, position))
+
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap_words)
+    spans = []
+    for first in range(0, len(words), step):
+        last = min(len(words), first + chunk_words)
+        spans.append((words[first][0], words[last - 1][1]))
+        if last == len(words):
+            break
+    return spans
+
+
+class HashedNgramEmbedder:
+    """Vectores dispersos de n-gramas de caracteres proyectados con hashing
+
+    Robusto a errores de transcripción y variaciones de género/número, sin
+    vocabulario ni modelos externos.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_sizes: tuple = (3, 4, 5)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def _hashes(self, text: str) -> "np.ndarray":
+        """Hash de 32 bits de cada n-grama del texto normalizado"""
+        folded = " " + " ".join(fold_text(text).split()) + " "
+        # crc32 es estable entre ejecuciones (hash() usa semilla aleatoria)
+        return np.fromiter(
+            (zlib.crc32(folded[i:i + n].encode("utf-8"))
+             for n in self.ngram_sizes for i in range(len(folded) - n + 1)),
+            dtype=np.uint32,
+        )
+
+    def embed(self, texts: list) -> "np.ndarray":
+        """Matriz (len(texts), dim) float32 con filas normalizadas (L2)"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = self._hashes(text)
+            if not len(hashes):
+                continue
+            # El bit alto decide el signo para compensar colisiones
+            signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+            matrix[row] = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+
+        # TF sublineal y normalización para que el producto punto sea el coseno
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class MeetingIndex:
+    """Índice vectorial de fragmentos de reuniones con búsqueda por coseno
+
+    Solo guarda vectores y posiciones: el texto de los fragmentos se lee del
+    historial cuando se necesita (solo para los mejores resultados).
+    """
+
+    def __init__(self, history_store, cache_path: Optional[Path] = None,
+                 embedder: Optional[HashedNgramEmbedder] = None, cipher=None):
+        """
+        Args:
+            history_store: HistoryStore de donde se leen las reuniones
+            cache_path: Archivo .npz donde persistir los vectores (opcional)
+            embedder: Generador de vectores (por defecto n-gramas con hashing)
+            cipher: RecordCipher para cifrar la caché (opcional)
+        """
+        self.store = history_store
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.cipher = cipher
+        self._lock = threading.Lock()
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.meeting_ids = np.zeros(0, dtype=np.int64)
+        self.spans = np.zeros((0, 2), dtype=np.int64)
+        # Último ID recorrido del historial: las reuniones posteriores aún no se miraron,
+        # aunque `add_meeting` ya haya indexado alguna más nueva
+        self.scanned_through = 0
+
+    def build(self):
+        """Carga la caché y agrega las reuniones nuevas (descarta las borradas)"""
+        self._load_cache()
+        existing = set(self.store.ids())
+
+        with self._lock:
+            keep = np.isin(self.meeting_ids, list(existing))
+            self.vectors = self.vectors[keep]
+            self.meeting_ids = self.meeting_ids[keep]
+            self.spans = self.spans[keep]
+
+        added = self.catch_up(save=False)
+        if added or not keep.all():
+            self._save_cache()
+        print(f"✅ Índice semántico listo ({len(self.meeting_ids)} fragmentos)")
+
+    def catch_up(self, save: bool = True) -> int:
+        """Indexa las reuniones guardadas después del último recorrido
+
+        Llamarlo también tras publicar el índice: cubre las reuniones guardadas
+        mientras `build` corría, que `add_meeting` no llegó a ver.
+
+        Returns:
+            Reuniones recorridas
+        """
+        with self._lock:
+            after_id = self.scanned_through
+        # Acumular y concatenar una sola vez (evita copiar la matriz por reunión)
+        batches = []
+        for meeting in self.store.iter_meetings(after_id=after_id):
+            batches.append(self._embed_meeting(meeting["id"], meeting["transcript_completo"]))
+            after_id = meeting["id"]
+        self._append([batch for batch in batches if batch])
+        with self._lock:
+            self.scanned_through = max(self.scanned_through, after_id)
+        if batches and save:
+            self._save_cache()
+        return len(batches)
+
+    def _embed_meeting(self, meeting_id: int, transcript: str) -> Optional[tuple]:
+        """Vectores, IDs y posiciones de los fragmentos de una transcripción"""
+        spans = chunk_spans(transcript)
+        if not spans:
+            return None
+        vectors = self.embedder.embed([transcript[start:end] for start, end in spans])
+        return vectors, np.full(len(spans), meeting_id, dtype=np.int64), np.asarray(spans, dtype=np.int64)
+
+    def _append(self, batches: list):
+        if not batches:
+            return
+        with self._lock:
+            # Una reunión puede llegar por `add_meeting` y por `catch_up` a la vez: solo una copia
+            indexed = set(self.meeting_ids.tolist())
+            batches = [batch for batch in batches if int(batch[1][0]) not in indexed]
+            if not batches:
+                return
+            vectors, meeting_ids, spans = zip(*batches)
+            self.vectors = np.vstack([self.vectors, *vectors])
+            self.meeting_ids = np.concatenate([self.meeting_ids, *meeting_ids])
+            self.spans = np.vstack([self.spans, *spans])
+
+    def add_meeting(self, meeting_id: int, transcript: str):
+        """Indexa la transcripción de una reunión"""
+        batch = self._embed_meeting(meeting_id, transcript)
+        if batch:
+            self._append([batch])
+
+    def _top_chunks(self, query_vector: "np.ndarray", k: int, exclude_id: Optional[int] = None) -> list:
+        """Los k fragmentos más parecidos: lista de (score, meeting_id, (inicio, fin))"""
+        with self._lock:
+            if not len(self.meeting_ids):
+                return []
+            scores = self.vectors @ query_vector
+            if exclude_id is not None:
+                scores[self.meeting_ids == exclude_id] = -1.0
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), int(self.meeting_ids[i]), tuple(self.spans[i])) for i in top
+                    if scores[i] > 0]
+
+    def search(self, text: str, k: int = 5, exclude_id: Optional[int] = None,
+               min_score: float = 0.0) -> list:
+        """Fragmentos del historial más parecidos a un texto
+
+        Returns:
+            Lista de dicts {score, meeting_id, titulo, fecha, texto}
+        """
+        query = self.embedder.embed([text])[0]
+        results = []
+        for score, meeting_id, (start, end) in self._top_chunks(query, k, exclude_id):
+            if score < min_score:
+                continue
+            meeting = self.store.get(meeting_id)
+            if not meeting:
+                continue
+            results.append({
+                "score": score,
+                "meeting_id": meeting_id,
+                "titulo": meeting["titulo"],
+                "fecha": meeting["fecha"],
+                "texto": meeting["transcript_completo"][start:end],
+            })
+        return results
+
+    def similar_meetings(self, meeting_id: int, k: int = 10) -> list:
+        """Reuniones más parecidas a una dada (centroide de sus fragmentos)
+
+        Returns:
+            Lista de tuplas (score, meeting_id), de mayor a menor parecido
+        """
+        with self._lock:
+            own = self.meeting_ids == meeting_id
+            if not own.any():
+                return []
+            centroid = self.vectors[own].mean(axis=0)
+            norm = np.linalg.norm(centroid)
+            if norm == 0:
+                return []
+            scores = self.vectors @ (centroid / norm)
+            scores[own] = -1.0
+
+            # Mejor fragmento por reunión
+            best = {}
+            for i in np.argsort(-scores):
+                if scores[i] <= 0 or len(best) >= k:
+                    break
+                best.setdefault(int(self.meeting_ids[i]), float(scores[i]))
+        return [(score, other_id) for other_id, score in best.items()]
+
+    def context_for(self, text: str, budget_tokens: int = 400, k: int = 8,
+                    exclude_id: Optional[int] = None, min_score: float = 0.25) -> str:
+        """Fragmentos relevantes de reuniones anteriores, recortados a un presupuesto de tokens"""
+        budget_chars = budget_tokens * CHARS_PER_TOKEN
+        lines = []
+        for result in self.search(text, k=k, exclude_id=exclude_id, min_score=min_score):
+            line = f"- [{result['fecha']} | {result['titulo']}] {' '.join(result['texto'].split())}"
+            if len(line) > budget_chars:
+                if not lines:
+                    lines.append(line[:budget_chars])
+                break
+            lines.append(line)
+            budget_chars -= len(line) + 1
+        return "\n".join(lines)
+
+    def _load_cache(self):
+        """Lee los vectores persistidos (si son compatibles con el embedder actual)"""
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                blob = f.read()
+            sealed = not blob.startswith(b"PK")  # Un .npz en claro es un zip
+            if sealed:
+                if self.cipher is None:
+                    raise ValueError("caché cifrada y sin clave")
+                blob = self.cipher.decrypt(blob, "indice_semantico")
+            data = np.load(io.BytesIO(blob))
+            if data["vectors"].shape[1] != self.embedder.dim:
+                return
+            with self._lock:
+                self.vectors = data["vectors"].astype(np.float32)
+                self.meeting_ids = data["meeting_ids"]
+                self.spans = data["spans"]
+                # Cachés anteriores: el recorrido llegaba hasta el ID más alto indexado
+                self.scanned_through = int(data["scanned_through"]) if "scanned_through" in data.files else \
+                    (int(self.meeting_ids.max()) if len(self.meeting_ids) else 0)
+            if self.cipher is not None and not sealed:
+                self._save_cache()  # Caché de antes del cifrado: no dejarla en claro
+        except Exception as e:
+            print(f"⚠️ Caché del índice semántico inválida, se reconstruye: {e}")
+
+    def _save_cache(self):
+        """Persiste los vectores para no recalcularlos en el próximo arranque"""
+        if not self.cache_path:
+            return
+        buffer = io.BytesIO()
+        with self._lock:
+            # float16 en disco: la mitad de espacio, precisión de sobra para el coseno
+            np.savez(buffer, vectors=self.vectors.astype(np.float16),
+                     meeting_ids=self.meeting_ids, spans=self.spans, scanned_through=self.scanned_through)
+        blob = buffer.getvalue()
+        if self.cipher is not None:
+            blob = self.cipher.encrypt(blob, "indice_semantico")
+        # Aparece completa o no aparece (un corte no deja una caché a medias)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        tmp_path.replace(self.cache_path)
+
+    def save(self):
+        """Persiste el índice (llamar tras agregar reuniones)"""
+        self._save_cache()
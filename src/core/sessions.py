@@ -0,0 +1,614 @@
+"""
+Módulo de Sesiones
+Varias reuniones simultáneas en un mismo proceso: cada sesión tiene su propio
+buffer de audio, cola de tramos, resumen y métricas, y todas comparten el pool
+de hilos y el límite de peticiones del pipeline mediante un reparto por turnos
+ponderado (una grabación larga no deja sin turno a una reunión en vivo).
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Optional
+
+from core.metrics import merge_usage
+from core.pipeline import SegmentController
+from core.triggers import TRIGGER_COOLDOWN_SECONDS, TriggerEngine
+
+MAX_FINISHED_SESSIONS = 100  # Sesiones terminadas que se conservan para consultar su estado
+
+
+class FairScheduler:
+    """Reparte los hilos del pipeline entre sesiones por turnos ponderados
+
+    Cada sesión tiene su propia cola; como mucho hay `slots` tareas en el pool y,
+    al quedar un hueco, se elige la siguiente sesión con el algoritmo de turnos
+    ponderados suave (una sesión de peso 2 recibe el doble de turnos que una de
+    peso 1, intercalados).
+    """
+
+    def __init__(self, submit: Callable, slots: int):
+        """
+        Args:
+            submit: Función que ejecuta una tarea en el pool (`MeetingPipeline.submit`)
+            slots: Tareas simultáneas como máximo (hilos del pool)
+        """
+        self._submit = submit
+        self.slots = max(1, slots)
+        self.queues = {}   # sesión -> deque de (future, fn, args)
+        self.weights = {}
+        self.credit = {}   # Peso acumulado de cada sesión en el reparto
+        self.urgent = []   # Sesiones con una tarea prioritaria al frente de su cola (pasan primero)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def register(self, key, weight: int = 1):
+        with self._lock:
+            self.queues.setdefault(key, deque())
+            self.weights[key] = max(1, int(weight))
+            self.credit.setdefault(key, 0)
+
+    def unregister(self, key):
+        """Olvida una sesión; sus tareas pendientes se cancelan"""
+        with self._lock:
+            pending = self.queues.pop(key, deque())
+            self.weights.pop(key, None)
+            self.credit.pop(key, None)
+            if key in self.urgent:
+                self.urgent.remove(key)
+        for future, _, _ in pending:
+            future.cancel()
+
+    def schedule(self, key, fn: Callable, *args, priority: bool = False) -> Future:
+        """Encola una tarea de una sesión registrada
+
+        Args:
+            priority: Ponerla al frente de la cola de la sesión y darle a la sesión el siguiente hueco
+        """
+        future = Future()
+        with self._lock:
+            if priority:
+                self.queues[key].appendleft((future, fn, args))
+                if key not in self.urgent:
+                    self.urgent.append(key)
+            else:
+                self.queues[key].append((future, fn, args))
+        self._dispatch()
+        return future
+
+    def pending(self, key) -> int:
+        with self._lock:
+            return len(self.queues.get(key, ()))
+
+    def _pick(self):
+        """Siguiente sesión con trabajo (turnos ponderados suaves); se llama con el lock"""
+        while self.urgent:
+            key = self.urgent.pop(0)
+            if self.queues.get(key):
+                return key  # Fuera del reparto: no gasta turnos de la sesión
+        ready = [key for key, queue in self.queues.items() if queue]
+        if not ready:
+            return None
+        total = 0
+        for key in ready:
+            self.credit[key] += self.weights[key]
+            total += self.weights[key]
+        chosen = max(ready, key=lambda key: self.credit[key])
+        self.credit[chosen] -= total
+        return chosen
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self.in_flight >= self.slots:
+                    return
+                key = self._pick()
+                if key is None:
+                    return
+                task = self.queues[key].popleft()
+                self.in_flight += 1
+            self._submit(self._run, *task)
+
+    def _run(self, future: Future, fn: Callable, args: tuple):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._dispatch()
+
+
+class MeetingSession:
+    """Una reunión (en vivo o reproducida desde un archivo) con su propio estado"""
+
+    def __init__(self, session_id: int, manager: "SessionManager", kind: str = "live", mode: str = "negocios",
+                 sample_rate: int = 16000, custom_prompt: str = "", titulo: str = "", fecha: Optional[str] = None,
+                 segment_seconds: float = 20.0, weight: int = 1, on_event: Optional[Callable] = None):
+        """
+        Args:
+            kind: "live" (audio por tramos) o "job" (grabación completa)
+            segment_seconds: Duración de cada tramo enviado a transcribir
+            weight: Turnos relativos en el reparto del pool
+            on_event: Callback(evento, datos) con el progreso de la sesión (por defecto,
+                `manager.publish` en el canal de la sesión)
+        """
+        self.session_id = session_id
+        self.manager = manager
+        self.kind = kind
+        self.channel = f"{kind}-{session_id}"
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.custom_prompt = custom_prompt
+        self.titulo = titulo
+        self.fecha = fecha
+        self.segment_seconds = segment_seconds
+        self.weight = weight
+        self.on_event = on_event or (lambda event, data: manager.publish(self.channel, event, data))
+
+        self.buffer = bytearray()
+        # Tramos en vivo de duración adaptativa (latencia de la API, cola y límite de peticiones)
+        self.controller = None
+        if kind == "live" and manager.adaptive:
+            self.controller = SegmentController(manager.min_segment_seconds, manager.max_segment_seconds,
+                                                initial_seconds=segment_seconds)
+            self.segment_seconds = self.controller.current
+        self.speakers = None  # SpeakerTracker de la sesión (hablantes coherentes entre tramos)
+        if manager.pipeline.speaker_turns:
+            from core.audio import SpeakerTracker
+            self.speakers = SpeakerTracker()
+        self.texts = {}  # índice de tramo -> texto
+        # Frases clave en la transcripción en vivo: piden el resumen en el momento justo
+        self.triggers = TriggerEngine(mode, cues=manager.cues, cooldown_seconds=manager.trigger_cooldown) \
+            if kind == "live" and manager.triggers else None
+        self.unspotted = {}  # índice -> texto de los tramos terminados que aún no vieron los disparadores
+        self.spotted_index = 0
+        self.summary_queued = False
+        self.speculation = None  # (transcripción base, Future) del análisis especulativo en curso
+        self.next_index = 0
+        self.submitted_samples = 0
+        self.pending_segments = 0
+        self.finishing = False
+        self.summary = ""
+        self.usages = []
+        self.errors = []
+        self.result = Future()
+        self.metrics = {
+            "created": time.time(), "audio_seconds": 0.0, "segments": 0,
+            "queue_wait_s": 0.0, "max_queue_wait_s": 0.0, "segment_latency_s": 0.0,
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def ended(self) -> bool:
+        return self.finishing
+
+    @property
+    def buffered_seconds(self) -> float:
+        return len(self.buffer) / 2 / self.sample_rate
+
+    def append(self, pcm: bytes):
+        """Agrega PCM 16-bit mono y encola los tramos completos (cortados en pausas)"""
+        from core.audio import pcm16_to_float, speaker_turns, split_at_pauses, turn_cut_points
+
+        with self._lock:
+            if self.finishing:
+                raise RuntimeError("La sesión ya terminó")
+            self.buffer.extend(pcm[:len(pcm) - len(pcm) % 2])
+            if self.controller is not None:
+                self._cut_adaptive()
+                return
+            segment_len = int(self.segment_seconds * self.sample_rate)
+            total = len(self.buffer) // 2
+            # Esperar margen para elegir la pausa dentro del último cuarto del tramo
+            if total < segment_len * 1.25:
+                return
+            samples = pcm16_to_float(bytes(self.buffer))
+            # Cortar preferentemente en un cambio de hablante (tracker temporal: solo importan los cortes)
+            cut_points = turn_cut_points(speaker_turns(samples, self.sample_rate), self.sample_rate) \
+                if self.speakers is not None else None
+            spans = split_at_pauses(samples, self.sample_rate, self.segment_seconds,
+                                    search_seconds=self.segment_seconds * 0.25, cut_points=cut_points)
+            consumed = 0
+            for start, end in spans[:-1]:
+                if total - start < segment_len * 1.25:
+                    break
+                self._schedule_segment(bytes(self.buffer[start * 2:end * 2]))
+                consumed = end
+            del self.buffer[:consumed * 2]
+
+    def _cut_adaptive(self):
+        """Corta el buffer en vivo (se llama con el lock)
+
+        Se corta en una pausa real en cuanto hay 3/4 del tramo objetivo, o al
+        completarlo en la trama más silenciosa del último cuarto; tras cada corte
+        el controlador fija la duración del siguiente tramo.
+        """
+        from core.audio import pcm16_to_float, speaker_turns, split_at_pauses, trailing_silence, turn_cut_points
+
+        while True:
+            target = int(self.segment_seconds * self.sample_rate)
+            total = len(self.buffer) // 2
+            if total < target * 0.75:
+                return
+            samples = pcm16_to_float(bytes(self.buffer))
+            silence = trailing_silence(samples, self.sample_rate)
+            if silence >= 0.5:
+                # Pausa al final: cortar dejando 0,25 s de silencio en el tramo
+                cut = min(total, total - int(silence * self.sample_rate) + int(0.25 * self.sample_rate))
+            elif total > target:
+                cut_points = turn_cut_points(speaker_turns(samples, self.sample_rate), self.sample_rate) \
+                    if self.speakers is not None else None
+                cut = split_at_pauses(samples, self.sample_rate, self.segment_seconds,
+                                      search_seconds=self.segment_seconds * 0.25, cut_points=cut_points)[0][1]
+            else:
+                return
+            self._schedule_segment(bytes(self.buffer[:cut * 2]))
+            del self.buffer[:cut * 2]
+            every = self.manager.summary_every
+            if silence >= 0.5 and every and (len(self.texts) + self.pending_segments) % every == 0:
+                self._speculate()  # Este tramo pedirá el resumen: adelantarlo durante la pausa
+            self.segment_seconds = self.controller.next_seconds(
+                queue_depth=self.pending_segments, rate_limiter=self.manager.pipeline.rate_limiter,
+                streams=self.manager.live_streams(),
+            )
+
+    def finish(self) -> Future:
+        """Cierra la sesión: transcribe lo que queda y, al terminar los tramos, analiza y guarda
+
+        Returns:
+            Future con el dict de `MeetingPipeline.process` (meeting_id, transcript, analysis, ...)
+        """
+        with self._lock:
+            if self.finishing:
+                return self.result
+            self.finishing = True
+            if self.buffer:
+                self._schedule_segment(bytes(self.buffer))
+                self.buffer.clear()
+            ready = self.pending_segments == 0
+            if not ready:
+                self._speculate()  # Analizar lo que hay mientras se transcribe el último tramo
+        if ready:
+            self._schedule(self._analyze)
+        return self.result
+
+    def _schedule(self, fn: Callable, *args, priority: bool = False) -> Future:
+        return self.manager.scheduler.schedule(self.session_id, self._timed, time.monotonic(), fn, args,
+                                               priority=priority)
+
+    def _timed(self, queued_at: float, fn: Callable, args: tuple):
+        """Ejecuta una tarea anotando cuánto esperó su turno"""
+        wait = time.monotonic() - queued_at
+        with self._lock:
+            self.metrics["queue_wait_s"] += wait
+            self.metrics["max_queue_wait_s"] = max(self.metrics["max_queue_wait_s"], wait)
+        return fn(*args)
+
+    def _schedule_segment(self, segment: bytes):
+        """Encola un tramo (se llama con el lock, en orden: el tracker de hablantes ve los tramos seguidos)"""
+        index = self.next_index
+        offset = self.submitted_samples / self.sample_rate
+        self.next_index += 1
+        self.submitted_samples += len(segment) // 2
+        self.pending_segments += 1
+        turns = None
+        if self.speakers is not None:
+            from core.audio import pcm16_to_float, speaker_turns
+            turns = speaker_turns(pcm16_to_float(segment), self.sample_rate, tracker=self.speakers)
+            if len(self.speakers.centroids) < 2:
+                turns = None  # Hasta que aparezca un segundo hablante, sin etiquetas
+        self._schedule(self._transcribe_segment, index, segment, offset, turns)
+
+    def _transcribe_segment(self, index: int, segment: bytes, offset: float, turns: Optional[list] = None):
+        started = time.perf_counter()
+        seconds = len(segment) / 2 / self.sample_rate
+        try:
+            text, usages = self.manager.pipeline.transcribe(segment, self.sample_rate, turns=turns)
+        except Exception as e:
+            text, usages = f"❌ Error transcribiendo: {e}", []
+        if self.controller is not None and not text.startswith("❌"):
+            self.controller.observe(seconds, time.perf_counter() - started)
+        with self._lock:
+            self.usages.extend(usages)
+            self.metrics["segments"] += 1
+            self.metrics["audio_seconds"] += seconds
+            self.metrics["segment_latency_s"] += time.perf_counter() - started
+            if text.startswith("❌"):
+                self.errors.append(text)
+            elif not text.startswith("⚠️"):  # Tramo sin voz: se omite
+                self.texts[index] = text
+            self.pending_segments -= 1
+            ready = self.finishing and self.pending_segments == 0
+            self.unspotted[index] = self.texts.get(index, "")
+            trigger = self._spot_cues()
+
+        if text.startswith("❌"):
+            self.on_event("error", {"message": text, "segment": index})
+        elif not text.startswith("⚠️"):
+            self.on_event("transcript_chunk", {"index": index, "text": text, "start_s": round(offset, 2),
+                                               "end_s": round(offset + seconds, 2)})
+            every = self.manager.summary_every
+            if trigger is not None:
+                self.on_event("trigger", dict(trigger, segment=index))
+                self._queue_summary(priority=True)
+            elif every and len(self.texts) % every == 0:
+                self._queue_summary()
+        if ready:
+            self._schedule(self._analyze)
+
+    def _spot_cues(self) -> Optional[dict]:
+        """Pasa por los disparadores los tramos ya transcritos, en orden (se llama con el lock)"""
+        if self.triggers is None:
+            return None
+        fired = None
+        while self.spotted_index in self.unspotted:
+            text = self.unspotted.pop(self.spotted_index)
+            self.spotted_index += 1
+            if text:
+                fired = self.triggers.feed(text) or fired
+        return fired
+
+    def _queue_summary(self, priority: bool = False):
+        """Encola una actualización del resumen (una sola a la vez)"""
+        with self._lock:
+            if self.finishing or self.summary_queued:
+                return
+            self.summary_queued = True
+        self._schedule(self._update_summary, priority=priority)
+
+    def _speculate(self):
+        """Analiza en paralelo la transcripción disponible sin esperar al tramo en curso (se llama con el lock)
+
+        Al llegar el texto final, `_resolve_speculation` decide: si lo nuevo no
+        cambia el contenido, el resultado especulativo se confirma sin otra llamada;
+        si crece, se parchea enviando solo lo nuevo; si la base cambió (un tramo
+        anterior llegó tarde), se descarta.
+        """
+        if not self.manager.speculative or self.speculation is not None or self.summary_queued:
+            return
+        base = "\n".join(self.texts[index] for index in sorted(self.texts))
+        if not base:
+            return
+        self.speculation = (base, self._schedule(self._run_speculation, base, priority=True))
+        self.manager.count_speculation("started")
+
+    def _run_speculation(self, base: str) -> str:
+        analysis, usages = self.manager.pipeline.analyze(base, mode=self.mode, custom_prompt=self.custom_prompt,
+                                                         session=self.channel)
+        with self._lock:
+            self.usages.extend(usages)
+        if not analysis.startswith("❌") and analysis != self.summary:
+            self.on_event("summary", {"text": analysis, "speculative": True})
+        return analysis
+
+    def _after_speculation(self, then: Callable) -> bool:
+        """Evita esperar la especulación dentro de un hilo del pool
+
+        Si aún no empezó, se cancela (contará como descartada); si está en curso,
+        `then` se vuelve a encolar cuando termine. Esperarla con `result()` podía
+        bloquear todos los huecos del pool mientras ella esperaba uno.
+
+        Returns:
+            True si `then` quedó aplazado (quien llama debe salir sin hacer nada)
+        """
+        with self._lock:
+            speculation = self.speculation
+        if speculation is None:
+            return False
+        future = speculation[1]
+        if future.done() or future.cancel():
+            return False
+        future.add_done_callback(lambda _: self._schedule(then, priority=True))
+        return True
+
+    def _resolve_speculation(self, final: str) -> Optional[str]:
+        """Compara la especulación ya terminada (ver `_after_speculation`) con el texto final
+
+        Returns:
+            None si no había, "discarded" si no sirve, o "pending" si el análisis
+            final puede partir de ella (confirmada o parcheada según haga falta llamar)
+        """
+        with self._lock:
+            speculation, self.speculation = self.speculation, None
+        if speculation is None:
+            return None
+        base, future = speculation
+        if not future.done() or future.cancelled():
+            analysis = "❌ Especulación cancelada"
+        else:
+            try:
+                analysis = future.result()
+            except Exception:
+                analysis = "❌ Especulación fallida"
+        if analysis.startswith("❌") or not final.startswith(base):
+            self.manager.count_speculation("discarded")
+            return "discarded"
+        return "pending"
+
+    def _analyze_transcript(self, transcript: str) -> tuple:
+        """Análisis de la transcripción (final o parcial) aprovechando la especulación si la hubo"""
+        outcome = self._resolve_speculation(transcript)
+        analysis, usages = self.manager.pipeline.analyze(transcript, mode=self.mode,
+                                                         custom_prompt=self.custom_prompt, session=self.channel)
+        if outcome == "pending":
+            # Sin llamada (uso None): el resultado especulativo seguía valiendo
+            self.manager.count_speculation("confirmed" if all(usage is None for usage in usages) else "patched")
+        with self._lock:
+            self.usages.extend(usages)
+        return analysis, usages
+
+    @property
+    def transcript(self) -> str:
+        with self._lock:
+            return "\n".join(self.texts[index] for index in sorted(self.texts))
+
+    def _update_summary(self):
+        """Resumen acumulado de la reunión en curso (usa el anterior como contexto)"""
+        if self._after_speculation(self._update_summary):
+            return
+        with self._lock:
+            self.summary_queued = False
+        if self.finishing:
+            return
+        # El análisis anterior y el prompt del modo se reutilizan: solo viaja lo nuevo
+        summary, _ = self._analyze_transcript(self.transcript)
+        if not summary.startswith("❌") and summary != self.summary:  # Igual: análisis reutilizado
+            self.summary = summary
+            self.on_event("summary", {"text": summary})
+
+    def _analyze(self):
+        if self._after_speculation(self._analyze):
+            return
+        result = {
+            "meeting_id": None, "transcript": self.transcript, "analysis": "", "uso": None,
+            "audio_seconds": self.submitted_samples / self.sample_rate, "error": None,
+        }
+        try:
+            if not result["transcript"]:
+                result["error"] = self.errors[0] if self.errors else "⚠️ No se detectó audio claro."
+                return result
+            self.on_event("transcript", {"text": result["transcript"]})
+
+            pipeline = self.manager.pipeline
+            analysis, _ = self._analyze_transcript(result["transcript"])
+            result["analysis"] = analysis
+            if analysis.startswith("❌"):
+                result["error"] = analysis
+                return result
+            self.summary = analysis
+            self.on_event("analysis", {"text": analysis})
+
+            if pipeline.store is not None:
+                result["meeting_id"] = pipeline.store.add(
+                    titulo=self.titulo or f"Reunión - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                    modo=self.mode.upper(), resumen_ia=analysis, transcript_completo=result["transcript"],
+                    fecha=self.fecha, uso=merge_usage(*self.usages),
+                )
+                self.on_event("saved", {"meeting_id": result["meeting_id"]})
+            return result
+        except Exception as e:
+            result["error"] = f"❌ Error en el análisis: {e}"
+            return result
+        finally:
+            result["uso"] = merge_usage(*self.usages)
+            if result["error"]:
+                self.on_event("error", {"message": result["error"]})
+            self.manager.pipeline.end_session(self.channel)
+            self.result.set_result(result)
+            self.manager._finished(self)
+
+    def snapshot(self) -> dict:
+        """Estado y métricas de la sesión"""
+        with self._lock:
+            segments = self.metrics["segments"]
+            return {
+                "session": self.session_id, "kind": self.kind, "channel": self.channel, "mode": self.mode,
+                "weight": self.weight, "state": "done" if self.result.done() else
+                ("finishing" if self.finishing else "open"),
+                "buffered_s": round(self.buffered_seconds, 2), "segment_s": round(self.segment_seconds, 2),
+                "audio_s": round(self.metrics["audio_seconds"], 2),
+                "segments_done": segments, "segments_pending": self.pending_segments,
+                "avg_queue_wait_s": round(self.metrics["queue_wait_s"] / max(segments, 1), 3),
+                "max_queue_wait_s": round(self.metrics["max_queue_wait_s"], 3),
+                "avg_segment_latency_s": round(self.metrics["segment_latency_s"] / max(segments, 1), 3),
+                "usage": merge_usage(*self.usages), "errors": len(self.errors),
+                "triggers": dict(self.triggers.stats) if self.triggers else None,
+            }
+
+
+class SessionManager:
+    """Crea y sigue las sesiones que comparten un `MeetingPipeline`"""
+
+    def __init__(self, pipeline, segment_seconds: float = 20.0, summary_every: int = 0, adaptive: bool = True,
+                 min_segment_seconds: float = 5.0, max_segment_seconds: float = 60.0, triggers: bool = True,
+                 cues: Optional[dict] = None, trigger_cooldown: float = TRIGGER_COOLDOWN_SECONDS,
+                 speculative: bool = False):
+        """
+        Args:
+            pipeline: MeetingPipeline compartido (pool, límite de peticiones, historial)
+            segment_seconds: Tramo por defecto (inicial, si es adaptativo) de las sesiones en vivo
+            summary_every: Actualizar el resumen acumulado cada N tramos (0 = solo al final)
+            adaptive: Ajustar el tramo en vivo a la latencia y al límite de peticiones (ver SegmentController)
+            min_segment_seconds, max_segment_seconds: Límites del tramo adaptativo
+            triggers: Actualizar el resumen en vivo al detectar frases clave del modo (ver core/triggers.py)
+            cues: Frases por modo (por defecto, DEFAULT_CUES)
+            trigger_cooldown: Segundos mínimos entre dos resúmenes disparados
+            speculative: Empezar el análisis en las pausas, en paralelo con la transcripción del último tramo
+        """
+        self.pipeline = pipeline
+        self.segment_seconds = segment_seconds
+        self.adaptive = adaptive
+        self.min_segment_seconds = min_segment_seconds
+        self.max_segment_seconds = max_segment_seconds
+        self.summary_every = summary_every
+        self.triggers = triggers
+        self.cues = cues
+        self.trigger_cooldown = trigger_cooldown
+        self.speculative = speculative
+        self.speculation_stats = {"started": 0, "confirmed": 0, "patched": 0, "discarded": 0}
+        self.publish = lambda channel, event, data: None  # Difusión de eventos (p. ej. EventBus.publish)
+        self.on_pruned = lambda channel: None  # Sesión olvidada (p. ej. EventBus.forget)
+        self.scheduler = FairScheduler(pipeline.submit, pipeline.workers)
+        self.sessions = {}
+        self._finished_ids = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def open(self, kind: str = "live", weight: int = 1, segment_seconds: Optional[float] = None,
+             **kwargs) -> MeetingSession:
+        """Abre una sesión (los demás argumentos van a `MeetingSession`)"""
+        with self._lock:
+            session_id = next(self._ids)
+            session = MeetingSession(session_id, self, kind=kind, weight=weight,
+                                     segment_seconds=segment_seconds or self.segment_seconds, **kwargs)
+            self.sessions[session_id] = session
+        self.scheduler.register(session_id, weight)
+        return session
+
+    def replay(self, audio_bytes: bytes, sample_rate: int = 16000, weight: int = 1, **kwargs) -> MeetingSession:
+        """Procesa una grabación completa como una sesión más (tramos de `pipeline.chunk_seconds`)"""
+        session = self.open(kind="job", weight=weight, segment_seconds=self.pipeline.chunk_seconds,
+                            sample_rate=sample_rate, **kwargs)
+        session.on_event("queued", {"job": session.session_id, "audio_s": round(len(audio_bytes) / 2 / sample_rate, 2)})
+        session.append(audio_bytes)
+        session.finish()
+        return session
+
+    def live_streams(self) -> int:
+        """Sesiones en vivo que siguen recibiendo audio"""
+        return sum(1 for session in list(self.sessions.values()) if session.kind == "live" and not session.finishing)
+
+    def get(self, session_id: int) -> Optional[MeetingSession]:
+        return self.sessions.get(session_id)
+
+    def _finished(self, session: MeetingSession):
+        self.scheduler.unregister(session.session_id)
+        with self._lock:
+            self._finished_ids.append(session.session_id)
+            pruned = []
+            while len(self._finished_ids) > MAX_FINISHED_SESSIONS:
+                pruned.append(self.sessions.pop(self._finished_ids.popleft(), None))
+        for old in pruned:
+            if old is not None:
+                self.on_pruned(old.channel)
+
+    def count_speculation(self, outcome: str):
+        with self._lock:
+            self.speculation_stats[outcome] += 1
+
+    def speculation_snapshot(self) -> dict:
+        """Resultados de los análisis especulativos (`wasted_rate`: fracción descartada)"""
+        with self._lock:
+            stats = dict(self.speculation_stats)
+        stats["wasted_rate"] = round(stats["discarded"] / stats["started"], 3) if stats["started"] else 0.0
+        return stats
+
+    def snapshot(self) -> list:
+        return [session.snapshot() for session in list(self.sessions.values())]
@@ -0,0 +1,37 @@
+"""
+Módulo de Perfilado de Arranque
+Mide el tiempo de cada fase hasta que la ventana principal se pinta
+"""
+
+import time
+
+
+class StartupTimer:
+    """Cronómetro de fases de arranque (imports, construcción de UI, primer pintado)"""
+    
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.last = self.t0
+        self.phases = []
+    
+    def mark(self, phase: str):
+        """Cierra la fase actual con el nombre indicado"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+    
+    def total(self) -> float:
+        """Segundos transcurridos desde el inicio del proceso medido"""
+        return self.last - self.t0
+    
+    def report(self) -> str:
+        """Genera un reporte legible con la duración de cada fase"""
+        lines = ["⏱️ Arranque:"]
+        for phase, elapsed in self.phases:
+            lines.append(f"   {phase:<28} {elapsed * 1000:8.1f} ms")
+        lines.append(f"   {'TOTAL':<28} {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+# Instancia global usada por main.py y la ventana principal
+startup_timer = StartupTimer()
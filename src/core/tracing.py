@@ -0,0 +1,252 @@
+"""
+Módulo de Trazas de Latencia
+Spans y marcas de tiempo a lo largo del pipeline (captura -> transcripción -> análisis -> UI),
+con histogramas por etapa (p50/p95/p99) y exportación a JSONL rotativo
+
+Desactivado, cada llamada es una comprobación de un booleano y no reserva memoria.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+# Marcas estándar de una traza de reunión, en orden
+MARKS = (
+    "speech_end",           # Última muestra con voz
+    "segment_closed",       # El capturador cierra el segmento
+    "request_sent",         # Audio enviado a Gemini
+    "first_byte",           # Primera respuesta de transcripción
+    "transcript_rendered",  # Transcripción visible en la UI
+    "analysis_sent",        # Petición de análisis enviada
+    "analysis_first_byte",  # Primera respuesta del análisis
+    "analysis_rendered",    # Análisis visible en la UI
+)
+
+# Trazas abiertas como máximo (las grabaciones que nunca se cierran no se acumulan)
+MAX_OPEN_TRACES = 32
+
+# Traza activa en el hilo/contexto actual
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Histogram:
+    """Ventana de las últimas N muestras con percentiles"""
+
+    def __init__(self, max_samples: int = 2048):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class _NullSpan:
+    """Span sin efecto cuando las trazas están desactivadas"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.tracer._record_span(self.name, elapsed, exc_type is not None, self.attrs)
+        return False
+
+
+class Tracer:
+    """Instrumentación ligera de latencia por etapa"""
+
+    def __init__(self, enabled: bool = False, export_path: Optional[Path] = None,
+                 max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        """
+        Args:
+            enabled: Activar las trazas
+            export_path: Archivo JSONL donde exportar spans y trazas (opcional)
+            max_bytes: Tamaño a partir del cual se rota el archivo
+            backups: Número de archivos rotados que se conservan
+        """
+        self.enabled = enabled
+        self.export_path = Path(export_path) if export_path else None
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.histograms = {}
+        self._traces = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool, export_path: Optional[Path] = None):
+        """Activa/desactiva las trazas en caliente"""
+        self.enabled = enabled
+        if export_path is not None:
+            self.export_path = Path(export_path)
+
+    # --- Spans (duración de un bloque de código) ---
+
+    def span(self, name: str, **attrs):
+        """Context manager que mide la duración de un bloque"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def _record_span(self, name: str, elapsed: float, failed: bool, attrs: dict):
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).add(elapsed)
+        self._export({
+            "kind": "span",
+            "name": name,
+            "ms": round(elapsed * 1000, 3),
+            "error": failed,
+            "trace": _current_trace.get(),
+            **attrs,
+        })
+
+    # --- Trazas (marcas de un mismo segmento a través de hilos) ---
+
+    def new_trace(self) -> Optional[str]:
+        """Crea una traza nueva y la activa en el contexto actual"""
+        if not self.enabled:
+            return None
+        trace_id = f"t{os.getpid()}-{next(self._ids)}"
+        with self._lock:
+            self._traces[trace_id] = []
+            while len(self._traces) > MAX_OPEN_TRACES:
+                self._traces.pop(next(iter(self._traces)))
+        _current_trace.set(trace_id)
+        return trace_id
+
+    def activate(self, trace_id: Optional[str]):
+        """Activa una traza existente en el contexto actual (p. ej. en otro hilo)"""
+        _current_trace.set(trace_id)
+
+    def current(self) -> Optional[str]:
+        return _current_trace.get()
+
+    def mark(self, event: str, at: Optional[float] = None, trace_id: Optional[str] = None):
+        """Registra una marca de tiempo en la traza activa
+
+        Args:
+            event: Nombre de la marca (ver MARKS)
+            at: Instante (time.perf_counter()); por defecto, ahora
+            trace_id: Traza explícita (por defecto, la activa)
+        """
+        if not self.enabled:
+            return
+        trace_id = trace_id or _current_trace.get()
+        if trace_id is None:
+            return
+        with self._lock:
+            marks = self._traces.get(trace_id)
+            if marks is not None:
+                marks.append((event, time.perf_counter() if at is None else at))
+
+    def end_trace(self, trace_id: Optional[str] = None):
+        """Cierra la traza: calcula la duración entre marcas consecutivas y la exporta"""
+        if not self.enabled:
+            return
+        trace_id = trace_id or _current_trace.get()
+        with self._lock:
+            marks = self._traces.pop(trace_id, None)
+        if not marks:
+            return
+
+        marks.sort(key=lambda mark: mark[1])
+        stages = {}
+        with self._lock:
+            for (prev, t0), (event, t1) in zip(marks, marks[1:]):
+                stage = f"{prev}→{event}"
+                stages[stage] = round((t1 - t0) * 1000, 3)
+                self.histograms.setdefault(stage, Histogram()).add(t1 - t0)
+            total = marks[-1][1] - marks[0][1]
+            self.histograms.setdefault("trace.total", Histogram()).add(total)
+
+        self._export({
+            "kind": "trace",
+            "trace": trace_id,
+            "marks": [event for event, _ in marks],
+            "stages_ms": stages,
+            "total_ms": round(total * 1000, 3),
+        })
+        if _current_trace.get() == trace_id:
+            _current_trace.set(None)
+
+    # --- Resultados ---
+
+    def summary(self) -> dict:
+        """Percentiles por span/etapa, en segundos"""
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+
+    def report(self) -> str:
+        """Tabla legible de percentiles (ms)"""
+        lines = [f"{'Etapa':<44} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9}"]
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<44} {stats['count']:>5} {stats['p50'] * 1000:>9.1f} "
+                f"{stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    def _export(self, record: dict):
+        if not self.export_path:
+            return
+        record["ts"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                self.export_path.parent.mkdir(parents=True, exist_ok=True)
+                if self.export_path.exists() and self.export_path.stat().st_size + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"⚠️ No se pudo exportar la traza: {e}")
+
+    def _rotate(self):
+        """traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.N (se descarta el más viejo)"""
+        for index in range(self.backups, 0, -1):
+            source = self.export_path if index == 1 else self.export_path.with_name(f"{self.export_path.name}.{index - 1}")
+            target = self.export_path.with_name(f"{self.export_path.name}.{index}")
+            if source.exists():
+                source.replace(target)
+
+
+# Instancia global (se activa con FERRXOS_TRACE=1 o desde Configuración)
+tracer = Tracer(enabled=os.environ.get("FERRXOS_TRACE") == "1")
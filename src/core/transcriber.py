@@ -8,6 +8,9 @@ import base64
 import io
 import wave
 
+from core.metrics import usage_metrics, usage_from_response
+from core.tracing import tracer
+
 try:
     import google.generativeai as genai
     GENAI_AVAILABLE = True
@@ -17,13 +20,20 @@ except ImportError:
 class AudioTranscriber:
     """Transcribidor de audio usando Google Gemini"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, compact_silence: bool = True, speaker_turns: bool = False):
         """Inicializa el transcribidor con API Key de Gemini
         
         Args:
             api_key: API Key de Google Gemini
+            compact_silence: Quitar/acortar silencios antes de subir el audio
+            speaker_turns: Detectar turnos de hablante en local y etiquetar la transcripción
         """
         self.api_key = api_key
+        self.compact_silence = compact_silence
+        self.speaker_turns = speaker_turns
+        self.last_offset_map = None  # Mapa de tiempos del último audio compactado
+        self.last_turns = None  # Turnos (inicio_s, fin_s, hablante) del último audio
+        self.last_usage = None  # Uso (tokens y segundos de audio) de la última llamada
         
         if GENAI_AVAILABLE and api_key:
             try:
@@ -45,44 +55,77 @@ class AudioTranscriber:
                 return False
         return False
     
-    def transcribe_audio(self, audio_bytes: bytes, language: str = "es") -> str:
+    def transcribe_audio(self, audio_bytes: bytes, language: str = "es", sample_rate: int = 16000,
+                         turns: Optional[list] = None) -> str:
         """Transcribe audio a texto usando Gemini
         
         Args:
             audio_bytes: Datos de audio en bytes (PCM 16-bit)
             language: Código de idioma (ej: es para español)
+            sample_rate: Tasa de muestreo del audio (Hz)
+            turns: Turnos de hablante ya detectados (inicio_s, fin_s, hablante) en
+                tiempos de este audio, siempre se etiquetan; si es None y `speaker_turns`
+                está activo, se detectan aquí (y se etiqueta si hay más de un hablante)
         
         Returns:
-            Texto transcrito
+            Texto transcrito (con "Hablante N:" por intervención si hay varios hablantes)
         """
+        self.last_usage = None
+        self.last_turns = None
         if not self.api_key:
             return "❌ Transcribidor no disponible. Configura tu API Key de Gemini."
         
         if not audio_bytes or len(audio_bytes) < 1000:
             return "⚠️ Audio muy corto o vacío"
         
+        if turns is None and self.speaker_turns:
+            with tracer.span("transcriber.speakers"):
+                turns = self._detect_turns(audio_bytes, sample_rate)
+        
+        # Quitar silencios antes de subir (menos bytes, tokens de audio y latencia)
+        if self.compact_silence:
+            with tracer.span("transcriber.compact"):
+                audio_bytes = self._compact(audio_bytes, sample_rate)
+            if not audio_bytes:
+                return "⚠️ No se detectó audio claro."
+            if turns and self.last_offset_map is not None:
+                offset_map = self.last_offset_map
+                turns = [(offset_map.to_compact(start), offset_map.to_compact(end), speaker)
+                         for start, end, speaker in turns]
+        
+        prompt = "Transcribe este audio a texto en español. Responde SOLO con el texto transcrito."
+        if turns:
+            self.last_turns = turns
+            prompt += self._speaker_prompt(turns)
+        audio_seconds = len(audio_bytes) / 2 / sample_rate
+        model = response = None
         try:
             # Convertir PCM raw a WAV format
-            audio_buffer = io.BytesIO()
-            with wave.open(audio_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)  # Mono
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(16000)  # 16kHz
-                wav_file.writeframes(audio_bytes)
-            
-            wav_audio = audio_buffer.getvalue()
-            audio_b64 = base64.standard_b64encode(wav_audio).decode('utf-8')
+            with tracer.span("transcriber.wav_encode", bytes=len(audio_bytes)):
+                audio_buffer = io.BytesIO()
+                with wave.open(audio_buffer, 'wb') as wav_file:
+                    wav_file.setnchannels(1)  # Mono
+                    wav_file.setsampwidth(2)  # 16-bit
+                    wav_file.setframerate(sample_rate)
+                    wav_file.writeframes(audio_bytes)
+                
+                wav_audio = audio_buffer.getvalue()
+                audio_b64 = base64.standard_b64encode(wav_audio).decode('utf-8')
             
             # Usar Gemini 2.0 Flash para transcribir (soporta audio)
             model = genai.GenerativeModel('gemini-2.0-flash')
             
-            response = model.generate_content([
-                "Transcribe este audio a texto en español. Responde SOLO con el texto transcrito.",
-                {
-                    "mime_type": "audio/wav",
-                    "data": audio_b64
-                }
-            ])
+            tracer.mark("request_sent")
+            with tracer.span("transcriber.request"):
+                response = model.generate_content([
+                    prompt,
+                    {
+                        "mime_type": "audio/wav",
+                        "data": audio_b64
+                    }
+                ])
+            # Respuesta no streaming: el primer byte llega con la respuesta completa
+            tracer.mark("first_byte")
             
             text = response.text.strip() if response else "⚠️ Sin respuesta"
             
@@ -95,6 +138,57 @@ class AudioTranscriber:
         except Exception as e:
             print(f"❌ Error en transcripción: {e}")
             return f"❌ Error: {str(e)}"
+        finally:
+            # También las fallidas: cuentan para la cuota
+            if model is not None:
+                self.last_usage = usage_from_response(response, prompt, audio_seconds)
+                usage_metrics.record("transcripcion", self.last_usage)
+    
+    def _detect_turns(self, audio_bytes: bytes, sample_rate: int) -> Optional[list]:
+        """Turnos de hablante del audio (None si hay un solo hablante o no se pudo)"""
+        try:
+            from core.audio import pcm16_to_float, speaker_turns
+            turns = speaker_turns(pcm16_to_float(audio_bytes), sample_rate)
+        except Exception as e:
+            print(f"⚠️ No se pudieron detectar hablantes: {e}")
+            return None
+        speakers = len({speaker for _, _, speaker in turns})
+        if speakers < 2:
+            return None
+        print(f"🗣️ {speakers} hablantes, {len(turns)} turnos")
+        return turns
+    
+    @staticmethod
+    def _speaker_prompt(turns: list, max_turns: int = 200) -> str:
+        """Instrucción con la tabla de turnos detectados en local"""
+        def clock(seconds: float) -> str:
+            return f"{int(seconds) // 60}:{int(seconds) % 60:02d}"
+        
+        table = "\n".join(f"[{clock(start)}-{clock(end)}] Hablante {speaker}"
+                          for start, end, speaker in turns[:max_turns])
+        return ("\n\nCambios de hablante detectados (tiempos del audio):\n" + table +
+                "\nEmpieza cada intervención en una línea nueva con 'Hablante N: ' según esa tabla.")
+    
+    def _compact(self, audio_bytes: bytes, sample_rate: int) -> bytes:
+        """Compacta los silencios; guarda el mapa de tiempos en `last_offset_map`"""
+        try:
+            from core.audio import compact_speech
+            compacted, offset_map = compact_speech(audio_bytes, sample_rate)
+        except Exception as e:
+            print(f"⚠️ No se pudo compactar el audio, se envía completo: {e}")
+            self.last_offset_map = None
+            return audio_bytes
+        
+        if not compacted:
+            # Nada superó el umbral de voz: mejor enviar todo que perder el tramo
+            print("⚠️ No se detectaron regiones de voz, se envía el audio completo")
+            self.last_offset_map = None
+            return audio_bytes
+        
+        self.last_offset_map = offset_map
+        print(f"✂️ Silencios eliminados: {offset_map.removed_ratio():.0%} del audio "
+              f"({len(audio_bytes) // 1024} KB -> {len(compacted) // 1024} KB)")
+        return compacted
     
     def transcribe_audio_file(self, file_path: str, language: str = "es-ES") -> str:
         """Transcribe un archivo de audio
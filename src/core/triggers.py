@@ -0,0 +1,181 @@
+"""
+Módulo de Disparadores
+Detecta en local frases clave en la transcripción en vivo (precio, objeciones,
+"¿alguna pregunta?"...) con un autómata Aho-Corasick y decide cuándo vale la
+pena pedir un análisis: en el momento justo y no durante la charla de relleno.
+"""
+
+import json
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable, Optional
+
+TRIGGER_COOLDOWN_SECONDS = 30.0  # Entre dos análisis disparados (los de prioridad alta esperan la mitad)
+HIGH_PRIORITY = 2
+
+# Frases por modo: categoría -> (prioridad, frases). Se comparan sin tildes ni mayúsculas
+# y por palabras completas.
+DEFAULT_CUES = {
+    "negocios": {
+        "precio": (1, ["precio", "cuanto cuesta", "cuanto sale", "presupuesto", "descuento", "tarifa",
+                       "forma de pago", "cotizacion"]),
+        "objecion": (2, ["es muy caro", "demasiado caro", "no estoy seguro", "lo tengo que pensar",
+                         "lo tenemos que pensar", "no me convence", "la competencia", "ya tenemos proveedor",
+                         "no es el momento"]),
+        "cierre": (2, ["firmar", "contrato", "cuando empezamos", "siguientes pasos", "proximos pasos"]),
+    },
+    "entrevista": {
+        "turno": (2, ["alguna pregunta", "tienes preguntas", "tiene preguntas", "algo que quieras agregar"]),
+        "tema": (1, ["cuentame", "experiencia", "por que deberiamos", "pretension salarial", "salario",
+                     "un reto", "un conflicto"]),
+    },
+    "presentacion": {
+        "cierre": (2, ["alguna pregunta", "en resumen", "para concluir", "para terminar", "en conclusion"]),
+        "seccion": (1, ["siguiente diapositiva", "pasemos a", "el siguiente punto", "como ven aqui"]),
+    },
+    "custom": {
+        "turno": (2, ["alguna pregunta", "siguientes pasos", "en resumen"]),
+    },
+}
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni signos, palabras separadas por un espacio"""
+    text = unicodedata.normalize("NFD", text.lower())
+    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def load_cues(path: Path) -> dict:
+    """Frases de un JSON {modo: {categoría: [frases] | {"prioridad": n, "frases": [...]}}}
+
+    Se combinan con las predeterminadas: una categoría del archivo reemplaza a la del mismo nombre.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    cues = {mode: dict(categories) for mode, categories in DEFAULT_CUES.items()}
+    for mode, categories in data.items():
+        for category, spec in categories.items():
+            if isinstance(spec, dict):
+                cues.setdefault(mode, {})[category] = (int(spec.get("prioridad", 1)), list(spec["frases"]))
+            else:
+                cues.setdefault(mode, {})[category] = (1, list(spec))
+    return cues
+
+
+class KeywordMatcher:
+    """Autómata Aho-Corasick sobre texto normalizado, alimentado por trozos
+
+    El estado se conserva entre llamadas a `feed`, así una frase partida entre
+    dos tramos de la transcripción también se detecta.
+    """
+
+    def __init__(self, phrases: dict):
+        """
+        Args:
+            phrases: frase -> dato devuelto al encontrarla (p. ej. (categoría, prioridad))
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for phrase, value in phrases.items():
+            pattern = f" {normalize(phrase)} "  # Espacios: solo palabras completas
+            if pattern.strip():
+                self._insert(pattern, (phrase, value))
+        self._build_failure_links()
+        self.state = 0
+        self.feed(" ")
+
+    def _insert(self, pattern: str, item: tuple):
+        node = 0
+        for char in pattern:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.output[node].append(item)
+
+    def _build_failure_links(self):
+        """Enlaces de fallo por anchura (cada nodo hereda las salidas de su sufijo)"""
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def feed(self, text: str) -> list:
+        """Avanza el autómata con un trozo de texto (ya normalizado)
+
+        Returns:
+            Lista de (frase, dato) encontradas en este trozo
+        """
+        found = []
+        goto, fail, output = self.goto, self.fail, self.output
+        node = self.state
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.extend(output[node])
+        self.state = node
+        return found
+
+    def reset(self):
+        self.state = 0
+        self.feed(" ")
+
+
+class TriggerEngine:
+    """Decide cuándo la transcripción en vivo merece un análisis
+
+    Cada tramo nuevo pasa por el autómata del modo; si aparece una frase clave y
+    ya pasó el tiempo de espera desde el último disparo, se pide un análisis (los
+    de prioridad alta, como una objeción, esperan la mitad).
+    """
+
+    def __init__(self, mode: str, cues: Optional[dict] = None, cooldown_seconds: float = TRIGGER_COOLDOWN_SECONDS,
+                 clock: Callable = time.monotonic):
+        cues = cues or DEFAULT_CUES
+        categories = cues.get(mode) or cues.get("custom") or {}
+        self.matcher = KeywordMatcher({
+            phrase: (category, priority)
+            for category, (priority, phrases) in categories.items() for phrase in phrases
+        })
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.last_fired = None
+        self.stats = {"matches": 0, "fired": 0, "suppressed": 0}
+        self._lock = threading.Lock()
+
+    def feed(self, text: str) -> Optional[dict]:
+        """Procesa un tramo de la transcripción (en orden)
+
+        Returns:
+            {"phrase", "category", "priority"} si hay que analizar ahora, o None
+        """
+        with self._lock:
+            hits = self.matcher.feed(normalize(text) + " ")
+            if not hits:
+                return None
+            self.stats["matches"] += len(hits)
+            phrase, (category, priority) = max(hits, key=lambda hit: hit[1][1])
+            now = self.clock()
+            wait = self.cooldown_seconds / 2 if priority >= HIGH_PRIORITY else self.cooldown_seconds
+            if self.last_fired is not None and now - self.last_fired < wait:
+                self.stats["suppressed"] += 1
+                return None
+            self.last_fired = now
+            self.stats["fired"] += 1
+            return {"phrase": phrase, "category": category, "priority": priority}
@@ -5,17 +5,41 @@ Entrada principal de la aplicación
 
 import sys
 from pathlib import Path
-from PyQt6.QtWidgets import QApplication
 
 # Agregar src al path
 sys.path.insert(0, str(Path(__file__).parent))
 
+# Modo por lotes, exportar/importar y servidor local: sin Qt
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("batch", "export", "import"):
+    from cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "serve":
+    from server import main as serve_main
+    sys.exit(serve_main(sys.argv[2:]))
+
+from core.startup import startup_timer
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
+startup_timer.mark("import PyQt6")
+
 from ui.main_window import MainWindow
+startup_timer.mark("import ui.main_window")
 
 def main():
     app = QApplication(sys.argv)
+    startup_timer.mark("QApplication")
     window = MainWindow()
     window.show()
+    startup_timer.mark("MainWindow.show")
+    
+    # Se ejecuta al volver al event loop, tras el primer pintado
+    def on_first_paint():
+        startup_timer.mark("primer pintado")
+        print(startup_timer.report())
+        window.on_first_paint()
+    QTimer.singleShot(0, on_first_paint)
+    
     sys.exit(app.exec())
 
 if __name__ == "__main__":
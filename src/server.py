@@ -0,0 +1,431 @@
+"""
+AI_FERRXOS - Servidor local (sin interfaz)
+Expone el pipeline por HTTP: subir grabaciones o enviar audio en vivo por
+tramos, seguir la transcripción y el análisis por Server-Sent Events y
+consultar el historial. Un solo proceso atiende muchos clientes (asyncio) y
+todos comparten el pool de hilos y el límite de peticiones del pipeline.
+
+Uso:
+    python src/main.py serve --port 8765 [--token SECRETO]
+
+Endpoints:
+    GET  /                          Visor en vivo (navegador / segunda pantalla)
+    GET  /api/events?channel=...    Eventos SSE (todos, o de un canal: job-N / live-N)
+    POST /api/meetings?mode=...     Sube un WAV completo -> {"job", "channel"}
+    POST /api/live?mode=&rate=      Abre una reunión en vivo -> {"session", "channel"}
+    POST /api/live/<id>/audio       Agrega PCM 16-bit mono (se transcribe por tramos)
+    POST /api/live/<id>/end         Cierra la reunión: análisis y guardado
+    GET  /api/history?offset=&limit=
+    GET  /api/history/search?q=
+    GET  /api/history/<id>
+    GET  /api/status                Uso de la API, latencias y trabajos activos
+"""
+
+import argparse
+import asyncio
+import functools
+import hmac
+import io
+import itertools
+import json
+import sys
+import wave
+from collections import deque
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Agregar src al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cli import load_api_key, open_store
+from core.dedup import change_detector
+from core.history_store import HistoryStore
+from core.metrics import usage_metrics
+from core.pipeline import MeetingPipeline, RateLimiter, DEFAULT_REQUESTS_PER_MINUTE
+from core.sessions import SessionManager
+from core.tracing import tracer
+from core.triggers import TRIGGER_COOLDOWN_SECONDS, load_cues
+
+SRC_DIR = Path(__file__).parent
+MAX_BODY_BYTES = 512 * 1024 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+REPLAY_EVENTS = 500  # Eventos por canal que recibe un cliente que se conecta tarde
+SSE_KEEPALIVE_SECONDS = 15
+
+STATUS_TEXT = {200: "OK", 201: "Created", 202: "Accepted", 204: "No Content", 400: "Bad Request",
+               401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+LIVE_PAGE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="UTF-8">
+<title>🤖 AI_FERRXOS - En vivo</title>
+<style>
+ body { background:#1e1e2e; color:#cdd6f4; font-family:Segoe UI, sans-serif; margin:0; display:flex; height:100vh; }
+ section { flex:1; padding:16px; overflow-y:auto; }
+ h2 { color:#89b4fa; } #estado { color:#a6adc8; font-size:12px; }
+ pre { white-space:pre-wrap; font-family:inherit; }
+</style>
+</head>
+<body>
+<section><h2>📝 Transcripción</h2><div id="estado">Conectando...</div><pre id="transcripcion"></pre></section>
+<section><h2>🤖 Análisis</h2><pre id="analisis"></pre></section>
+<script>
+const params = new URLSearchParams(location.search);
+const source = new EventSource("/api/events?" + params.toString());
+const $ = (id) => document.getElementById(id);
+source.onopen = () => $("estado").textContent = "🟢 Conectado" + (params.get("channel") ? " a " + params.get("channel") : "");
+source.onerror = () => $("estado").textContent = "🔴 Reconectando...";
+source.addEventListener("transcript_chunk", (e) => { $("transcripcion").textContent += JSON.parse(e.data).data.text + "\\n"; });
+source.addEventListener("trigger", (e) => { $("estado").textContent = "🎯 " + JSON.parse(e.data).data.phrase + " - analizando..."; });
+source.addEventListener("summary", (e) => { $("analisis").textContent = JSON.parse(e.data).data.text; });
+source.addEventListener("analysis", (e) => { $("analisis").textContent = JSON.parse(e.data).data.text; });
+source.addEventListener("error", (e) => { if (e.data) $("estado").textContent = "❌ " + JSON.parse(e.data).data.message; });
+source.addEventListener("saved", (e) => { $("estado").textContent = "✅ Guardada como reunión " + JSON.parse(e.data).data.meeting_id; });
+</script>
+</body>
+</html>
+"""
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class EventBus:
+    """Difunde eventos (desde cualquier hilo) a los clientes SSE suscritos"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.subscribers = set()  # (cola, canal o None)
+        self.history = {}  # canal -> deque de eventos recientes
+        self._ids = itertools.count(1)
+
+    def publish(self, channel: str, event: str, data: dict):
+        """Publica un evento; seguro desde hilos del pipeline"""
+        self.loop.call_soon_threadsafe(self._dispatch, channel, event, data)
+
+    def _dispatch(self, channel: str, event: str, data: dict):
+        message = {"id": next(self._ids), "channel": channel, "event": event, "data": data}
+        self.history.setdefault(channel, deque(maxlen=REPLAY_EVENTS)).append(message)
+        for queue, wanted in list(self.subscribers):
+            if wanted in (None, channel):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    pass  # Cliente lento: pierde eventos en vez de acumular memoria
+
+    def forget(self, channel: str):
+        """Descarta los eventos guardados de un canal (sesión ya olvidada); seguro desde hilos"""
+        self.loop.call_soon_threadsafe(self.history.pop, channel, None)
+
+    def subscribe(self, channel: Optional[str]) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1000)
+        for message in self.history.get(channel, ()) if channel else ():
+            queue.put_nowait(message)
+        self.subscribers.add((queue, channel))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, channel: Optional[str]):
+        self.subscribers.discard((queue, channel))
+
+
+def read_wav(body: bytes) -> tuple:
+    """(pcm16 mono, tasa) de un WAV subido"""
+    with wave.open(io.BytesIO(body), "rb") as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise HttpError(400, "Solo se admite WAV PCM de 16 bits")
+        channels = wav_file.getnchannels()
+        rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+    if channels > 1:
+        import numpy as np
+        frames = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels).mean(axis=1).astype(np.int16).tobytes()
+    return frames, rate
+
+
+class MeetingServer:
+    """Servidor HTTP/SSE mínimo sobre asyncio (solo biblioteca estándar)"""
+
+    def __init__(self, sessions: SessionManager, store: HistoryStore, token: str = ""):
+        self.sessions = sessions
+        self.store = store
+        self.token = token
+        self.bus = None
+
+    async def serve(self, host: str, port: int):
+        self.bus = EventBus(asyncio.get_running_loop())
+        self.sessions.publish = self.bus.publish
+        self.sessions.on_pruned = self.bus.forget
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        print(f"🌐 Servidor en http://{host}:{port}/" + (f"?token={self.token}" if self.token else ""))
+        async with server:
+            await server.serve_forever()
+
+    # --- HTTP ---
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, query, headers, body = await self._read_request(reader)
+            self._check_token(query, headers)
+            await self.route(method, path, query, headers, body, writer)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {"error": str(e)})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"❌ Error en el servidor: {e}")
+            try:
+                await self._send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, "Cabeceras demasiado grandes")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Petición inválida")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                try:
+                    size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                except ValueError:
+                    raise HttpError(400, "Tamaño de bloque inválido")
+                if size < 0:
+                    raise HttpError(400, "Tamaño de bloque inválido")
+                if size == 0:
+                    await reader.readline()
+                    break
+                body.extend(await reader.readexactly(size))
+                await reader.readexactly(2)
+                if len(body) > MAX_BODY_BYTES:
+                    raise HttpError(413, "Cuerpo demasiado grande")
+            body = bytes(body)
+        else:
+            try:
+                length = int(headers.get("content-length", "0") or 0)
+            except ValueError:
+                raise HttpError(400, "Content-Length inválido")
+            if length < 0:
+                raise HttpError(400, "Content-Length inválido")
+            if length > MAX_BODY_BYTES:
+                raise HttpError(413, "Cuerpo demasiado grande")
+            body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return method.upper(), url.path.rstrip("/") or "/", query, headers, body
+
+    def _check_token(self, query: dict, headers: dict):
+        if not self.token:
+            return
+        given = query.get("token") or headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(given.encode(), self.token.encode()):
+            raise HttpError(401, "Token inválido")
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str):
+        writer.write((f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                      f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                      f"Connection: close\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload):
+        await self._send(writer, status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                         "application/json; charset=utf-8")
+
+    async def _in_thread(self, fn, *args):
+        """Trabajo bloqueante fuera del event loop (consultas SQLite, cortes de audio con numpy)"""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    @staticmethod
+    def _int_param(query: dict, name: str, default: int, minimum: int) -> int:
+        """Parámetro entero de la URL; 400 si no es un número o es menor que `minimum`"""
+        try:
+            value = int(query.get(name, default))
+        except (TypeError, ValueError):
+            raise HttpError(400, f"'{name}' debe ser un número entero")
+        if value < minimum:
+            raise HttpError(400, f"'{name}' debe ser al menos {minimum}")
+        return value
+
+    # --- Rutas ---
+
+    async def route(self, method: str, path: str, query: dict, headers: dict, body: bytes, writer):
+        parts = path.strip("/").split("/")
+
+        if method == "GET" and path == "/":
+            return await self._send(writer, 200, LIVE_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+        if method == "GET" and path == "/api/events":
+            return await self.stream_events(writer, query.get("channel"))
+        if method == "GET" and path == "/api/status":
+            return await self._send_json(writer, 200, {
+                "usage": usage_metrics.snapshot()["session"],
+                "analysis_dedup": change_detector.snapshot(),
+                "latency": tracer.summary(),
+                "sessions": self.sessions.snapshot(),
+                "speculation": self.sessions.speculation_snapshot(),
+                "sse_clients": len(self.bus.subscribers),
+            })
+
+        if path == "/api/meetings":
+            self._require(method, "POST")
+            return await self.upload_meeting(query, headers, body, writer)
+
+        if parts[:2] == ["api", "live"]:
+            self._require(method, "POST")
+            if len(parts) == 2:
+                return await self.open_live(query, writer)
+            session = self.sessions.get(int(parts[2])) if parts[2].isdigit() else None
+            if session is None or session.kind != "live":
+                raise HttpError(404, "Sesión en vivo no encontrada")
+            if session.ended:
+                raise HttpError(409, "La sesión ya terminó")
+            if parts[3:] == ["audio"]:
+                await self._in_thread(session.append, body)
+                return await self._send_json(writer, 202, {"buffered_s": round(session.buffered_seconds, 2),
+                                                           "segments": session.next_index})
+            if parts[3:] == ["end"]:
+                await self._in_thread(session.finish)
+                return await self._send_json(writer, 202, {"channel": session.channel})
+            raise HttpError(404, "Ruta no encontrada")
+
+        if parts[:2] == ["api", "history"]:
+            self._require(method, "GET")
+            if len(parts) == 2:
+                offset = self._int_param(query, "offset", 0, minimum=0)
+                limit = min(self._int_param(query, "limit", 50, minimum=1), 500)
+                return await self._send_json(writer, 200, await self._in_thread(self.store.page, offset, limit))
+            if parts[2] == "search":
+                return await self._send_json(writer, 200, await self._in_thread(self.store.search, query.get("q", "")))
+            if parts[2].isdigit():
+                meeting = await self._in_thread(self.store.get, int(parts[2]))
+                if not meeting:
+                    raise HttpError(404, "Reunión no encontrada")
+                return await self._send_json(writer, 200, meeting)
+
+        raise HttpError(404, "Ruta no encontrada")
+
+    def _require(self, method: str, expected: str):
+        if method != expected:
+            raise HttpError(405, f"Usa {expected}")
+
+    async def upload_meeting(self, query: dict, headers: dict, body: bytes, writer):
+        if not body:
+            raise HttpError(400, "Falta el audio")
+        if body[:4] == b"RIFF":
+            audio_bytes, rate = read_wav(body)
+        else:
+            audio_bytes, rate = body[:len(body) - len(body) % 2], self._int_param(query, "rate", 16000, minimum=1)
+        if rate <= 0:
+            raise HttpError(400, "El WAV no indica una tasa de muestreo válida")
+        weight = self._int_param(query, "weight", 1, minimum=1)
+
+        session = await self._in_thread(functools.partial(
+            self.sessions.replay, audio_bytes, rate, weight=weight, mode=query.get("mode", "negocios"),
+            custom_prompt=query.get("prompt", ""), titulo=query.get("titulo", ""),
+        ))
+        await self._send_json(writer, 202, {"job": session.session_id, "channel": session.channel})
+
+    async def open_live(self, query: dict, writer):
+        session = self.sessions.open(
+            kind="live", weight=self._int_param(query, "weight", 1, minimum=1),
+            sample_rate=self._int_param(query, "rate", 16000, minimum=1),
+            mode=query.get("mode", "negocios"), custom_prompt=query.get("prompt", ""),
+            titulo=query.get("titulo", ""),
+        )
+        await self._send_json(writer, 201, {"session": session.session_id, "channel": session.channel})
+
+    async def stream_events(self, writer: asyncio.StreamWriter, channel: Optional[str]):
+        """Server-Sent Events hasta que el cliente se desconecte"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+        await writer.drain()
+        queue = self.bus.subscribe(channel)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                else:
+                    payload = json.dumps(message, ensure_ascii=False)
+                    writer.write(f"id: {message['id']}\nevent: {message['event']}\ndata: {payload}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            self.bus.unsubscribe(queue, channel)
+
+
+def main(argv: list = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "serve":
+        argv = argv[1:]
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Servidor local del pipeline")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz (por defecto solo este equipo)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", default="", help="Token requerido (?token= o Authorization: Bearer)")
+    parser.add_argument("--workers", type=int, default=4, help="Hilos del pipeline compartido")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_REQUESTS_PER_MINUTE, help="Peticiones por minuto")
+    parser.add_argument("--segment-seconds", type=float, default=20.0, help="Tramo inicial de transcripción en vivo")
+    parser.add_argument("--min-segment-seconds", type=float, default=5.0, help="Tramo en vivo mínimo")
+    parser.add_argument("--max-segment-seconds", type=float, default=60.0, help="Tramo en vivo máximo")
+    parser.add_argument("--fixed-segments", action="store_true", help="Tramos en vivo de duración fija")
+    parser.add_argument("--speakers", action="store_true", help="Etiquetar hablantes (detección local)")
+    parser.add_argument("--summary-every", type=int, default=0,
+                        help="Actualizar el resumen en vivo cada N tramos (0 = solo al final)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Empezar el análisis en las pausas, sin esperar a la transcripción del último tramo")
+    parser.add_argument("--no-triggers", action="store_true",
+                        help="No actualizar el resumen en vivo al detectar frases clave")
+    parser.add_argument("--triggers", help="JSON con frases clave por modo (se combinan con las predeterminadas)")
+    parser.add_argument("--trigger-cooldown", type=float, default=TRIGGER_COOLDOWN_SECONDS,
+                        help="Segundos mínimos entre dos resúmenes disparados por frases clave")
+    parser.add_argument("--db", default=str(SRC_DIR / "history.db"), help="Base del historial")
+    parser.add_argument("--api-key", help="API Key de Gemini (por defecto, GEMINI_API_KEY o config.json)")
+    args = parser.parse_args(argv)
+
+    api_key = load_api_key(args.api_key)
+    if not api_key:
+        print("❌ Falta la API Key (--api-key, GEMINI_API_KEY o config.json)")
+        return 2
+    if args.host not in ("127.0.0.1", "localhost", "::1") and not args.token:
+        print("⚠️ Servidor expuesto en la red sin --token: cualquiera podrá leer el historial")
+
+    store = open_store(args.db)
+    pipeline = MeetingPipeline(api_key, history_store=store, rate_limiter=RateLimiter(args.rpm),
+                               workers=args.workers, speaker_turns=args.speakers)
+    sessions = SessionManager(pipeline, segment_seconds=args.segment_seconds, summary_every=args.summary_every,
+                              adaptive=not args.fixed_segments, min_segment_seconds=args.min_segment_seconds,
+                              max_segment_seconds=args.max_segment_seconds, triggers=not args.no_triggers,
+                              cues=load_cues(Path(args.triggers)) if args.triggers else None,
+                              trigger_cooldown=args.trigger_cooldown, speculative=args.speculative)
+    server = MeetingServer(sessions, store, token=args.token)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n⏹️ Servidor detenido")
+    finally:
+        pipeline.shutdown(wait=False)
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,25 +3,47 @@ Ventana Principal de AI_FERRXOS
 Contiene las pestañas: Live Feed, Configuración e Historial
 """
 
+import html
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QTableWidget, QTableWidgetItem, QTextEdit,
-    QScrollArea, QFrame
+    QScrollArea, QFrame, QLineEdit, QCheckBox, QComboBox
 )
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QFont, QIcon
+from PyQt6.QtGui import QFont, QIcon, QKeySequence, QShortcut
 
 from ui.styles import STYLESHEET, get_color
 from ui.widgets import (
-    CustomButton, ApiKeyInput, ModeSelector, HistoryItem, show_message
+    CustomButton, ApiKeyInput, ModeSelector, HistoryItem, AudioLevelMeter, show_message
 )
-from core.ai_brain import AIBrain
 from core.ghost import enable_ghost_mode
-from core.audio import AudioCapture
-from core.transcriber import AudioTranscriber
+from core.startup import startup_timer
+from core.tracing import tracer
+from core.metrics import usage_metrics, merge_usage
+from core.memdebug import mem_debugger
+from core.history_store import HistoryStore, HIGHLIGHT_START, HIGHLIGHT_END
+from core.crypto import (
+    PURPOSE_AUDIO, PURPOSE_CONFIG, PURPOSE_HISTORY, PURPOSE_JOBS, SECRET_FIELDS, keyring_for, open_config,
+    seal_config
+)
+from core.job_queue import JOB_ANALYZE, JOB_TRANSCRIBE
+from core.pipeline import is_retryable
+
+# Reuniones por página en la tabla del Historial
+HISTORY_PAGE_SIZE = 100
+
+# Presupuesto (tokens aprox.) de fragmentos de reuniones anteriores en el prompt
+HISTORY_CONTEXT_TOKENS = 400
+
+# Columnas de la tabla del Historial
+COL_FECHA, COL_TITULO, COL_MODO, COL_COINCIDENCIA, COL_ACCION = range(5)
+
+# Índices de las pestañas (Configuración e Historial se construyen al primer uso)
+TAB_LIVE, TAB_SETTINGS, TAB_HISTORY = 0, 1, 2
 
 class MainWindow(QMainWindow):
     """Ventana principal de la aplicación"""
@@ -29,8 +51,17 @@ class MainWindow(QMainWindow):
     # Señales para comunicación entre threads
     test_result_signal = pyqtSignal(bool)
     silence_detected_signal = pyqtSignal()  # Signal para detección de silencio thread-safe
+    audio_level_signal = pyqtSignal()  # Niveles nuevos disponibles (coalescente, tasa limitada)
+    history_loaded_signal = pyqtSignal()  # Terminó la apertura del historial en segundo plano (con o sin éxito)
+    job_saved_signal = pyqtSignal(int)  # Reunión encolada (sin red o sin cuota) ya procesada y guardada
+    history_io_signal = pyqtSignal(str, bool)  # Exportación/importación terminada (mensaje, error)
+    storage_error_signal = pyqtSignal(str)  # Config o historial ilegibles (p. ej. falta ferrxos.key)
     
-    def __init__(self):
+    def __init__(self, data_dir: Path = None):
+        """
+        Args:
+            data_dir: Carpeta de config, historial y audio (por defecto, src/)
+        """
         super().__init__()
         self.setWindowTitle("🤖 AI_FERRXOS - Asistente de Reuniones")
         self.setGeometry(100, 100, 1200, 700)
@@ -38,32 +69,46 @@ class MainWindow(QMainWindow):
         # Conectar señales
         self.test_result_signal.connect(self._on_test_result)
         self.silence_detected_signal.connect(self._on_silence_detected)
+        self.audio_level_signal.connect(self._on_audio_level)
+        self.history_loaded_signal.connect(self._on_history_loaded)
+        self.job_saved_signal.connect(self._on_job_saved)
+        self.history_io_signal.connect(self._on_history_io_done)
+        self.storage_error_signal.connect(self._on_storage_error)
         
-        # Cargar config e historial
-        self.config_path = Path(__file__).parent.parent / "config.json"
-        self.history_path = Path(__file__).parent.parent / "history.json"
+        # Cargar config; el historial se abre en segundo plano
+        data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent
+        self.config_path = data_dir / "config.json"
+        self.history_path = data_dir / "history.json"
+        self.history_db_path = data_dir / "history.db"
+        self.audio_archive_dir = data_dir / "audio_archive"
+        self.traces_path = data_dir / "traces.jsonl"
+        self.jobs_db_path = data_dir / "jobs.db"
+        self.keyring = keyring_for(data_dir)  # None sin `cryptography`: todo se guarda en claro
+        self.config_locked = False  # config.json no se pudo descifrar: no sobrescribirlo
         self.config = self._load_config()
-        self.history = self._load_history()
-        
-        # IA
-        self.ai_brain = AIBrain()
+        tracer.configure(self.config.get("trazas", False) or tracer.enabled, export_path=self.traces_path)
+        self.history_store = None
+        self.meeting_index = None  # Índice semántico (se construye en segundo plano)
+        self.history = []  # Filas (metadatos) ya cargadas en la tabla
+        self.job_queue = None  # Cola persistente de reuniones pendientes (ver _start_job_runner)
+        self.job_runner = None
+        self._job_runner_lock = threading.Lock()
+        self._history_loaded = False  # Solo se toca en el hilo de UI (ver _on_history_loaded)
+        self._after_history_loaded = []  # Guardados pedidos mientras el historial se abría
+        threading.Thread(target=self._load_history_in_background, daemon=True).start()
+        startup_timer.mark("config + hilo de historial")
         
-        # Audio
-        self.audio_capture = AudioCapture()
-        
-        # Transcribidor (configurar con API Key)
-        api_key = self.config.get("api_key", "")
-        if api_key:
-            self.transcriber = AudioTranscriber(api_key=api_key)
-        else:
-            self.transcriber = None
-            # No mostrar error popup al inicio - será mostrado cuando intente usar transcriptor
+        # IA, audio y transcribidor se crean en el primer uso (ver propiedades)
+        self._ai_brain = None
+        self._audio_capture = None
+        self._transcriber = None
         
         # Aplicar estilos
         self.setStyleSheet(STYLESHEET)
         
         # Crear interfaz
         self._create_ui()
+        startup_timer.mark("UI (Live Feed)")
         
         # Activar Ghost Mode (invisible en capturas de pantalla)
         try:
@@ -72,9 +117,49 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"⚠️ Ghost Mode no disponible: {e}")
         
+        # Diagnóstico de memoria: 1ª vez activa tracemalloc, después vuelca los mayores asignadores
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self, activated=mem_debugger.dump)
+        mem_debugger.install_signal_handler()
+        
         # NO iniciar escucha automática - permitir entrada manual
         print("⏸️ Micrófono desactivado - usa el botón 'Analizar' con texto manual")
     
+    @property
+    def ai_brain(self):
+        """Cliente de IA (importa Gemini en el primer uso)"""
+        if self._ai_brain is None:
+            from core.ai_brain import AIBrain
+            self._ai_brain = AIBrain(api_key=self.config.get("api_key") or None)
+        return self._ai_brain
+    
+    @property
+    def audio_capture(self):
+        """Capturador de audio (importa sounddevice/numpy en el primer uso)"""
+        if self._audio_capture is None:
+            from core.audio import AudioCapture
+            self._audio_capture = AudioCapture(noise_suppression=self.config.get("reducir_ruido", False))
+        return self._audio_capture
+    
+    @property
+    def transcriber(self):
+        """Transcribidor de audio, o None si no hay API Key configurada"""
+        if self._transcriber is None and self.config.get("api_key"):
+            from core.transcriber import AudioTranscriber
+            self._transcriber = AudioTranscriber(api_key=self.config["api_key"],
+                                                 speaker_turns=self.config.get("hablantes", False))
+        return self._transcriber
+    
+    def on_first_paint(self):
+        """Llamado tras el primer pintado: precarga los backends pesados en segundo plano"""
+        def warm_up():
+            try:
+                import core.ai_brain  # noqa: F401 (importa google.generativeai)
+                import core.audio  # noqa: F401 (importa sounddevice y numpy)
+            except Exception as e:
+                print(f"⚠️ Precarga de módulos fallida: {e}")
+        
+        threading.Thread(target=warm_up, daemon=True).start()
+    
     def _create_ui(self):
         """Crea la interfaz de usuario"""
         # Widget central con tabs
@@ -88,14 +173,48 @@ class MainWindow(QMainWindow):
         self.tabs = QTabWidget()
         layout.addWidget(self.tabs)
         
-        # Crear tabs
+        # Crear tabs (Configuración e Historial se construyen al abrirlas)
         self.tab_live = self._create_live_tab()
-        self.tab_settings = self._create_settings_tab()
-        self.tab_history = self._create_history_tab()
+        self.tab_settings = None
+        self.tab_history = None
         
         self.tabs.addTab(self.tab_live, "📡 Live Feed")
-        self.tabs.addTab(self.tab_settings, "⚙️ Configuración")
-        self.tabs.addTab(self.tab_history, "📋 Historial")
+        self.tabs.addTab(QWidget(), "⚙️ Configuración")
+        self.tabs.addTab(QWidget(), "📋 Historial")
+        self.tabs.currentChanged.connect(self._ensure_tab)
+    
+    def _ensure_tab(self, index: int):
+        """Construye la pestaña indicada si todavía es un marcador vacío"""
+        if index == TAB_SETTINGS and self.tab_settings is None:
+            self.tab_settings = self._create_settings_tab()
+            widget, label = self.tab_settings, "⚙️ Configuración"
+        elif index == TAB_HISTORY and self.tab_history is None:
+            self.tab_history = self._create_history_tab()
+            widget, label = self.tab_history, "📋 Historial"
+        else:
+            return
+        
+        current = self.tabs.currentIndex()
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, widget, label)
+        self.tabs.setCurrentIndex(current)
+        self.tabs.blockSignals(False)
+        
+        if index == TAB_HISTORY:
+            self._load_history_table()
+    
+    def _current_mode(self) -> str:
+        """Modo activo (desde el selector si ya existe, si no desde la config)"""
+        if self.tab_settings is not None:
+            return self.mode_selector.get_mode()
+        return self.config.get("modo", "negocios")
+    
+    def _current_custom_prompt(self) -> str:
+        """Prompt personalizado activo"""
+        if self.tab_settings is not None:
+            return self.mode_selector.get_custom_prompt()
+        return self.config.get("custom_prompt", "")
     
     def _create_live_tab(self) -> QWidget:
         """Crea la pestaña Live Feed"""
@@ -132,6 +251,10 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(header_layout)
         
+        # Medidor de nivel y forma de onda
+        self.level_meter = AudioLevelMeter()
+        layout.addWidget(self.level_meter)
+        
         # Área de transcripción
         self.live_transcript = QTextEdit()
         self.live_transcript.setPlaceholderText("La transcripción aparecerá aquí en tiempo real...")
@@ -204,6 +327,49 @@ class MainWindow(QMainWindow):
         separator2.setFrameShadow(QFrame.Shadow.Sunken)
         layout.addWidget(separator2)
         
+        # Contexto de reuniones anteriores
+        self.history_context_check = QCheckBox("📚 Usar reuniones anteriores parecidas como contexto del análisis")
+        self.history_context_check.setChecked(self.config.get("contexto_historial", False))
+        layout.addWidget(self.history_context_check)
+        
+        # Archivo de audio para re-transcribir
+        self.archive_audio_check = QCheckBox("💾 Guardar el audio comprimido de cada reunión (permite re-transcribir)")
+        self.archive_audio_check.setChecked(self.config.get("archivar_audio", False))
+        layout.addWidget(self.archive_audio_check)
+        
+        # Turnos de hablante (detección local, sin llamadas extra a la API)
+        self.speakers_check = QCheckBox("🗣️ Distinguir hablantes en la transcripción (detección local)")
+        self.speakers_check.setChecked(self.config.get("hablantes", False))
+        layout.addWidget(self.speakers_check)
+        
+        self.denoise_check = QCheckBox("🔇 Reducir ruido de fondo al grabar (ventilador, teclado)")
+        self.denoise_check.setChecked(self.config.get("reducir_ruido", False))
+        layout.addWidget(self.denoise_check)
+        
+        # Diagnóstico de latencias por etapa
+        self.tracing_check = QCheckBox("📈 Registrar latencias (diagnóstico)")
+        self.tracing_check.setChecked(tracer.enabled)
+        layout.addWidget(self.tracing_check)
+        
+        self.trace_report = QTextEdit()
+        self.trace_report.setReadOnly(True)
+        self.trace_report.setFont(QFont("Consolas", 9))
+        self.trace_report.setMaximumHeight(150)
+        self.trace_report.setPlaceholderText("Activa el registro de latencias y graba una reunión para ver p50/p95/p99 por etapa")
+        layout.addWidget(self.trace_report)
+        
+        # Uso de la API en la sesión (peticiones, tokens, audio)
+        self.usage_report = QTextEdit()
+        self.usage_report.setReadOnly(True)
+        self.usage_report.setFont(QFont("Consolas", 9))
+        self.usage_report.setMaximumHeight(150)
+        self.usage_report.setPlainText(usage_metrics.report())
+        layout.addWidget(self.usage_report)
+        
+        btn_trace = CustomButton("🔄 Actualizar diagnóstico", "secondary")
+        btn_trace.clicked.connect(self._on_refresh_traces)
+        layout.addWidget(btn_trace)
+        
         # Botones de acción
         btn_layout = QHBoxLayout()
         
@@ -223,6 +389,8 @@ class MainWindow(QMainWindow):
             self.api_key_widget.set_api_key(self.config["api_key"])
         if self.config.get("modo"):
             self.mode_selector.set_mode(self.config["modo"])
+        if self.config.get("custom_prompt"):
+            self.mode_selector.custom_input.setPlainText(self.config["custom_prompt"])
         
         return widget
     
@@ -239,33 +407,94 @@ class MainWindow(QMainWindow):
         titulo.setFont(titulo_font)
         layout.addWidget(titulo)
         
+        # Búsqueda (se ejecuta al dejar de escribir)
+        self.history_search = QLineEdit()
+        self.history_search.setPlaceholderText("🔍 Buscar en títulos, resúmenes y transcripciones...")
+        self.history_search.setClearButtonEnabled(True)
+        layout.addWidget(self.history_search)
+        
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self._on_history_search)
+        self.history_search.textChanged.connect(lambda _: self.search_timer.start())
+        
         # Tabla
         self.history_table = QTableWidget()
-        self.history_table.setColumnCount(4)
+        self.history_table.setColumnCount(5)
         self.history_table.setHorizontalHeaderLabels([
-            "Fecha", "Título", "Modo", "Acción"
+            "Fecha", "Título", "Modo", "Coincidencia", "Acción"
         ])
         self.history_table.horizontalHeader().setStretchLastSection(False)
+        self.history_table.setColumnHidden(COL_COINCIDENCIA, True)
+        self.history_table.verticalScrollBar().valueChanged.connect(self._on_history_scroll)
+        self.history_table.cellDoubleClicked.connect(self._on_open_meeting)
         layout.addWidget(self.history_table)
         
-        # Botón de actualizar
+        # Botones
+        btn_layout = QHBoxLayout()
+        
         btn_refresh = CustomButton("🔄 Actualizar")
         btn_refresh.clicked.connect(self._on_refresh_history)
-        layout.addWidget(btn_refresh)
+        btn_layout.addWidget(btn_refresh)
         
-        # Cargar historial
-        self._load_history_table()
+        btn_similar = CustomButton("🔗 Reuniones Similares", "secondary")
+        btn_similar.clicked.connect(self._on_similar_meetings)
+        btn_layout.addWidget(btn_similar)
+        
+        layout.addLayout(btn_layout)
+        
+        # Exportar (con filtros opcionales de modo y fechas) e importar
+        io_layout = QHBoxLayout()
+        
+        self.export_mode = QComboBox()
+        self.export_mode.addItems(["Todos los modos", "ENTREVISTA", "NEGOCIOS", "PRESENTACION", "CUSTOM"])
+        io_layout.addWidget(self.export_mode)
+        
+        self.export_from = QLineEdit()
+        self.export_from.setPlaceholderText("Desde AAAA-MM-DD")
+        io_layout.addWidget(self.export_from)
+        
+        self.export_to = QLineEdit()
+        self.export_to.setPlaceholderText("Hasta AAAA-MM-DD")
+        io_layout.addWidget(self.export_to)
+        
+        btn_export = CustomButton("📤 Exportar", "secondary")
+        btn_export.clicked.connect(self._on_export_history)
+        io_layout.addWidget(btn_export)
+        
+        btn_import = CustomButton("📥 Importar", "secondary")
+        btn_import.clicked.connect(self._on_import_history)
+        io_layout.addWidget(btn_import)
+        
+        layout.addLayout(io_layout)
         
         return widget
     
+    def _cipher(self, purpose: str):
+        """Cifrador de config, historial o audio (la clave se deriva una vez por sesión)"""
+        return self.keyring.cipher(purpose) if self.keyring is not None else None
+    
     def _load_config(self) -> dict:
-        """Carga la configuración desde JSON"""
+        """Carga la configuración desde JSON (descifrando la API Key)"""
         if self.config_path.exists():
             try:
                 with open(self.config_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    stored = json.load(f)
+                config = open_config(stored, self._cipher(PURPOSE_CONFIG))
+            except ValueError as e:
+                # No sobrescribir la API Key cifrada con una config vacía
+                self.config_locked = True
+                message = f"No se pudo descifrar la configuración: {e}"
+                print(f"❌ {message}")
+                QTimer.singleShot(0, lambda: self.storage_error_signal.emit(message))
+                return self._default_config()
             except:
                 return self._default_config()
+            # config.json de versiones anteriores: cifrar la API Key que estaba en claro
+            if self.keyring is not None and any(stored.get(field) for field in SECRET_FIELDS):
+                self._write_config(config)
+            return config
         return self._default_config()
     
     def _default_config(self) -> dict:
@@ -277,86 +506,375 @@ class MainWindow(QMainWindow):
             "created_at": datetime.now().isoformat()
         }
     
-    def _load_history(self) -> list:
-        """Carga el historial desde JSON"""
-        if self.history_path.exists():
-            try:
-                with open(self.history_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
+    def _load_history_in_background(self):
+        """Abre la base del historial (y migra history.json) fuera del hilo de UI"""
+        try:
+            self.history_store = HistoryStore(self.history_db_path, legacy_json_path=self.history_path,
+                                              cipher=self._cipher(PURPOSE_HISTORY))
+        except Exception as e:
+            print(f"❌ Error abriendo historial: {e}")
+            self.storage_error_signal.emit(f"No se pudo abrir el historial: {e}")
+            return
+        finally:
+            # La UI guarda lo pendiente y arranca la cola de trabajos en su hilo
+            self.history_loaded_signal.emit()
+        
+        # Índice semántico (después de mostrar el historial; requiere numpy)
+        try:
+            from core.retrieval import MeetingIndex, NUMPY_AVAILABLE
+            if NUMPY_AVAILABLE:
+                index = MeetingIndex(self.history_store, cache_path=self.history_db_path.with_name("history_index.npz"),
+                                     cipher=self._cipher(PURPOSE_HISTORY))
+                index.build()
+                self.meeting_index = index
+                index.catch_up()  # Reuniones guardadas mientras se construía
+        except Exception as e:
+            print(f"⚠️ Índice semántico no disponible: {e}")
+    
+    def _on_history_loaded(self):
+        """Slot thread-safe - Terminó la apertura del historial: guarda lo pendiente y carga la tabla"""
+        self._history_loaded = True
+        pending, self._after_history_loaded = self._after_history_loaded, []
+        for save in pending:
+            save()
+        
+        # Reuniones que quedaron en cola en una sesión anterior
+        try:
+            self._start_job_runner()
+        except Exception as e:
+            print(f"⚠️ Cola de trabajos no disponible: {e}")
+        self._load_history_table()
     
-    def _save_config(self):
-        """Guarda la configuración en JSON"""
+    def _when_history_loaded(self, fn):
+        """Ejecuta `fn` ya o, si el historial aún se está abriendo, al terminar (sin bloquear la UI)"""
+        if self._history_loaded:
+            fn()
+        else:
+            self._after_history_loaded.append(fn)
+    
+    def _save_config(self) -> bool:
+        """Guarda la configuración en JSON (False si no se pudo escribir)"""
         self.config["api_key"] = self.api_key_widget.get_api_key()
         self.config["modo"] = self.mode_selector.get_mode()
         self.config["custom_prompt"] = self.mode_selector.get_custom_prompt()
+        self.config["contexto_historial"] = self.history_context_check.isChecked()
+        self.config["archivar_audio"] = self.archive_audio_check.isChecked()
+        self.config["hablantes"] = self.speakers_check.isChecked()
+        self.config["reducir_ruido"] = self.denoise_check.isChecked()
+        self.config["trazas"] = self.tracing_check.isChecked()
         self.config["updated_at"] = datetime.now().isoformat()
-        
+        return self._write_config(self.config)
+    
+    def _write_config(self, config: dict) -> bool:
+        """Escribe config.json con los secretos cifrados
+
+        Returns:
+            False si no se escribió (config ilegible o clave no disponible)
+        """
+        if self.config_locked:
+            print("❌ config.json no se pudo descifrar al abrir - no se sobrescribe")
+            return False
+        try:
+            sealed = seal_config(config, self._cipher(PURPOSE_CONFIG))
+        except ValueError as e:
+            print(f"❌ No se pudo cifrar la configuración: {e}")
+            return False
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
         with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
-    
-    def _save_history_item(self, titulo: str, resumen: str):
-        """Guarda un item en el historial"""
-        item = {
-            "id": f"uuid-{len(self.history) + 1:03d}",
-            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "titulo": titulo,
-            "modo": self.mode_selector.get_mode().upper(),
-            "resumen_ia": resumen,
-            "transcript_completo": self.live_transcript.toPlainText()
-        }
+            json.dump(sealed, f, indent=2, ensure_ascii=False)
+        return True
+    
+    def _save_history_item(self, titulo: str, resumen: str, uso: dict = None, audio_data: bytes = None):
+        """Guarda un item en el historial (con el uso de la API) y, si se pasa, archiva su audio
+
+        Si el historial aún se está abriendo, se guarda en cuanto termine.
+        """
+        transcript = self.live_transcript.toPlainText()
+        modo = self._current_mode().upper()
+        
+        def save():
+            if self.history_store is None:
+                print("❌ Historial no disponible - reunión no guardada")
+                return
+            meeting_id = self.history_store.add(
+                titulo=titulo,
+                modo=modo,
+                resumen_ia=resumen,
+                transcript_completo=transcript,
+                uso=uso
+            )
+            if self.meeting_index is not None:
+                self.meeting_index.add_meeting(meeting_id, transcript)
+            if audio_data is not None:
+                self._archive_audio(meeting_id, audio_data)
+            self._load_history_table()
         
-        self.history.append(item)
+        self._when_history_loaded(save)
+    
+    def _archive_audio(self, meeting_id: int, audio_data: bytes):
+        """Guarda el audio de la reunión en el archivo comprimido (en segundo plano)"""
+        if not self.config.get("archivar_audio"):
+            return
+        
+        def archive():
+            try:
+                from core.audio_archive import AudioArchive
+                AudioArchive(self.audio_archive_dir, cipher=self._cipher(PURPOSE_AUDIO)).save(
+                    meeting_id, audio_data, sample_rate=self.audio_capture.sample_rate
+                )
+            except Exception as e:
+                print(f"⚠️ No se pudo archivar el audio: {e}")
         
-        self.history_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.history_path, "w", encoding="utf-8") as f:
-            json.dump(self.history, f, indent=2, ensure_ascii=False)
+        threading.Thread(target=archive, daemon=True).start()
+    
+    def _start_job_runner(self):
+        """Procesa en segundo plano la cola de reuniones pendientes (requiere API Key e historial)
+
+        Solo desde el hilo de UI; el lock evita dos JobRunner sobre la misma cola.
+        """
+        from core.job_queue import JobRunner
+        from core.pipeline import MeetingPipeline
         
+        with self._job_runner_lock:
+            if self.job_runner is not None or not self.config.get("api_key") or self.history_store is None:
+                return
+            job_queue = self._open_job_queue()
+            # Sin reintentos dentro del pipeline: las esperas las lleva la cola
+            pipeline = MeetingPipeline(self.config["api_key"], history_store=self.history_store, workers=1,
+                                       max_retries=0, speaker_turns=self.config.get("hablantes", False))
+            self.job_runner = JobRunner(job_queue, pipeline, on_saved=self._on_job_saved_in_background)
+            self.job_runner.start()
+        counts = job_queue.counts()
+        if counts["pending"] or counts["running"]:
+            print(f"📬 {counts['pending'] + counts['running']} reuniones en cola - procesando")
+    
+    def _stop_job_runner(self):
+        with self._job_runner_lock:
+            job_runner, self.job_runner = self.job_runner, None
+        if job_runner is not None:
+            job_runner.stop()
+            job_runner.pipeline.shutdown(wait=False)
+    
+    def _open_job_queue(self):
+        """Cola persistente de reuniones pendientes (se abre en el primer uso)"""
+        from core.job_queue import JobQueue
+        
+        if self.job_queue is None:
+            self.job_queue = JobQueue(self.jobs_db_path, cipher=self._cipher(PURPOSE_JOBS))
+        return self.job_queue
+    
+    def _enqueue_meeting(self, kind: str, audio_data: bytes, error: str, **payload) -> bool:
+        """Guarda en la cola persistente una reunión que falló por red o cuota
+
+        Returns:
+            True si quedó encolada
+        """
+        # La cola no depende del historial: se encola ya; el JobRunner arranca al abrirse el historial
+        try:
+            payload.update(mode=self._current_mode(), custom_prompt=self._current_custom_prompt(),
+                           titulo=f"Reunión - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                           fecha=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), sample_rate=self.audio_capture.sample_rate)
+            self._open_job_queue().enqueue(kind, payload, audio=audio_data)
+        except Exception as e:
+            print(f"❌ No se pudo encolar la reunión: {e}")
+            return False
+        
+        print(f"📬 Reunión en cola ({error[:80]}) - se procesará al volver la conexión")
+        self.live_analysis.setText("📬 Sin conexión o sin cuota: la reunión quedó en cola y se analizará "
+                                   "automáticamente; aparecerá en el Historial.")
+        if self._history_loaded:
+            self._start_job_runner()
+        if self.job_runner is not None:
+            self.job_runner.wake()
+        return True
+    
+    def _on_job_saved_in_background(self, meeting_id: int, job: dict, audio_data: bytes):
+        """Hilo de la cola - Indexa y archiva una reunión encolada recién guardada"""
+        if meeting_id is None:
+            return
+        if self.meeting_index is not None:
+            self.meeting_index.add_meeting(meeting_id, job["payload"]["transcript"])
+        if audio_data and self.config.get("archivar_audio"):
+            from core.audio_archive import AudioArchive
+            AudioArchive(self.audio_archive_dir, cipher=self._cipher(PURPOSE_AUDIO)).save(
+                meeting_id, audio_data, sample_rate=job["payload"].get("sample_rate", 16000)
+            )
+        self.job_saved_signal.emit(meeting_id)
+    
+    def _on_job_saved(self, meeting_id: int):
+        """Slot thread-safe - Una reunión de la cola ya está en el historial"""
+        print(f"✅ Reunión en cola guardada en el historial (#{meeting_id})")
         self._load_history_table()
     
+    def _history_context(self, transcript: str) -> str:
+        """Fragmentos de reuniones anteriores parecidas, si está activado en la config"""
+        if not self.config.get("contexto_historial") or self.meeting_index is None:
+            return ""
+        try:
+            return self.meeting_index.context_for(transcript, budget_tokens=HISTORY_CONTEXT_TOKENS)
+        except Exception as e:
+            print(f"⚠️ Error recuperando contexto: {e}")
+            return ""
+    
     def _load_history_table(self):
-        """Carga el historial en la tabla"""
+        """Carga la primera página del historial (o los resultados de búsqueda) en la tabla"""
+        if self.tab_history is None or self.history_store is None:
+            return
+        
+        if self.history_store.cipher is not None:
+            # El índice guarda huellas de palabras, no el texto: no hay búsqueda por prefijo
+            self.history_search.setPlaceholderText("🔍 Buscar palabras completas (historial cifrado)...")
+            self.history_search.setToolTip("Con el historial cifrado, el índice de búsqueda no guarda el texto "
+                                           "sino una huella de cada palabra: se buscan palabras completas "
+                                           "(\"presupuesto\" no encuentra \"presupuestos\").")
+        
+        if self.history_search.text().strip():
+            self._on_history_search()
+            return
+        
+        self.history = []
+        self.history_table.setRowCount(0)
+        self.history_table.setColumnHidden(COL_COINCIDENCIA, True)
+        self._append_history_rows(self.history_store.page(0, HISTORY_PAGE_SIZE))
+    
+    def _on_history_search(self):
+        """Muestra las reuniones que coinciden con la búsqueda, por relevancia"""
+        if self.history_store is None:
+            return
+        
+        query = self.history_search.text().strip()
+        if not query:
+            self._load_history_table()
+            return
+        
+        self.history = []
+        self.history_table.setRowCount(0)
+        self.history_table.setColumnHidden(COL_COINCIDENCIA, False)
+        self._append_history_rows(self.history_store.search(query))
+    
+    def _on_history_scroll(self, value: int):
+        """Carga la siguiente página al llegar al final de la tabla"""
+        scrollbar = self.history_table.verticalScrollBar()
+        if value < scrollbar.maximum() or self.history_store is None:
+            return
+        if not self.history_table.isColumnHidden(COL_COINCIDENCIA):
+            return  # Los resultados de búsqueda o de similares no se paginan
+        
+        rows = self.history_store.page(len(self.history), HISTORY_PAGE_SIZE)
+        if rows:
+            self._append_history_rows(rows)
+    
+    def _append_history_rows(self, rows: list):
+        """Agrega filas (metadatos) al final de la tabla"""
+        first = len(self.history)
+        self.history.extend(rows)
         self.history_table.setRowCount(len(self.history))
         
-        for row, item in enumerate(reversed(self.history)):
+        for row, item in enumerate(rows, start=first):
             # Fecha
             fecha_item = QTableWidgetItem(item.get("fecha", ""))
-            self.history_table.setItem(row, 0, fecha_item)
+            self.history_table.setItem(row, COL_FECHA, fecha_item)
             
             # Título
             titulo_item = QTableWidgetItem(item.get("titulo", ""))
-            self.history_table.setItem(row, 1, titulo_item)
+            self.history_table.setItem(row, COL_TITULO, titulo_item)
             
             # Modo
             modo_item = QTableWidgetItem(item.get("modo", ""))
-            self.history_table.setItem(row, 2, modo_item)
+            self.history_table.setItem(row, COL_MODO, modo_item)
+            
+            # Fragmento con las coincidencias resaltadas (solo en búsquedas)
+            if item.get("snippet"):
+                snippet_label = QLabel(self._snippet_html(item["snippet"]))
+                snippet_label.setTextFormat(Qt.TextFormat.RichText)
+                self.history_table.setCellWidget(row, COL_COINCIDENCIA, snippet_label)
             
-            # Botón Copiar
+            # Botón Copiar (un solo slot compartido: sin un closure por fila)
             btn_copy = CustomButton("📋 Copiar")
-            btn_copy.clicked.connect(
-                lambda checked, resumen=item.get("resumen_ia", ""): self._copy_resumen(resumen)
-            )
-            self.history_table.setCellWidget(row, 3, btn_copy)
+            btn_copy.setProperty("meeting_id", item["id"])
+            btn_copy.clicked.connect(self._on_copy_clicked)
+            self.history_table.setCellWidget(row, COL_ACCION, btn_copy)
+    
+    def _on_open_meeting(self, row: int, column: int):
+        """Muestra el resumen y la transcripción de la reunión (doble clic en la tabla)"""
+        from PyQt6.QtWidgets import QMessageBox
+        if row >= len(self.history):
+            return
+        try:
+            meeting = self.history_store.get(self.history[row]["id"])
+        except ValueError as e:
+            show_message(self, "Historial", f"No se pudo leer la reunión: {e}", "error")
+            return
+        if not meeting:
+            return
+        
+        box = QMessageBox(self)
+        box.setWindowTitle(f"📋 {meeting['titulo']}")
+        uso = meeting.get("uso")
+        uso_line = ""
+        if uso:
+            uso_line = (f" | 🔢 {uso['requests']} pet., {uso['input_tokens']}+{uso['output_tokens']} tokens, "
+                        f"{uso['audio_seconds']:.0f} s de audio")
+        box.setText(f"📅 {meeting['fecha']} | 🎯 {meeting['modo']}{uso_line}\n\n{meeting['resumen_ia']}")
+        box.setDetailedText(meeting["transcript_completo"])
+        box.exec()
     
-    def _copy_resumen(self, resumen: str):
-        """Copia un resumen al portapapeles"""
+    def _snippet_html(self, snippet: str) -> str:
+        """Convierte los marcadores de coincidencia del índice en HTML resaltado"""
+        text = html.escape(snippet.replace("\n", " "))
+        return (text
+                .replace(HIGHLIGHT_START, f"<b style='color: {get_color('accent')};'>")
+                .replace(HIGHLIGHT_END, "</b>"))
+    
+    def _on_copy_clicked(self):
+        """Botón Copiar de una fila del Historial"""
+        self._copy_resumen(self.sender().property("meeting_id"))
+    
+    def _copy_resumen(self, meeting_id: int):
+        """Copia el resumen de una reunión al portapapeles"""
         from PyQt6.QtWidgets import QApplication
-        QApplication.clipboard().setText(resumen)
+        try:
+            body = self.history_store.get_body(meeting_id)
+        except ValueError as e:
+            show_message(self, "Historial", f"No se pudo leer la reunión: {e}", "error")
+            return
+        if not body:
+            return
+        QApplication.clipboard().setText(body["resumen_ia"])
         show_message(self, "Éxito", "Resumen copiado al portapapeles", "success")
     
     def _on_save_config(self):
         """Handler para guardar configuración"""
-        self._save_config()
+        saved = self._save_config()
         
-        # Actualizar transcriber con nueva API Key
+        # Actualizar clientes ya creados con la nueva API Key
         api_key = self.api_key_widget.get_api_key()
-        self.transcriber.set_api_key(api_key)
+        if self._transcriber:
+            self._transcriber.set_api_key(api_key)
+            self._transcriber.speaker_turns = self.config["hablantes"]
+        if self._audio_capture:
+            self._audio_capture.noise_suppression = self.config["reducir_ruido"]
+        if self._ai_brain:
+            self._ai_brain.set_api_key(api_key)
+        tracer.configure(self.config["trazas"])
+        if self._history_loaded:
+            self._stop_job_runner()  # Se recrea con la API Key nueva
+            self._start_job_runner()
         
+        if not saved:
+            show_message(self, "Configuración", "❌ No se guardó config.json: no se pudo descifrar o falta "
+                         "ferrxos.key (los cambios solo duran esta sesión)", "error")
+            return
         show_message(self, "Configuración", "✓ Configuración guardada exitosamente", "success")
     
+    def _on_refresh_traces(self):
+        """Muestra el uso de la API y los percentiles de latencia acumulados en la sesión"""
+        self.usage_report.setPlainText(usage_metrics.report())
+        if not tracer.histograms:
+            self.trace_report.setPlainText("Sin datos todavía")
+            return
+        self.trace_report.setPlainText(tracer.report())
+    
     def _on_test_ai(self):
         """Handler para probar conexión IA"""
         api_key = self.api_key_widget.get_api_key()
@@ -392,9 +910,11 @@ class MainWindow(QMainWindow):
         """Handler para iniciar grabación"""
         # Pasar callback de silencio detectado (con signal para thread-safety)
         success = self.audio_capture.start_recording(
-            on_silence=lambda: self.silence_detected_signal.emit()
+            on_silence=self.silence_detected_signal.emit,
+            on_level=self.audio_level_signal.emit
         )
         if success:
+            self.level_meter.reset()
             self.status_label.setText("🟢 Escuchando")
             self.status_label.setStyleSheet(f"color: {get_color('success')};")
             self.live_transcript.clear()
@@ -412,6 +932,8 @@ class MainWindow(QMainWindow):
         if self.recording_timer.isActive():
             self.recording_timer.stop()
         
+        # Continuar la traza abierta al empezar a grabar
+        tracer.activate(getattr(self.audio_capture, "trace_id", None))
         try:
             # Detener grabación
             audio_data = self.audio_capture.stop_recording()
@@ -433,29 +955,41 @@ class MainWindow(QMainWindow):
             
             if "❌" in transcript or "⚠️" in transcript:
                 print(f"⚠️ Error en transcripción: {transcript}")
+                if is_retryable(transcript):
+                    self._enqueue_meeting(JOB_TRANSCRIBE, audio_data, transcript)
                 return
             
             # Actualizar campo de transcripción
             self.live_transcript.setText(transcript)
+            tracer.mark("transcript_rendered")
             
             # Generar análisis con IA
             print("🤖 Generando análisis con IA...")
             
             analysis = self.ai_brain.analyze(
                 transcript,
-                mode=self.mode_selector.get_mode(),
-                custom_prompt=self.mode_selector.get_custom_prompt()
+                mode=self._current_mode(),
+                custom_prompt=self._current_custom_prompt(),
+                context=self._history_context(transcript)
             )
             
+            if is_retryable(analysis):
+                self._enqueue_meeting(JOB_ANALYZE, audio_data, analysis, transcript=transcript)
+                return
+            
             self.live_analysis.setText(analysis)
+            tracer.mark("analysis_rendered")
             
-            # Guardar en historial
+            # Guardar en historial (y el audio, si está activado)
             titulo = f"Reunión - {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-            self._save_history_item(titulo, analysis)
+            uso = merge_usage(self.transcriber.last_usage, self.ai_brain.last_usage)
+            self._save_history_item(titulo, analysis, uso, audio_data=audio_data)
             
             print("✅ Análisis completado")
         except Exception as e:
             print(f"❌ Error: {str(e)}")
+        finally:
+            tracer.end_trace()
     
     def _on_manual_analyze(self):
         """Analiza el texto de transcripción manualmente"""
@@ -467,28 +1001,39 @@ class MainWindow(QMainWindow):
         
         print("🤖 Analizando texto...")
         
+        tracer.new_trace()
         try:
             analysis = self.ai_brain.analyze(
                 transcript,
-                mode=self.mode_selector.get_mode(),
-                custom_prompt=self.mode_selector.get_custom_prompt()
+                mode=self._current_mode(),
+                custom_prompt=self._current_custom_prompt(),
+                context=self._history_context(transcript)
             )
             
             self.live_analysis.setText(analysis)
+            tracer.mark("analysis_rendered")
             
             # Guardar en historial
             titulo = f"Análisis Manual - {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-            self._save_history_item(titulo, analysis)
+            self._save_history_item(titulo, analysis, merge_usage(self.ai_brain.last_usage))
             
             print("✅ Análisis completado")
         except Exception as e:
             print(f"❌ Error: {str(e)}")
+        finally:
+            tracer.end_trace()
     
     def _on_silence_detected(self):
         """Slot thread-safe - Detiene grabación e intenta transcribir automáticamente"""
         print("🔇 Silencio detectado - deteniendo grabación")
         self._on_stop_and_analyze()
     
+    def _on_audio_level(self):
+        """Slot thread-safe - Recoge los niveles acumulados y actualiza el medidor"""
+        level, mins, maxs = self.audio_capture.take_levels()
+        if self.audio_capture.is_recording:
+            self.level_meter.push(level, mins, maxs)
+    
     def _update_recording_time(self):
         """Actualiza el contador de tiempo de grabación"""
         self.recording_seconds += 1
@@ -514,8 +1059,118 @@ class MainWindow(QMainWindow):
         """Handler para finalizar reunión (deprecated)"""
         self._on_stop_and_analyze()
     
+    def _on_similar_meetings(self):
+        """Muestra las reuniones más parecidas a la seleccionada"""
+        row = self.history_table.currentRow()
+        if row < 0 or row >= len(self.history):
+            show_message(self, "Historial", "Selecciona una reunión primero", "warning")
+            return
+        if self.meeting_index is None:
+            show_message(self, "Historial", "El índice de reuniones aún no está listo", "warning")
+            return
+        
+        selected = self.history[row]
+        results = []
+        for score, meeting_id in self.meeting_index.similar_meetings(selected["id"]):
+            try:
+                meeting = self.history_store.get(meeting_id)
+            except ValueError:
+                continue  # Ilegible (clave distinta): se omite
+            if meeting:
+                item = {key: meeting[key] for key in ("id", "fecha", "titulo", "modo")}
+                item["snippet"] = f"{score:.0%} parecida a «{selected['titulo']}»"
+                results.append(item)
+        
+        self.history = []
+        self.history_table.setRowCount(0)
+        self.history_table.setColumnHidden(COL_COINCIDENCIA, False)
+        self._append_history_rows(results)
+    
+    def _on_export_history(self):
+        """Exporta el historial (filtrado) a JSONL, CSV o Markdown en segundo plano"""
+        from PyQt6.QtWidgets import QFileDialog
+        from core.history_io import export_to_file
+        if self.history_store is None:
+            show_message(self, "Historial", "El historial aún no está listo", "warning")
+            return
+        
+        suffixes = {"JSONL (*.jsonl)": ".jsonl", "CSV (*.csv)": ".csv", "Markdown (*.md)": ".md"}
+        path, selected = QFileDialog.getSaveFileName(
+            self, "Exportar historial", f"historial_{datetime.now().strftime('%Y%m%d')}.jsonl", ";;".join(suffixes)
+        )
+        if not path:
+            return
+        path = Path(path)
+        if path.suffix.lower() not in suffixes.values():
+            path = path.with_name(path.name + suffixes.get(selected, ".jsonl"))
+        filters = {
+            "modo": self.export_mode.currentText() if self.export_mode.currentIndex() > 0 else None,
+            "desde": self.export_from.text().strip() or None,
+            "hasta": self.export_to.text().strip() or None,
+        }
+        
+        def export():
+            try:
+                count = export_to_file(self.history_store, path, **filters)
+                self.history_io_signal.emit(f"📤 {count} reuniones exportadas a {path.name}", False)
+            except Exception as e:
+                self.history_io_signal.emit(f"No se pudo exportar: {e}", True)
+        
+        threading.Thread(target=export, daemon=True).start()
+    
+    def _on_import_history(self):
+        """Importa reuniones de archivos JSONL/CSV en segundo plano (sin duplicar las que ya están)"""
+        from PyQt6.QtWidgets import QFileDialog
+        from core.history_io import import_file
+        if self.history_store is None:
+            show_message(self, "Historial", "El historial aún no está listo", "warning")
+            return
+        
+        paths, _ = QFileDialog.getOpenFileNames(self, "Importar historial", "", "Historial (*.jsonl *.csv)")
+        if not paths:
+            return
+        
+        def index(meeting_id: int, item: dict):
+            if self.meeting_index is not None:
+                self.meeting_index.add_meeting(meeting_id, item["transcript_completo"])
+        
+        def run_import():
+            imported = duplicates = invalid = 0
+            try:
+                for path in paths:
+                    stats = import_file(self.history_store, Path(path), on_imported=index)
+                    imported += stats["imported"]
+                    duplicates += stats["duplicates"]
+                    invalid += stats["invalid"]
+            except Exception as e:
+                self.history_io_signal.emit(f"No se pudo importar: {e}", True)
+                return
+            self.history_io_signal.emit(
+                f"📥 {imported} reuniones importadas ({duplicates} ya estaban, {invalid} inválidas)", False
+            )
+        
+        threading.Thread(target=run_import, daemon=True).start()
+    
+    def _on_storage_error(self, message: str):
+        """Slot thread-safe - Datos cifrados ilegibles: avisar en vez de seguir en silencio"""
+        show_message(self, "Cifrado", message, "error")
+    
+    def _on_history_io_done(self, message: str, error: bool):
+        """Slot thread-safe - Terminó una exportación o importación"""
+        self._load_history_table()
+        show_message(self, "Historial", message, "error" if error else "success")
+    
+    def closeEvent(self, event):
+        """Persiste el índice semántico al cerrar (la cola pendiente sigue en disco)"""
+        self._stop_job_runner()
+        if self.meeting_index is not None:
+            try:
+                self.meeting_index.save()
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el índice semántico: {e}")
+        super().closeEvent(event)
+    
     def _on_refresh_history(self):
         """Handler para refrescar historial"""
-        self.history = self._load_history()
         self._load_history_table()
         show_message(self, "Historial", "🔄 Historial actualizado", "success")
@@ -6,8 +6,9 @@ from PyQt6.QtWidgets import (
     QPushButton, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QTextEdit, QComboBox, QMessageBox
 )
+from collections import deque
 from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QFont, QPainter, QColor
 from ui.styles import get_color
 
 class CustomButton(QPushButton):
@@ -133,6 +134,61 @@ class ModeSelector(QWidget):
         index = modo_dict.get(mode, 1)
         self.combo.setCurrentIndex(index)
 
+class AudioLevelMeter(QWidget):
+    """Medidor de nivel y forma de onda desplazable para la grabación en vivo"""
+    def __init__(self, history_points: int = 600, parent=None):
+        super().__init__(parent)
+        self.mins = deque(maxlen=history_points)
+        self.maxs = deque(maxlen=history_points)
+        self.level = 0.0
+        self.setMinimumHeight(48)
+        self.setMaximumHeight(64)
+
+    def push(self, level: float, mins, maxs):
+        """Agrega una envolvente min/max decimada y el nivel RMS del periodo"""
+        self.mins.extend(float(v) for v in mins)
+        self.maxs.extend(float(v) for v in maxs)
+        # Caída suave del medidor para que no parpadee
+        self.level = max(float(level), self.level * 0.6)
+        self.update()
+
+    def reset(self):
+        """Limpia la forma de onda y el nivel"""
+        self.mins.clear()
+        self.maxs.clear()
+        self.level = 0.0
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        width = self.width()
+        height = self.height()
+        painter.fillRect(0, 0, width, height, QColor(get_color("surface")))
+
+        # Barra de nivel (derecha)
+        bar_width = 12
+        wave_width = max(1, width - bar_width - 6)
+        level = min(1.0, self.level * 4)  # el habla rara vez pasa de 0.25 RMS
+        bar_height = int(level * height)
+        bar_color = "error" if level > 0.9 else "warning" if level > 0.6 else "success"
+        painter.fillRect(width - bar_width, height - bar_height, bar_width, bar_height,
+                         QColor(get_color(bar_color)))
+
+        # Forma de onda: un segmento vertical por columna, de derecha a izquierda
+        points = len(self.maxs)
+        if points:
+            painter.setPen(QColor(get_color("accent")))
+            mid = height / 2
+            step = max(1, points // wave_width)
+            columns = min(wave_width, points // step)
+            start = points - columns * step
+            for col in range(columns):
+                lo = min(self.mins[i] for i in range(start + col * step, start + (col + 1) * step))
+                hi = max(self.maxs[i] for i in range(start + col * step, start + (col + 1) * step))
+                x = wave_width - columns + col
+                painter.drawLine(x, int(mid - hi * mid), x, int(mid - lo * mid))
+        painter.end()
+
 class HistoryItem(QWidget):
     """Item individual en el historial"""
     def __init__(self, history_data: dict, parent=None):
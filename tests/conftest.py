@@ -0,0 +1,28 @@
+"""
+Configuración común de las pruebas: el código vive en src/ (como al ejecutar main.py)
+y el Gemini simulado en benchmarks/
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT / "src", ROOT / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """Gemini simulado sin esperas: se ejecuta el código real de la app sin red ni cuota"""
+    import core.ai_brain
+    import core.transcriber
+    from fake_gemini import FakeGemini
+
+    fake = FakeGemini(time_scale=0.0)
+    for module in (core.ai_brain, core.transcriber):
+        monkeypatch.setattr(module, "genai", fake, raising=False)
+        monkeypatch.setattr(module, "GENAI_AVAILABLE", True)
+    return fake
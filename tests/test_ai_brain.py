@@ -0,0 +1,83 @@
+"""
+Pruebas del análisis incremental: una reunión en curso solo envía lo nuevo
+"""
+
+import pytest
+
+import core.ai_brain
+from core.ai_brain import AIBrain, ContextCache
+from core.dedup import ChangeDetector
+
+FIRST = ("Hablante 1: Revisamos el presupuesto del trimestre y las ventas de la región norte. "
+         "Hablante 2: El equipo comercial necesita dos personas más para la campaña de lanzamiento.")
+MORE = ("\nHablante 1: Además hay que migrar el servidor de facturación antes de fin de mes, preparar la "
+        "auditoría externa y definir quién coordina la entrega del informe anual al directorio.")
+
+
+@pytest.fixture
+def brain(fake_gemini, monkeypatch):
+    """AIBrain contra Gemini simulado, con contextos y detector propios; `brain.prompts` guarda lo enviado"""
+    monkeypatch.setattr(core.ai_brain, "context_cache", ContextCache())
+    monkeypatch.setattr(core.ai_brain, "change_detector", ChangeDetector())
+    monkeypatch.setattr(core.ai_brain, "CACHING_AVAILABLE", False)
+    brain = AIBrain("clave-de-prueba")
+    brain.prompts = []
+    generate = fake_gemini.generate_content
+
+    def recording(contents, stream=False):
+        brain.prompts.append(contents[-1] if isinstance(contents, list) else contents)
+        return generate(contents, stream=stream)
+
+    monkeypatch.setattr(fake_gemini, "generate_content", recording)
+    return brain
+
+
+def test_segundo_analisis_solo_envia_lo_nuevo(brain):
+    first = brain.analyze(FIRST, session="reunion-1")
+    second = brain.analyze(FIRST + MORE, session="reunion-1")
+
+    assert FIRST in brain.prompts[0]
+    assert FIRST not in brain.prompts[1]
+    assert MORE.strip() in brain.prompts[1] and first in brain.prompts[1]
+    assert second != first
+    stats = core.ai_brain.context_cache.stats
+    assert stats["full"] == 1 and stats["incremental"] == 1
+
+
+def test_sin_cambios_no_llama_al_modelo(brain):
+    first = brain.analyze(FIRST, session="reunion-1")
+    assert brain.analyze(FIRST + "\nHablante 2: Vale, ok.", session="reunion-1") == first
+    assert len(brain.prompts) == 1
+    assert brain.last_usage is None
+
+
+@pytest.mark.parametrize("change", ["texto", "modo", "contexto", "sesion"])
+def test_analisis_completo_si_cambia_la_base(brain, change):
+    brain.analyze(FIRST, session="reunion-1")
+    kwargs = {"session": "reunion-1"}
+    text = FIRST + MORE
+    if change == "texto":
+        text = "Hablante 1: Otra transcripción que no continúa la anterior. " + MORE
+    elif change == "modo":
+        kwargs["mode"] = "entrevista"
+    elif change == "contexto":
+        kwargs["context"] = "Reunión anterior: se aprobó el presupuesto."
+    else:
+        core.ai_brain.context_cache.invalidate("reunion-1")
+    brain.analyze(text, **kwargs)
+    assert "TRANSCRIPCIÓN A ANALIZAR" in brain.prompts[1]
+    assert core.ai_brain.context_cache.stats["incremental"] == 0
+
+
+def test_sin_sesion_no_se_reutiliza_nada(brain):
+    brain.analyze(FIRST)
+    brain.analyze(FIRST)
+    assert len(brain.prompts) == 2 and all(FIRST in prompt for prompt in brain.prompts)
+
+
+def test_un_error_no_queda_como_contexto(brain, fake_gemini):
+    fake_gemini.error_rate = 1.0
+    assert brain.analyze(FIRST, session="reunion-1").startswith("❌")
+    fake_gemini.error_rate = 0.0
+    assert not brain.analyze(FIRST, session="reunion-1").startswith("❌")
+    assert len(brain.prompts) == 2 and all(FIRST in prompt for prompt in brain.prompts)
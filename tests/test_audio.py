@@ -0,0 +1,160 @@
+"""
+Pruebas del procesamiento de audio: compactado de silencios, su mapa de tiempos, reducción de ruido
+y turnos de hablante
+"""
+
+import numpy as np
+import pytest
+
+from core.audio import (NoiseSuppressor, OffsetMap, SpeakerTracker, compact_speech, denoise, float_to_pcm16,
+                        speaker_turns, turn_cut_points)
+
+RATE = 16000
+
+
+def _tone(seconds, amplitude=0.3, freq=440.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return amplitude * np.sin(2 * np.pi * freq * t)
+
+
+def _silence(seconds, amplitude=0.001, seed=0):
+    return amplitude * np.random.default_rng(seed).standard_normal(int(RATE * seconds))
+
+
+def _db(processed, original):
+    return 20 * np.log10(np.sqrt(np.mean(processed ** 2)) / np.sqrt(np.mean(original ** 2)))
+
+
+def test_offset_map_ida_y_vuelta():
+    # Voz en [1 s, 2 s) y [5 s, 6 s) de la original, separadas por 0,3 s en la compactada
+    offset_map = OffsetMap(1000, [(0, 1000, 1000), (1300, 5000, 1000)], original_samples=8000)
+    assert offset_map.compact_samples == 2300
+    assert offset_map.to_original(0.5) == pytest.approx(1.5)
+    assert offset_map.to_original(1.8) == pytest.approx(5.5)
+    assert offset_map.to_compact(1.5) == pytest.approx(0.5)
+    assert offset_map.to_compact(5.5) == pytest.approx(1.8)
+    for seconds in (0.0, 0.25, 0.9, 1.3, 2.2):
+        assert offset_map.to_compact(offset_map.to_original(seconds)) == pytest.approx(seconds)
+    # Un instante dentro de un silencio quitado va al inicio de la región siguiente
+    assert offset_map.to_compact(3.0) == pytest.approx(1.3)
+    assert offset_map.to_compact(7.0) == pytest.approx(2.3)
+    assert offset_map.removed_ratio() == pytest.approx(1 - 2300 / 8000)
+
+
+def test_offset_map_vacio_no_cambia_tiempos():
+    offset_map = OffsetMap(RATE)
+    assert offset_map.to_original(3.0) == 3.0
+    assert offset_map.to_compact(3.0) == 3.0
+    assert offset_map.removed_ratio() == 0.0
+
+
+def test_compact_speech_acorta_pausas_y_mapea_tiempos():
+    gap_ms = 300.0
+    audio = float_to_pcm16(np.concatenate([_silence(2.0), _tone(1.0), _silence(3.0, seed=1), _tone(1.0)]))
+    compact, offset_map = compact_speech(audio, RATE, gap_ms=gap_ms)
+
+    assert len(compact) < len(audio) / 2
+    assert len(offset_map.segments) == 2
+    assert offset_map.compact_samples * 2 == len(compact)
+    assert offset_map.original_samples * 2 == len(audio)
+
+    # Las regiones con voz se copian tal cual, separadas exactamente por la pausa
+    pcm = np.frombuffer(audio, dtype=np.int16)
+    out = np.frombuffer(compact, dtype=np.int16)
+    (first_at, first_orig, first_len), (second_at, second_orig, second_len) = offset_map.segments
+    assert second_at - (first_at + first_len) == int(RATE * gap_ms / 1000)
+    for at, orig, length in offset_map.segments:
+        assert np.array_equal(out[at:at + length], pcm[orig:orig + length])
+
+    # La segunda frase empieza a los 6 s de la original (menos el margen de `pad_ms`)
+    assert second_orig / RATE == pytest.approx(6.0, abs=0.3)
+    assert offset_map.to_original(second_at / RATE + 0.5) == pytest.approx(second_orig / RATE + 0.5)
+
+
+def test_compact_speech_sin_voz():
+    compact, offset_map = compact_speech(b"\0\0" * RATE, RATE)
+    assert compact == b""
+    assert offset_map.segments == [] and offset_map.original_samples == RATE
+
+
+def test_supresor_en_streaming_igual_que_de_una_vez():
+    samples = (_silence(3.0, amplitude=0.02) + np.concatenate([np.zeros(RATE), _tone(1.0), np.zeros(RATE)]))
+    samples = samples.astype(np.float32)
+    whole = NoiseSuppressor(RATE)
+    expected = np.concatenate([whole.process(samples), whole.flush()])
+    assert len(expected) == len(samples) + whole.latency_samples
+
+    streaming = NoiseSuppressor(RATE)
+    pieces, position = [], 0
+    for size in [1, 100, 511, 2000, 37, 4096] * 10:
+        pieces.append(streaming.process(samples[position:position + size]))
+        position += size
+    pieces.append(streaming.process(samples[position:]))
+    pieces.append(streaming.flush())
+    assert np.allclose(np.concatenate(pieces), expected, atol=1e-6)
+
+
+def test_supresor_atenua_el_ruido_y_conserva_la_voz():
+    noise = _silence(4.0, amplitude=0.02).astype(np.float32)
+    voice = np.concatenate([np.zeros(2 * RATE), _tone(1.0, amplitude=0.2), np.zeros(RATE)]).astype(np.float32)
+    cleaned = denoise(noise + voice, RATE)
+
+    assert len(cleaned) == len(noise)
+    assert _db(cleaned[RATE:2 * RATE], noise[RATE:2 * RATE]) < -8.0
+    speech = slice(int(2.2 * RATE), int(2.8 * RATE))
+    assert abs(_db(cleaned[speech], (noise + voice)[speech])) < 1.5
+
+
+def test_supresor_aprende_un_ruido_que_empieza_a_mitad():
+    fan = _silence(6.0, amplitude=0.03, seed=2) * (np.arange(6 * RATE) >= 2 * RATE)
+    samples = (fan + _silence(6.0, amplitude=0.002, seed=3)).astype(np.float32)
+    cleaned = denoise(samples, RATE)
+    # Sin pausas explícitas: a los ~1,5 s el ruido nuevo ya es el perfil de fondo
+    assert _db(cleaned[5 * RATE:], samples[5 * RATE:]) < -10.0
+
+
+def test_supresor_silencio_sigue_en_silencio():
+    assert not np.any(denoise(np.zeros(RATE, dtype=np.float32), RATE))
+
+
+def _voice(seconds, pitch, brightness, seed):
+    """Voz sintética: armónicos de `pitch` (más agudos con `brightness`) modulados como sílabas"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    harmonics = sum(brightness ** k * np.sin(2 * np.pi * pitch * k * t) for k in range(1, 12))
+    harmonics *= 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t)
+    return (0.2 * harmonics / np.abs(harmonics).max() + _silence(seconds, amplitude=0.003, seed=seed)).astype(np.float32)
+
+
+def _dialogue():
+    """Dos hablantes alternando cada 5 s"""
+    return np.concatenate([_voice(5.0, 110.0, 0.5, 1), _voice(5.0, 240.0, 0.95, 2),
+                           _voice(5.0, 110.0, 0.5, 3), _voice(5.0, 240.0, 0.95, 4)])
+
+
+def test_turnos_de_hablante():
+    turns = speaker_turns(_dialogue(), RATE)
+    assert [speaker for _, _, speaker in turns] == [1, 2, 1, 2]
+    assert turns[0][0] == 0.0 and turns[-1][1] == 20.0
+    for (_, end, _), expected in zip(turns, (5.0, 10.0, 15.0)):
+        assert end == pytest.approx(expected, abs=0.75)
+    assert turn_cut_points(turns, RATE) == [int(end * RATE) for _, end, _ in turns[:-1]]
+
+
+def test_umbral_de_turnos_es_el_del_tracker():
+    samples = _dialogue()
+    # El umbral es la distancia entre hablantes, no la puerta de energía de la voz
+    assert speaker_turns(samples, RATE, threshold=SpeakerTracker().threshold) == speaker_turns(samples, RATE)
+    assert [speaker for _, _, speaker in speaker_turns(samples, RATE, threshold=100.0)] == [1]
+
+
+def test_tracker_mantiene_los_hablantes_entre_tramos():
+    samples = _dialogue()
+    tracker = SpeakerTracker()
+    first = speaker_turns(samples[:10 * RATE], RATE, tracker=tracker)
+    second = speaker_turns(samples[10 * RATE:], RATE, tracker=tracker)
+    assert [speaker for _, _, speaker in first] == [speaker for _, _, speaker in second] == [1, 2]
+    assert len(tracker.centroids) == 2
+
+
+def test_turnos_sin_voz():
+    assert speaker_turns(np.zeros(3 * RATE, dtype=np.float32), RATE) == []
@@ -0,0 +1,84 @@
+"""
+Pruebas del archivo de audio (.fxa): compresión sin pérdida, recorte de silencios y lectura por tramos
+"""
+
+import numpy as np
+import pytest
+
+from core.audio_archive import AudioArchive, MAGIC, decode_chunk, encode_chunk
+
+RATE = 16000
+
+
+def _tone(seconds, amplitude=0.3, freq=440.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return amplitude * np.sin(2 * np.pi * freq * t)
+
+
+def _silence(seconds, amplitude=0.001, seed=0):
+    return amplitude * np.random.default_rng(seed).standard_normal(int(RATE * seconds))
+
+
+def _pcm(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def _recording():
+    """1 s de silencio, 1 s de voz, 2 s de silencio, 1 s de voz"""
+    return _pcm(np.concatenate([_silence(1.0), _tone(1.0), _silence(2.0, seed=1), _tone(1.0, freq=220.0)]))
+
+
+def test_bloques_sin_perdida():
+    rng = np.random.default_rng(42)
+    pcm = rng.integers(-32768, 32768, size=5000, dtype=np.int16)
+    pcm[:4] = [32767, -32768, 32767, -32768]  # Diferencias que desbordan int16
+    assert np.array_equal(decode_chunk(encode_chunk(pcm), len(pcm)), pcm)
+
+
+def test_guarda_recorta_silencios_y_conserva_tiempos(tmp_path):
+    archive = AudioArchive(tmp_path)
+    audio = _recording()
+    path = archive.save(7, audio, sample_rate=RATE)
+
+    assert path == archive.path_for(7) and archive.exists(7)
+    assert path.read_bytes()[:4] == MAGIC
+    assert path.stat().st_size < len(audio) / 4
+    assert archive.duration(7) == pytest.approx(5.0, abs=0.01)
+
+    info = archive.info(7)
+    assert info["sample_rate"] == 8000
+    assert len(info["regions"]) == 2
+    kept = sum(length for _, _, length in info["regions"])
+    assert kept < info["source_samples"]
+
+    # Un tramo de silencio no devuelve nada; uno con voz, la voz de ese tramo
+    silent, rate = archive.read_segment(7, 2.6, 3.4)
+    assert rate == 8000 and silent == b""
+    voiced, _ = archive.read_segment(7, 1.2, 1.8)
+    assert len(voiced) == int(0.6 * 8000) * 2
+
+
+def test_tramo_coincide_con_la_grabacion_reducida(tmp_path):
+    archive = AudioArchive(tmp_path, trim_silence=False, chunk_seconds=0.5)
+    audio = _recording()
+    archive.save(1, audio, sample_rate=RATE)
+
+    full, _ = archive.read_segment(1)
+    part, _ = archive.read_segment(1, 1.3, 2.7)  # Cruza varios bloques
+    full = np.frombuffer(full, dtype=np.int16)
+    assert len(full) == 5 * 8000
+    assert np.array_equal(np.frombuffer(part, dtype=np.int16), full[int(1.3 * 8000):int(2.7 * 8000)])
+
+
+def test_grabacion_muy_baja_se_guarda_entera(tmp_path):
+    archive = AudioArchive(tmp_path)
+    archive.save(3, _pcm(_silence(2.0, amplitude=0.0005)), sample_rate=RATE)
+    info = archive.info(3)
+    assert info["regions"] == [[0, 0, info["source_samples"]]]
+
+
+def test_audio_vacio_no_crea_archivo(tmp_path):
+    archive = AudioArchive(tmp_path)
+    assert archive.save(4, b"") is None
+    assert not archive.exists(4)
+    assert not archive.delete(4)
@@ -0,0 +1,98 @@
+"""
+Pruebas del modo por lotes: procesar una carpeta, reanudar, exportar e importar
+"""
+
+import functools
+import json
+import wave
+
+import pytest
+
+import cli
+from bench_pipeline import synthetic_recording
+
+
+def _write_wav(path, seconds, seed, channels=1):
+    pcm = synthetic_recording(seconds, seed=seed)
+    if channels == 2:
+        import numpy as np
+        mono = np.frombuffer(pcm, dtype=np.int16)
+        pcm = np.repeat(mono, 2).tobytes()
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(pcm)
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    folder = tmp_path / "grabaciones"
+    (folder / "sub").mkdir(parents=True)
+    _write_wav(folder / "uno.wav", 6.0, seed=1)
+    _write_wav(folder / "sub" / "dos.wav", 6.0, seed=2, channels=2)
+    (folder / "notas.txt").write_text("no es audio", encoding="utf-8")
+    return folder
+
+
+def test_buscar_grabaciones(recordings):
+    found = cli.find_recordings([str(recordings), str(recordings / "uno.wav"), str(recordings / "*.wav")])
+    assert sorted(path.name for path in found) == ["dos.wav", "uno.wav"]
+
+
+def test_wav_estereo_se_mezcla_a_mono(recordings):
+    pcm, rate = cli.load_recording(recordings / "sub" / "dos.wav")
+    assert rate == 16000 and len(pcm) == len(synthetic_recording(6.0, seed=2))
+
+
+def test_lote_reanudable(fake_gemini, recordings, tmp_path):
+    db = tmp_path / "datos" / "history.db"
+    args = ["batch", str(recordings), "--api-key", "clave-de-prueba", "--db", str(db), "--rpm", "6000"]
+    assert cli.main(args) == 0
+
+    journal = [json.loads(line) for line in (db.parent / ".ferrxos_batch.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(journal) == 2 and all(entry["meeting_id"] for entry in journal)
+    requests = fake_gemini.stats["requests"]
+
+    # Segunda ejecución: todo está en el diario, no se llama a la API
+    assert cli.main(args) == 0
+    assert fake_gemini.stats["requests"] == requests
+
+    store = cli.open_store(str(db))
+    assert sorted(m["titulo"] for m in store.page()) == ["Lote - dos", "Lote - uno"]
+    store.close()
+
+
+def test_lote_con_errores_devuelve_1(fake_gemini, monkeypatch, recordings, tmp_path):
+    fake_gemini.error_rate = 1.0
+    monkeypatch.setattr(cli, "MeetingPipeline", functools.partial(cli.MeetingPipeline, backoff_seconds=0.001))
+    db = tmp_path / "history.db"
+    assert cli.main(["batch", str(recordings / "uno.wav"), "--api-key", "k", "--db", str(db), "--rpm", "6000"]) == 1
+    assert not (tmp_path / ".ferrxos_batch.jsonl").exists()
+
+
+def test_lote_sin_api_key(monkeypatch, recordings, tmp_path):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.setattr(cli, "SRC_DIR", tmp_path)
+    assert cli.main([str(recordings), "--db", str(tmp_path / "history.db")]) == 2
+
+
+def test_exportar_e_importar(tmp_path):
+    source = tmp_path / "origen" / "history.db"
+    store = cli.open_store(str(source))
+    store.add("Plan anual", "NEGOCIOS", "presupuesto", "texto", fecha="2024-01-01 10:00:00")
+    store.add("Entrevista", "ENTREVISTA", "candidata", "texto", fecha="2024-02-01 10:00:00")
+    store.close()
+
+    out = tmp_path / "negocios.jsonl"
+    assert cli.main(["export", str(out), "--mode", "negocios", "--db", str(source)]) == 0
+    assert [json.loads(line)["titulo"] for line in out.read_text(encoding="utf-8").splitlines()] == ["Plan anual"]
+    assert cli.main(["export", str(tmp_path / "x.xlsx"), "--db", str(source)]) == 2
+
+    target = tmp_path / "destino" / "history.db"
+    assert cli.main(["import", str(out), "--db", str(target)]) == 0
+    assert cli.main(["import", str(out), "--db", str(target)]) == 0
+    assert cli.main(["import", str(tmp_path / "no_existe.jsonl"), "--db", str(target)]) == 2
+    store = cli.open_store(str(target))
+    assert [m["titulo"] for m in store.page()] == ["Plan anual"]
+    store.close()
@@ -0,0 +1,168 @@
+"""
+Pruebas del cifrado en reposo: RecordCipher, KeyRing y los datos cifrados de historial, cola y audio
+"""
+
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from core.audio_archive import AudioArchive
+from core.crypto import (KEY_FILE_NAME, PURPOSE_AUDIO, PURPOSE_CONFIG, PURPOSE_HISTORY, PURPOSE_JOBS, KeyRing,
+                         encrypted_data_in, open_config, seal_config)
+from core.history_store import HistoryStore
+from core.job_queue import FAILED, JOB_ANALYZE, JobQueue
+
+
+def _keyring(directory, passphrase=None):
+    return KeyRing(directory / KEY_FILE_NAME, passphrase=passphrase)
+
+
+def test_cifrar_y_descifrar(tmp_path):
+    cipher = _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+    blob = cipher.encrypt(b"presupuesto secreto", "1:resumen_ia")
+    assert b"presupuesto" not in blob
+    assert cipher.encrypt(b"presupuesto secreto", "1:resumen_ia") != blob  # Nonce nuevo cada vez
+    assert cipher.decrypt(blob, "1:resumen_ia") == b"presupuesto secreto"
+    assert cipher.open_text(cipher.seal_text("hola", "api_key"), "api_key") == "hola"
+
+
+def test_clave_equivocada_no_descifra(tmp_path):
+    blob = _keyring(tmp_path / "a").cipher(PURPOSE_HISTORY).encrypt(b"dato", "1:resumen_ia")
+    with pytest.raises(ValueError):
+        _keyring(tmp_path / "b").cipher(PURPOSE_HISTORY).decrypt(blob, "1:resumen_ia")
+
+
+def test_dato_movido_o_alterado_no_descifra(tmp_path):
+    keyring = _keyring(tmp_path)
+    cipher = keyring.cipher(PURPOSE_HISTORY)
+    blob = cipher.encrypt(b"dato", "1:resumen_ia")
+    with pytest.raises(ValueError):
+        cipher.decrypt(blob, "2:resumen_ia")
+    with pytest.raises(ValueError):
+        keyring.cipher(PURPOSE_AUDIO).decrypt(blob, "1:resumen_ia")  # Otra subclave
+    with pytest.raises(ValueError):
+        cipher.decrypt(blob[:-1] + bytes([blob[-1] ^ 1]), "1:resumen_ia")
+    with pytest.raises(ValueError):
+        cipher.decrypt(b"", "1:resumen_ia")
+
+
+def test_la_clave_se_conserva_entre_sesiones(tmp_path):
+    blob = _keyring(tmp_path).cipher(PURPOSE_JOBS).encrypt(b"dato")
+    assert (tmp_path / KEY_FILE_NAME).exists()
+    assert _keyring(tmp_path).cipher(PURPOSE_JOBS).decrypt(blob) == b"dato"
+
+
+def test_huellas_de_palabras(tmp_path):
+    cipher = _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+    assert cipher.term("presupuesto") == cipher.term("presupuesto")
+    assert cipher.term("presupuesto") != cipher.term("presupuestos")
+    assert cipher.term("presupuesto") != _keyring(tmp_path / "otra").cipher(PURPOSE_HISTORY).term("presupuesto")
+
+
+def test_frase_de_acceso(tmp_path):
+    blob = _keyring(tmp_path, passphrase="correcta").cipher(PURPOSE_HISTORY).encrypt(b"dato")
+    assert "key" not in json.loads((tmp_path / KEY_FILE_NAME).read_text(encoding="utf-8"))
+    assert _keyring(tmp_path, passphrase="correcta").cipher(PURPOSE_HISTORY).decrypt(blob) == b"dato"
+    with pytest.raises(ValueError):
+        _keyring(tmp_path, passphrase="equivocada").cipher(PURPOSE_HISTORY)
+    with pytest.raises(ValueError):
+        _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+
+
+def test_config_con_secretos_cifrados(tmp_path):
+    cipher = _keyring(tmp_path).cipher(PURPOSE_CONFIG)
+    sealed = seal_config({"api_key": "AIza-secreta", "idioma": "es"}, cipher)
+    assert "api_key" not in sealed and "AIza" not in json.dumps(sealed)
+    assert open_config(sealed, cipher) == {"api_key": "AIza-secreta", "idioma": "es"}
+    assert seal_config({"api_key": "x"}, None) == {"api_key": "x"}
+
+
+def test_historial_cifrado(tmp_path):
+    cipher = _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+    store = HistoryStore(db_path=tmp_path / "history.db", cipher=cipher)
+    meeting_id = store.add("Plan anual", "NEGOCIOS", "presupuesto confidencial", "hablamos del presupuesto")
+    assert [m["id"] for m in store.search("presupuesto")] == [meeting_id]
+    store.close()
+
+    raw = b"".join(path.read_bytes() for path in tmp_path.glob("history.db*"))
+    assert b"presupuesto" not in raw and b"confidencial" not in raw
+    assert encrypted_data_in(tmp_path) == ["history.db"]
+
+    # Con otra clave la base abre (metadatos) pero los cuerpos no se descifran
+    other = _keyring(tmp_path / "otra").cipher(PURPOSE_HISTORY)
+    store = HistoryStore(db_path=tmp_path / "history.db", cipher=other)
+    assert [m["titulo"] for m in store.page()] == ["Plan anual"]
+    with pytest.raises(ValueError):
+        store.get_body(meeting_id)
+    store.close()
+
+    store = HistoryStore(db_path=tmp_path / "history.db")
+    with pytest.raises(ValueError):
+        store.get_body(meeting_id)
+    store.close()
+
+
+def test_historial_en_claro_se_cifra_al_activar_la_clave(tmp_path):
+    store = HistoryStore(db_path=tmp_path / "history.db")
+    meeting_id = store.add("Plan", "NEGOCIOS", "presupuesto", "texto")
+    store.close()
+
+    cipher = _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+    store = HistoryStore(db_path=tmp_path / "history.db", cipher=cipher)
+    assert store.get(meeting_id)["resumen_ia"] == "presupuesto"
+    assert [m["id"] for m in store.search("presupuesto")] == [meeting_id]
+    codec = store.conn.execute("SELECT codec FROM meeting_bodies").fetchone()[0]
+    assert codec.endswith("+aesgcm")
+    store.close()
+
+
+def test_falta_la_clave_con_datos_cifrados(tmp_path):
+    cipher = _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+    store = HistoryStore(db_path=tmp_path / "history.db", cipher=cipher)
+    store.add("t", "m", "r", "x")
+    store.close()
+    (tmp_path / KEY_FILE_NAME).unlink()
+    # Crear una clave nueva dejaría el historial ilegible para siempre
+    with pytest.raises(ValueError, match="history.db"):
+        _keyring(tmp_path).cipher(PURPOSE_HISTORY)
+    assert not (tmp_path / KEY_FILE_NAME).exists()
+
+
+def test_cola_cifrada(tmp_path):
+    keyring = _keyring(tmp_path)
+    queue = JobQueue(tmp_path / "jobs.db", cipher=keyring.cipher(PURPOSE_JOBS))
+    job_id = queue.enqueue(JOB_ANALYZE, {"transcript": "presupuesto confidencial"}, audio=b"\x07\x00" * 100)
+    job = queue.claim(1)[0]
+    assert job["payload"] == {"transcript": "presupuesto confidencial"}
+    assert queue.load_audio(job) == b"\x07\x00" * 100
+    assert job["payload_path"].endswith(".sealed")
+    queue.close()
+
+    conn = sqlite3.connect(tmp_path / "jobs.db")
+    assert "confidencial" not in conn.execute("SELECT payload FROM jobs").fetchone()[0]
+    conn.close()
+
+    # Con otra clave la carga es ilegible: el trabajo falla en vez de reintentarse sin fin
+    queue = JobQueue(tmp_path / "jobs.db", cipher=_keyring(tmp_path / "otra").cipher(PURPOSE_JOBS))
+    assert queue.claim(1) == []
+    assert queue.conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == FAILED
+    queue.close()
+
+
+def test_audio_archivado_cifrado(tmp_path):
+    cipher = _keyring(tmp_path).cipher(PURPOSE_AUDIO)
+    archive = AudioArchive(tmp_path / "audio_archive", trim_silence=False, cipher=cipher)
+    tone = (0.3 * np.sin(2 * np.pi * 440 * np.arange(16000) / 16000) * 32767).astype(np.int16)
+    archive.save(5, tone.tobytes(), sample_rate=16000)
+
+    plain = AudioArchive(tmp_path / "plain", trim_silence=False)
+    plain.save(5, tone.tobytes(), sample_rate=16000)
+    assert archive.read_segment(5, 0.25, 0.75) == plain.read_segment(5, 0.25, 0.75)
+    assert "audio_archive" in encrypted_data_in(tmp_path)
+
+    with pytest.raises(ValueError):
+        AudioArchive(tmp_path / "audio_archive").info(5)
+    with pytest.raises(ValueError):
+        AudioArchive(tmp_path / "audio_archive", cipher=_keyring(tmp_path / "otra").cipher(PURPOSE_AUDIO)).info(5)
@@ -0,0 +1,58 @@
+"""
+Pruebas de la detección de cambios (SimHash + shingles nuevos) antes de volver a analizar
+"""
+
+from core.dedup import ChangeDetector, hamming, shingles, simhash
+
+BASE = (
+    "Hablante 1: Revisamos el presupuesto del tercer trimestre y las ventas de la región norte. "
+    "Hablante 2: El equipo de marketing necesita más recursos para la campaña de lanzamiento. "
+    "Hablante 1: Acordamos contratar dos personas y revisar los precios con el proveedor principal."
+)
+GROWTH = (
+    " Hablante 2: Además hay que migrar el servidor de facturación antes de fin de mes, "
+    "preparar la auditoría externa y definir quién coordina la entrega del informe anual al directorio."
+)
+
+KEY = ("reunion-1", "NEGOCIOS")
+
+
+def test_shingles_ignoran_muletillas_y_mayusculas():
+    assert shingles("eh bueno El Presupuesto del trimestre") == shingles("el presupuesto, del trimestre")
+    assert len(shingles("una sola")) == 1
+    assert shingles("eh, bueno, ok") == set()
+
+
+def test_simhash_cercano_para_textos_parecidos():
+    base = simhash(shingles(BASE))
+    assert hamming(base, simhash(shingles(BASE.replace("dos personas", "tres personas")))) < 16
+    assert hamming(base, simhash(shingles(GROWTH))) > 16
+
+
+def test_mismo_texto_o_muletillas_reutilizan_el_resultado():
+    detector = ChangeDetector()
+    assert detector.reusable(KEY, BASE) is None
+    detector.remember(KEY, BASE, "resumen 1")
+
+    assert detector.reusable(KEY, BASE) == "resumen 1"
+    assert detector.reusable(KEY, BASE + " Hablante 1: eh, bueno, vale, ok.") == "resumen 1"
+    assert detector.reusable(KEY, BASE + " Hablante 2: Perfecto, gracias.") == "resumen 1"
+    assert detector.stats == {"checked": 4, "skipped": 3}
+
+
+def test_contenido_nuevo_pide_otro_analisis():
+    detector = ChangeDetector()
+    detector.remember(KEY, BASE, "resumen 1")
+    assert detector.reusable(KEY, BASE + GROWTH) is None
+    # Otro modo de la misma reunión no comparte resultado
+    assert detector.reusable(("reunion-1", "LEGAL"), BASE) is None
+
+
+def test_olvidar_una_reunion():
+    detector = ChangeDetector()
+    detector.remember(KEY, BASE, "resumen 1")
+    detector.remember(("reunion-2", "NEGOCIOS"), BASE, "resumen 2")
+    detector.forget("reunion-1")
+    assert detector.reusable(KEY, BASE) is None
+    assert detector.reusable(("reunion-2", "NEGOCIOS"), BASE) == "resumen 2"
+    assert detector.skip_rate == 0.5
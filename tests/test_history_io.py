@@ -0,0 +1,98 @@
+"""
+Pruebas de exportación e importación del historial (JSONL, CSV y Markdown)
+"""
+
+import json
+
+import pytest
+
+from core.history_io import export_lines, export_to_file, import_file, read_records
+from core.history_store import HistoryStore
+
+MEETINGS = [
+    ("2024-01-05 09:00:00", "Kickoff", "NEGOCIOS", "Se aprobó el presupuesto", "Hablante 1: hola, \"comillas\"\ny saltos"),
+    ("2024-02-10 15:30:00", "Entrevista dev", "ENTREVISTA", "Candidata sólida", "Hablante 2: experiencia en Python"),
+    ("2024-03-01 11:00:00", "Cierre trimestre", "NEGOCIOS", "Ventas, cifras; y más", "x" * 200_000),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(db_path=tmp_path / "origen.db")
+    for fecha, titulo, modo, resumen, transcript in MEETINGS:
+        store.add(titulo, modo, resumen, transcript, fecha=fecha, uso={"tokens": len(transcript)})
+    yield store
+    store.close()
+
+
+def _content(store):
+    return [(m["fecha"], m["titulo"], m["modo"], m["resumen_ia"], m["transcript_completo"], m["uso"])
+            for m in store.iter_meetings()]
+
+
+@pytest.mark.parametrize("name", ["historial.jsonl", "historial.csv"])
+def test_exportar_e_importar_conserva_las_reuniones(store, tmp_path, name):
+    path = tmp_path / name
+    assert export_to_file(store, path) == 3
+    assert not path.with_name(name + ".tmp").exists()
+
+    target = HistoryStore(db_path=tmp_path / "destino.db")
+    imported = []
+    stats = import_file(target, path, on_imported=lambda meeting_id, item: imported.append(meeting_id))
+    assert stats == {"read": 3, "imported": 3, "duplicates": 0, "invalid": 0}
+    assert imported == target.ids()
+    assert _content(target) == _content(store)
+
+    # Reimportar el mismo archivo no duplica nada
+    assert import_file(target, path)["duplicates"] == 3
+    assert target.count() == 3
+    target.close()
+
+
+def test_exportar_con_filtros(store):
+    lines = list(export_lines(store, "jsonl", modo="negocios", desde="2024-02-01"))
+    assert [json.loads(line)["titulo"] for line in lines] == ["Cierre trimestre"]
+    lines = list(export_lines(store, "jsonl", hasta="2024-02-10"))
+    assert [json.loads(line)["titulo"] for line in lines] == ["Kickoff", "Entrevista dev"]
+
+
+def test_exportar_markdown(store, tmp_path):
+    path = tmp_path / "historial.md"
+    export_to_file(store, path, modo="ENTREVISTA")
+    text = path.read_text(encoding="utf-8")
+    assert text.startswith("# Historial de reuniones")
+    assert "## Entrevista dev" in text and "Kickoff" not in text
+    with pytest.raises(ValueError):
+        list(read_records(path))
+
+
+def test_formato_desconocido(store, tmp_path):
+    with pytest.raises(ValueError):
+        export_to_file(store, tmp_path / "historial.xlsx")
+    assert not list(tmp_path.glob("historial.xlsx*"))
+
+
+def test_lineas_invalidas_se_cuentan_y_no_cortan_la_importacion(tmp_path):
+    path = tmp_path / "mixto.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"titulo": "Válida", "modo": "X", "resumen_ia": "r", "fecha": "2024-01-01 10:00:00"}),
+        "{no es json",
+        json.dumps({"titulo": "Sin contenido", "modo": "X"}),
+        json.dumps(["una", "lista"]),
+        "",
+        json.dumps({"titulo": 42, "resumen_ia": "r"}),
+    ]), encoding="utf-8")
+    store = HistoryStore(db_path=tmp_path / "h.db")
+    assert import_file(store, path) == {"read": 5, "imported": 1, "duplicates": 0, "invalid": 4}
+    store.close()
+
+
+def test_reimportar_reuniones_sin_fecha_no_duplica(tmp_path):
+    path = tmp_path / "sin_fecha.jsonl"
+    path.write_text("".join(json.dumps({"titulo": f"R{i}", "modo": "X", "resumen_ia": f"resumen {i}"}) + "\n"
+                            for i in range(3)), encoding="utf-8")
+    store = HistoryStore(db_path=tmp_path / "h.db")
+    assert import_file(store, path, batch_size=2)["imported"] == 3
+    assert all(m["fecha"] for m in store.page())
+    assert import_file(store, path) == {"read": 3, "imported": 0, "duplicates": 3, "invalid": 0}
+    store.close()
@@ -0,0 +1,186 @@
+"""
+Pruebas del historial en SQLite: migraciones de esquema (v1/v2 y v3/v4 -> v5) y búsqueda
+"""
+
+import sqlite3
+import zlib
+
+import pytest
+
+from core.history_store import HistoryStore, content_hash
+
+
+def _make_v2(db_path, meetings, deleted=()):
+    """Base con el esquema 2: texto en claro en `meetings` e índice FTS5 con contenido"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE meetings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, legacy_id TEXT, fecha TEXT, titulo TEXT,
+            modo TEXT, resumen_ia TEXT, transcript_completo TEXT
+        );
+        CREATE INDEX idx_meetings_fecha ON meetings(fecha);
+        CREATE VIRTUAL TABLE meetings_fts USING fts5(
+            titulo, resumen_ia, transcript_completo, content='meetings', content_rowid='id'
+        );
+        CREATE TRIGGER meetings_ai AFTER INSERT ON meetings BEGIN
+            INSERT INTO meetings_fts (rowid, titulo, resumen_ia, transcript_completo)
+            VALUES (new.id, new.titulo, new.resumen_ia, new.transcript_completo);
+        END;
+    """)
+    for item in meetings:
+        conn.execute(
+            "INSERT INTO meetings (legacy_id, fecha, titulo, modo, resumen_ia, transcript_completo) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (item["legacy_id"], item["fecha"], item["titulo"], item["modo"],
+             item["resumen_ia"], item["transcript_completo"]),
+        )
+    for meeting_id in deleted:
+        conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+    conn.execute("PRAGMA user_version=2")
+    conn.commit()
+    conn.close()
+
+
+def _make_v3(db_path, meetings):
+    """Base con el esquema 3: cuerpos comprimidos aparte, sin `uso` ni `hash`"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE meetings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, legacy_id TEXT, fecha TEXT NOT NULL,
+            titulo TEXT NOT NULL, modo TEXT NOT NULL
+        );
+        CREATE TABLE meeting_bodies (
+            meeting_id INTEGER PRIMARY KEY REFERENCES meetings(id) ON DELETE CASCADE,
+            codec TEXT NOT NULL, resumen_ia BLOB NOT NULL, transcript_completo BLOB NOT NULL
+        );
+    """)
+    for item in meetings:
+        meeting_id = conn.execute(
+            "INSERT INTO meetings (legacy_id, fecha, titulo, modo) VALUES (?, ?, ?, ?)",
+            (item["legacy_id"], item["fecha"], item["titulo"], item["modo"]),
+        ).lastrowid
+        conn.execute(
+            "INSERT INTO meeting_bodies VALUES (?, 'zlib', ?, ?)",
+            (meeting_id, zlib.compress(item["resumen_ia"].encode("utf-8")),
+             zlib.compress(item["transcript_completo"].encode("utf-8"))),
+        )
+    conn.execute("PRAGMA user_version=3")
+    conn.commit()
+    conn.close()
+
+
+def _meetings(n=4):
+    return [
+        {
+            "legacy_id": f"uuid-{i:03d}",
+            "fecha": f"2024-01-0{i + 1} 10:00:00",
+            "titulo": f"Reunión {i}",
+            "modo": "NEGOCIOS",
+            "resumen_ia": f"Se aprobó el presupuesto número {i}",
+            "transcript_completo": "hablamos de ventas " * 20,
+        }
+        for i in range(n)
+    ]
+
+
+def _columns(store, table):
+    return [row[1] for row in store.conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_v2_migra_a_v5_conservando_ids_y_texto(tmp_path):
+    db_path = tmp_path / "history.db"
+    meetings = _meetings()
+    _make_v2(db_path, meetings, deleted=(4,))
+
+    store = HistoryStore(db_path=db_path)
+    assert store.conn.execute("PRAGMA user_version").fetchone()[0] == HistoryStore.SCHEMA_VERSION
+    assert store.ids() == [1, 2, 3]
+    for meeting_id, item in zip(store.ids(), meetings):
+        saved = store.get(meeting_id)
+        assert saved["resumen_ia"] == item["resumen_ia"]
+        assert saved["transcript_completo"] == item["transcript_completo"]
+        assert saved["legacy_id"] == item["legacy_id"]
+        assert saved["hash"] == content_hash(item)
+    assert "meetings_v2" not in [row[0] for row in store.conn.execute("SELECT name FROM sqlite_master")]
+    assert [m["id"] for m in store.search("presupuesto 2")] == [3]
+
+    # IDs estables: el 4 (borrado antes de migrar) no se reutiliza
+    assert store.add("Nueva", "GENERAL", "r", "t") == 5
+    store.close()
+
+
+def test_migracion_fallida_deja_la_base_intacta(tmp_path, monkeypatch):
+    db_path = tmp_path / "history.db"
+    _make_v2(db_path, _meetings())
+
+    original = HistoryStore._create_tables
+
+    def create_and_fail(self):
+        original(self)
+        raise RuntimeError("corte a mitad de la migración")
+
+    monkeypatch.setattr(HistoryStore, "_create_tables", create_and_fail)
+    with pytest.raises(RuntimeError):
+        HistoryStore(db_path=db_path)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0] == 4
+    assert "resumen_ia" in [row[1] for row in conn.execute("PRAGMA table_info(meetings)")]
+    conn.close()
+
+    # El siguiente arranque migra sin perder nada
+    monkeypatch.setattr(HistoryStore, "_create_tables", original)
+    store = HistoryStore(db_path=db_path)
+    assert store.count() == 4
+    store.close()
+
+
+def test_v3_migra_a_v5_con_uso_y_hash(tmp_path):
+    db_path = tmp_path / "history.db"
+    meetings = _meetings(3)
+    _make_v3(db_path, meetings)
+
+    store = HistoryStore(db_path=db_path)
+    assert store.conn.execute("PRAGMA user_version").fetchone()[0] == HistoryStore.SCHEMA_VERSION
+    assert {"uso", "hash"} <= set(_columns(store, "meetings"))
+    for meeting_id, item in zip(store.ids(), meetings):
+        saved = store.get(meeting_id)
+        assert saved["uso"] is None
+        assert saved["hash"] == content_hash(item)
+    # El índice FTS5 se crea al abrir y cubre las reuniones migradas
+    assert [m["id"] for m in store.search("presupuesto 1")] == [2]
+    store.close()
+
+
+def test_reabrir_no_vuelve_a_migrar(tmp_path):
+    db_path = tmp_path / "history.db"
+    store = HistoryStore(db_path=db_path)
+    meeting_id = store.add("Plan anual", "NEGOCIOS", "presupuesto", "texto", uso={"tokens": 10})
+    store.close()
+
+    store = HistoryStore(db_path=db_path)
+    assert store.get(meeting_id)["uso"] == {"tokens": 10}
+    assert [m["id"] for m in store.search("plan")] == [meeting_id]
+    store.close()
+
+
+def test_add_many_omite_duplicados(tmp_path):
+    store = HistoryStore(db_path=tmp_path / "history.db")
+    item = {"fecha": "2024-01-01 10:00:00", "titulo": "A", "modo": "X",
+            "resumen_ia": "r", "transcript_completo": "t"}
+    first = store.add_many([item, dict(item)])
+    assert first[0] is not None and first[1] is None
+    assert store.add_many([item]) == [None]
+    assert store.count() == 1
+    store.close()
+
+
+def test_borrar_quita_la_reunion_del_indice(tmp_path):
+    store = HistoryStore(db_path=tmp_path / "history.db")
+    keep = store.add("Ventas", "X", "cierre trimestral", "t")
+    gone = store.add("Compras", "X", "cierre anual", "t")
+    assert store.delete(gone)
+    assert [m["id"] for m in store.search("cierre")] == [keep]
+    assert store.get(gone) is None
+    store.close()
@@ -0,0 +1,104 @@
+"""
+Pruebas de la cola de trabajos persistente: claves idempotentes, arriendos, esperas y fallos
+"""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from core.job_queue import DONE, FAILED, JOB_ANALYZE, JOB_TRANSCRIBE, MAX_ATTEMPTS, PENDING, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.db")
+    yield queue
+    queue.close()
+
+
+def _state(queue, job_id):
+    return queue.conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def test_encolar_con_la_misma_clave_no_duplica(queue):
+    first = queue.enqueue(JOB_ANALYZE, {"transcript": "hola"}, key="reunion-1")
+    assert queue.enqueue(JOB_ANALYZE, {"transcript": "otra"}, key="reunion-1") == first
+    assert queue.counts()[PENDING] == 1
+    assert queue.claim(5)[0]["payload"] == {"transcript": "hola"}
+
+
+def test_un_trabajo_reclamado_no_se_entrega_dos_veces(queue):
+    queue.enqueue(JOB_ANALYZE, {})
+    assert len(queue.claim(5)) == 1
+    assert queue.claim(5) == []
+    assert queue.counts()[RUNNING] == 1
+
+
+def test_arriendo_vencido_se_reclama(queue):
+    job_id = queue.enqueue(JOB_ANALYZE, {"n": 1})
+    assert [job["id"] for job in queue.claim(1, lease_seconds=0.05)] == [job_id]
+    assert queue.claim(1) == []
+    time.sleep(0.1)
+    # El hilo que lo tenía se colgó: otro lo vuelve a tomar
+    assert [job["id"] for job in queue.claim(1)] == [job_id]
+    assert _state(queue, job_id) == RUNNING
+
+
+def test_al_reabrir_lo_que_estaba_en_curso_vuelve_a_la_cola(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.db")
+    job_id = queue.enqueue(JOB_ANALYZE, {})
+    queue.claim(1)
+    queue.close()
+
+    queue = JobQueue(tmp_path / "jobs.db")
+    assert _state(queue, job_id) == PENDING
+    assert [job["id"] for job in queue.claim(1)] == [job_id]
+    queue.close()
+
+
+def test_reintento_con_espera_exponencial(queue):
+    job_id = queue.enqueue(JOB_ANALYZE, {})
+    delays = []
+    for attempt in range(3):
+        if attempt:
+            queue.release_backoff()
+        assert len(queue.claim(1)) == 1
+        delays.append(queue.retry(job_id, "503"))
+    assert 4.0 <= delays[0] <= 6.0
+    assert delays[1] > delays[0] * 1.3 and delays[2] > delays[1] * 1.3
+
+    # En espera no se entrega; `release_backoff` lo deja listo ya
+    assert queue.claim(1) == []
+    assert queue.next_ready_in() == pytest.approx(delays[-1], abs=0.5)
+    assert queue.release_backoff() == 1
+    assert queue.next_ready_in() == 0.0
+    assert [job["attempts"] for job in queue.claim(1)] == [3]
+
+
+def test_demasiados_reintentos_marcan_el_trabajo_como_fallido(queue):
+    job_id = queue.enqueue(JOB_ANALYZE, {})
+    queue.conn.execute("UPDATE jobs SET attempts = ? WHERE id = ?", (MAX_ATTEMPTS - 1, job_id))
+    queue.conn.commit()
+    queue.claim(1)
+    assert queue.retry(job_id, "429") == 0.0
+    assert _state(queue, job_id) == FAILED
+    assert queue.claim(1) == []
+
+    assert queue.requeue_failed() == 1
+    job = queue.claim(1)[0]
+    assert job["attempts"] == 0 and job["last_error"] == "429"
+
+
+def test_completar_es_idempotente_y_borra_el_audio(queue):
+    job_id = queue.enqueue(JOB_TRANSCRIBE, {"sample_rate": 16000}, audio=b"\x01\x00" * 800)
+    job = queue.claim(1)[0]
+    assert queue.load_audio(job) == b"\x01\x00" * 800
+
+    assert queue.complete(job_id, {"meeting_id": 3})
+    assert not queue.complete(job_id)
+    assert not Path(job["payload_path"]).exists()
+    # Un reintento tardío no resucita un trabajo terminado
+    queue.retry(job_id, "tarde")
+    assert _state(queue, job_id) == DONE
+    assert queue.next_ready_in() is None
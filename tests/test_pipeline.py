@@ -0,0 +1,133 @@
+"""
+Pruebas del pipeline: límite de peticiones, tramos adaptativos y una reunión completa contra Gemini simulado
+"""
+
+import time
+
+import pytest
+
+from bench_pipeline import synthetic_recording
+from core.history_store import HistoryStore
+from core.pipeline import MeetingPipeline, RateLimiter, SegmentController, is_retryable
+
+
+def test_limitador_permite_la_rafaga_y_luego_espera():
+    limiter = RateLimiter(per_minute=60, burst=3)
+    assert all(limiter.acquire(timeout=0) for _ in range(3))
+    assert not limiter.acquire(timeout=0.05)  # 1 permiso por segundo: aún no hay otro
+    assert limiter.recent_requests() == 3
+
+
+def test_recent_requests_olvida_lo_anterior_a_un_minuto():
+    limiter = RateLimiter(per_minute=600, burst=10)
+    for _ in range(4):
+        limiter.acquire()
+    limiter.granted[0] -= 61.0
+    limiter.granted[1] -= 61.0
+    assert limiter.recent_requests() == 2
+    assert len(limiter.granted) == 2
+
+
+def test_penalizar_bloquea_a_todos():
+    limiter = RateLimiter(per_minute=6000, burst=10)
+    limiter.penalize(0.2)
+    assert not limiter.acquire(timeout=0.05)
+    started = time.monotonic()
+    assert limiter.acquire(timeout=2.0)
+    assert time.monotonic() - started >= 0.1
+
+
+def test_modelo_de_latencia_por_minimos_cuadrados():
+    controller = SegmentController()
+    assert controller.latency_model() == (1.0, 0.05)  # Supuesto inicial
+    for seconds in (5, 10, 20, 40) * 3:
+        controller.observe(seconds, 0.8 + 0.1 * seconds)
+    fixed, per_second = controller.latency_model()
+    assert fixed == pytest.approx(0.8, abs=1e-6)
+    assert per_second == pytest.approx(0.1, abs=1e-6)
+
+
+def test_tramo_adaptativo_cambia_poco_a_poco_y_respeta_limites():
+    controller = SegmentController(min_seconds=5.0, max_seconds=60.0, initial_seconds=20.0, max_step=1.5)
+    for _ in range(5):
+        controller.observe(20.0, 1.0)
+    sizes = [controller.next_seconds() for _ in range(6)]
+    assert sizes[0] == pytest.approx(20.0 / 1.5)
+    assert all(later >= earlier / 1.5 - 1e-9 for earlier, later in zip(sizes, sizes[1:]))
+    assert sizes[-1] == 5.0
+
+    # Con la API lenta, tramos más largos: transcribir no puede tardar más que el audio
+    for _ in range(20):
+        controller.observe(5.0, 30.0)
+    sizes = [controller.next_seconds() for _ in range(10)]
+    fixed, _ = controller.latency_model()
+    assert sizes[-1] == pytest.approx(fixed * controller.headroom)
+    assert fixed < sizes[-1] <= 60.0
+    for _ in range(5):
+        controller.observe(5.0, 120.0)
+    assert [controller.next_seconds() for _ in range(10)][-1] == 60.0
+
+
+@pytest.mark.parametrize("streams, shortest", [(1, 10.0), (2, 20.0)])
+def test_tramo_adaptativo_respeta_el_limite_de_peticiones(streams, shortest):
+    controller = SegmentController(initial_seconds=20.0, max_step=100.0)
+    for _ in range(5):
+        controller.observe(20.0, 0.5)  # La API va sobrada: solo limita la cuota
+    limiter = RateLimiter(per_minute=6, burst=6)
+    for _ in range(6):
+        limiter.acquire()  # Cuota del último minuto agotada (por esta y otras transcripciones)
+    # 6 peticiones/min repartidas entre `streams`: un tramo cada 10 s (o 20 s) como mínimo
+    assert controller.next_seconds(rate_limiter=limiter, streams=streams) >= shortest
+
+
+def _pipeline(**kwargs):
+    kwargs.setdefault("rate_limiter", RateLimiter(per_minute=6000, burst=100))
+    kwargs.setdefault("backoff_seconds", 0.001)
+    return MeetingPipeline("clave-de-prueba", workers=1, **kwargs)
+
+
+def test_errores_transitorios():
+    assert is_retryable("❌ Error: 429 Resource has been exhausted")
+    assert is_retryable("❌ Error: 503 The service is currently unavailable.")
+    assert not is_retryable("❌ API Key inválida")
+    assert not is_retryable("Resumen: el 503 del informe")
+
+
+def test_reunion_completa_se_transcribe_analiza_y_guarda(fake_gemini, tmp_path):
+    store = HistoryStore(db_path=tmp_path / "history.db")
+    pipeline = _pipeline(history_store=store, chunk_seconds=10.0)
+    events = []
+    result = pipeline.process(synthetic_recording(25.0), titulo="Demo", on_event=lambda event, data: events.append(event))
+    pipeline.shutdown()
+
+    assert result["error"] is None
+    assert events.count("transcript_chunk") >= 3  # Tramos de 10 s como máximo
+    assert events[-3:] == ["transcript", "analysis", "saved"]
+    saved = store.get(result["meeting_id"])
+    assert saved["titulo"] == "Demo" and saved["modo"] == "NEGOCIOS"
+    assert saved["transcript_completo"] == result["transcript"]
+    assert saved["resumen_ia"] == result["analysis"]
+    assert saved["uso"]["requests"] == fake_gemini.stats["requests"]
+    assert saved["uso"]["audio_seconds"] < 25.0  # Silencios quitados antes de subir
+    store.close()
+
+
+def test_reintenta_errores_transitorios_y_luego_falla(fake_gemini):
+    fake_gemini.error_rate = 1.0
+    pipeline = _pipeline(max_retries=2)
+    result = pipeline.process(synthetic_recording(5.0))
+    pipeline.shutdown()
+
+    assert result["meeting_id"] is None
+    assert "503" in result["error"]
+    assert fake_gemini.stats["errors"] == 3  # Intento inicial + 2 reintentos
+    assert result["uso"]["requests"] == 3
+
+
+def test_un_429_frena_a_todo_el_pipeline(fake_gemini):
+    fake_gemini.rate_limit_rate = 1.0
+    limiter = RateLimiter(per_minute=6000, burst=100)
+    pipeline = _pipeline(rate_limiter=limiter, max_retries=1)
+    pipeline.analyze("hablamos del presupuesto")
+    pipeline.shutdown()
+    assert limiter.blocked_until > 0 and limiter.tokens < 1.0
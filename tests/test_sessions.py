@@ -0,0 +1,209 @@
+"""
+Pruebas de las sesiones: reparto del pool por turnos ponderados, reuniones completas y análisis especulativo
+"""
+
+import threading
+import time
+
+import pytest
+
+from bench_pipeline import synthetic_recording
+from fake_gemini import LatencyModel
+from core.history_store import HistoryStore
+from core.pipeline import MeetingPipeline, RateLimiter
+from core.sessions import FairScheduler, SessionManager
+
+
+class ManualPool:
+    """Pool que no ejecuta nada hasta `run_next` (orden de despacho observable)"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+
+    def run_next(self):
+        fn, args = self.tasks.pop(0)
+        fn(*args)
+
+    def run_all(self):
+        while self.tasks:
+            self.run_next()
+
+
+def _scheduler(slots=1):
+    pool = ManualPool()
+    return FairScheduler(pool.submit, slots), pool
+
+
+def test_turnos_ponderados_intercalados():
+    scheduler, pool = _scheduler()
+    order = []
+    scheduler.register("a", weight=2)
+    scheduler.register("b", weight=1)
+    scheduler.schedule("a", order.append, "bloqueo")  # Ocupa el único hueco mientras se llenan las colas
+    for _ in range(6):
+        scheduler.schedule("a", order.append, "a")
+        scheduler.schedule("b", order.append, "b")
+    pool.run_all()
+    assert order[0] == "bloqueo"
+    assert order[1:10] == ["a", "b", "a"] * 3
+    assert order[10:] == ["b", "b", "b"]
+
+
+def test_no_supera_los_huecos_del_pool():
+    scheduler, pool = _scheduler(slots=2)
+    scheduler.register("a")
+    for _ in range(5):
+        scheduler.schedule("a", lambda: None)
+    assert len(pool.tasks) == 2 and scheduler.pending("a") == 3
+    pool.run_next()
+    assert len(pool.tasks) == 2 and scheduler.pending("a") == 2
+
+
+def test_prioridad_pasa_delante_de_las_demas_sesiones():
+    scheduler, pool = _scheduler()
+    order = []
+    scheduler.register("larga", weight=5)
+    scheduler.register("en_vivo")
+    scheduler.schedule("larga", order.append, "bloqueo")
+    for index in range(3):
+        scheduler.schedule("larga", order.append, f"tramo {index}")
+    scheduler.schedule("en_vivo", order.append, "normal")
+    scheduler.schedule("en_vivo", order.append, "resumen", priority=True)
+    pool.run_all()
+    assert order[:2] == ["bloqueo", "resumen"]
+
+
+def test_olvidar_una_sesion_cancela_sus_tareas():
+    scheduler, pool = _scheduler()
+    scheduler.register("a")
+    scheduler.register("b")
+    scheduler.schedule("b", lambda: None)
+    pending = [scheduler.schedule("a", lambda: None) for _ in range(2)]
+    scheduler.unregister("a")
+    assert all(future.cancelled() for future in pending)
+    pool.run_all()
+    assert scheduler.in_flight == 0
+
+
+def test_excepcion_en_una_tarea_no_bloquea_la_cola():
+    scheduler, pool = _scheduler()
+    scheduler.register("a")
+    failing = scheduler.schedule("a", lambda: 1 / 0)
+    ok = scheduler.schedule("a", lambda: "ok")
+    pool.run_all()
+    with pytest.raises(ZeroDivisionError):
+        failing.result(timeout=0)
+    assert ok.result(timeout=0) == "ok"
+
+
+@pytest.fixture
+def manager(fake_gemini, tmp_path):
+    store = HistoryStore(db_path=tmp_path / "history.db")
+    pipeline = MeetingPipeline("clave-de-prueba", history_store=store, workers=2, chunk_seconds=10.0,
+                               rate_limiter=RateLimiter(per_minute=6000, burst=100))
+    yield SessionManager(pipeline, segment_seconds=6.0, summary_every=1)
+    pipeline.shutdown()
+    store.close()
+
+
+def test_varias_sesiones_a_la_vez(manager):
+    events = []
+    live = manager.open(kind="live", titulo="En vivo", on_event=lambda event, data: events.append(event))
+    replay = manager.replay(synthetic_recording(25.0, seed=1), titulo="Grabación")
+    audio = synthetic_recording(20.0, seed=2)
+    for start in range(0, len(audio), 3200):  # Bloques de 100 ms, como el micrófono
+        live.append(audio[start:start + 3200])
+    live.finish()
+
+    results = [session.result.result(timeout=30) for session in (live, replay)]
+    assert [result["error"] for result in results] == [None, None]
+    store = manager.pipeline.store
+    assert sorted(store.get(result["meeting_id"])["titulo"] for result in results) == ["En vivo", "Grabación"]
+    assert events.count("transcript_chunk") >= 2 and "summary" in events and events[-1] == "saved"
+    assert manager.live_streams() == 0
+    assert [snapshot["state"] for snapshot in manager.snapshot()] == ["done", "done"]
+    with pytest.raises(RuntimeError):
+        live.append(b"\0\0")
+
+
+TEXT = ("Hablante 1: Revisamos el presupuesto del trimestre y las ventas de la región norte. "
+        "Hablante 2: El equipo comercial necesita dos personas más para la campaña.")
+
+
+@pytest.fixture
+def speculative(fake_gemini):
+    def build(workers):
+        pipeline = MeetingPipeline("clave-de-prueba", workers=workers,
+                                   rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        built.append(pipeline)
+        return SessionManager(pipeline, summary_every=1, speculative=True)
+    built = []
+    yield build
+    for pipeline in built:
+        pipeline.shutdown()
+
+
+def test_especulacion_sin_empezar_se_cancela_con_un_solo_hilo(speculative, fake_gemini):
+    manager = speculative(workers=1)
+    session = manager.open(kind="live")
+    session.texts[0] = TEXT
+    gate = threading.Event()
+    manager.scheduler.schedule(session.session_id, gate.wait)  # Único hilo ocupado
+    with session._lock:
+        session._speculate()
+    session._queue_summary(priority=True)  # Queda delante de la especulación
+    gate.set()
+
+    # Antes, el resumen esperaba a la especulación, que esperaba el único hilo
+    assert _wait_for(lambda: session.summary)
+    assert manager.speculation_snapshot()["discarded"] == 1
+    assert fake_gemini.stats["requests"] == 1
+    assert session.finish().result(timeout=10)["error"] is None
+
+
+def test_especulacion_en_curso_no_ocupa_hilos_esperando(speculative, fake_gemini):
+    fake_gemini.latency = LatencyModel("const:0.6")
+    fake_gemini.time_scale = 1.0
+    manager = speculative(workers=2)
+    session = manager.open(kind="live")
+    session.texts[0] = TEXT
+    with session._lock:
+        session._speculate()
+    assert _wait_for(lambda: fake_gemini.stats["requests"] == 1)  # Especulación en curso
+    session.finish()
+
+    # El análisis final se aplazó sin bloquear su hilo: el otro hueco del pool sigue libre
+    other = manager.open(kind="job")
+    started = time.monotonic()
+    assert other._schedule(lambda: "libre").result(timeout=5) == "libre"
+    assert time.monotonic() - started < 0.3
+
+    result = session.result.result(timeout=10)
+    assert result["error"] is None
+    assert manager.speculation_snapshot()["confirmed"] == 1
+    assert fake_gemini.stats["requests"] == 1  # El texto final no cambió: sin otra llamada
+
+
+def test_especulacion_descartada_si_la_base_cambia(speculative, fake_gemini):
+    manager = speculative(workers=1)
+    session = manager.open(kind="live")
+    session.texts[1] = TEXT
+    with session._lock:
+        session._speculate()
+    assert _wait_for(lambda: session.speculation[1].done())
+    session.texts[0] = "Hablante 1: Un tramo anterior que llegó tarde con otro tema distinto."
+    assert session.finish().result(timeout=10)["error"] is None
+    assert manager.speculation_snapshot()["discarded"] == 1
+    assert fake_gemini.stats["requests"] == 2
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
@@ -0,0 +1,37 @@
+"""
+Versión corta de la prueba de resistencia: ciclos grabar/transcribir/analizar/guardar
+con micrófono y Gemini simulados, y la memoria no debe crecer por ciclo
+"""
+
+import gc
+import tracemalloc
+
+import numpy as np
+
+import core.audio
+import soak_test
+from bench_pipeline import synthetic_recording
+
+
+def test_memoria_estable_por_ciclo(fake_gemini, monkeypatch, tmp_path):
+    monkeypatch.setattr(core.audio, "sd", soak_test.FakeSoundDevice, raising=False)
+    monkeypatch.setattr(core.audio, "AUDIO_AVAILABLE", True)
+    audio = np.frombuffer(synthetic_recording(5.0, seed=3), dtype=np.int16).astype(np.float32) / 32768.0
+
+    session = soak_test.CoreSession(tmp_path, archive=True)
+    cycles, traced = [], []
+    tracemalloc.start()
+    try:
+        for cycle in range(1, 25):
+            session.cycle(audio)
+            if cycle >= 5 and cycle % 2 == 0:
+                gc.collect()
+                cycles.append(cycle)
+                traced.append(tracemalloc.get_traced_memory()[0] / 1024)
+        assert len(session.store.ids()) == 24
+    finally:
+        tracemalloc.stop()
+        session.close()
+
+    assert not soak_test.FakeInputStream.instances
+    assert soak_test.slope(cycles, traced) <= 32.0
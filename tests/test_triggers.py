@@ -0,0 +1,87 @@
+"""
+Pruebas de los disparadores: autómata Aho-Corasick por trozos y tiempos de espera
+"""
+
+import json
+
+from core.triggers import DEFAULT_CUES, KeywordMatcher, TriggerEngine, load_cues, normalize
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _phrases(hits):
+    return [phrase for phrase, _ in hits]
+
+
+def test_normalizar_quita_tildes_signos_y_mayusculas():
+    assert normalize("¿Cuánto  CUESTA, señor?") == "cuanto cuesta senor"
+
+
+def test_encuentra_frases_solapadas_y_solo_palabras_completas():
+    matcher = KeywordMatcher({"precio": 1, "precio final": 2, "caro": 3})
+    assert sorted(_phrases(matcher.feed("el precio final es caro "))) == ["caro", "precio", "precio final"]
+    # "caro" dentro de "carozo" o "precios" no cuenta
+    assert matcher.feed("un carozo y los precios ") == []
+
+
+def test_frase_partida_entre_trozos():
+    matcher = KeywordMatcher({"lo tengo que pensar": "objecion"})
+    found = []
+    for chunk in ("bueno lo ten", "go que pen", "sar la verdad "):
+        found += matcher.feed(chunk)
+    assert _phrases(found) == ["lo tengo que pensar"]
+
+    # Después de encontrarla se siguen detectando repeticiones
+    assert _phrases(matcher.feed("lo tengo que pensar ")) == ["lo tengo que pensar"]
+
+    # `reset` descarta el trozo a medias
+    matcher.feed("lo tengo que")
+    matcher.reset()
+    assert matcher.feed("pensar ") == []
+
+
+def test_motor_detecta_frase_entre_dos_tramos():
+    engine = TriggerEngine("negocios", clock=FakeClock())
+    assert engine.feed("Entonces, ¿y cuánto") is None
+    assert engine.feed("cuesta la licencia?") == {"phrase": "cuanto cuesta", "category": "precio", "priority": 1}
+
+
+def test_motor_respeta_el_tiempo_de_espera():
+    clock = FakeClock()
+    engine = TriggerEngine("negocios", cooldown_seconds=30.0, clock=clock)
+    assert engine.feed("¿Cuál es el precio?")["category"] == "precio"
+
+    clock.now = 10.0
+    assert engine.feed("Y con descuento?") is None
+    # Prioridad alta: espera la mitad
+    clock.now = 16.0
+    assert engine.feed("Es muy caro")["category"] == "objecion"
+    clock.now = 40.0
+    assert engine.feed("el precio de nuevo") is None
+    clock.now = 46.5
+    assert engine.feed("el precio de nuevo")["priority"] == 1
+    assert engine.stats == {"matches": 5, "fired": 3, "suppressed": 2}
+
+
+def test_modo_desconocido_usa_las_frases_custom():
+    engine = TriggerEngine("otro", clock=FakeClock())
+    assert engine.feed("¿Alguna pregunta?")["category"] == "turno"
+
+
+def test_cargar_frases_de_un_archivo(tmp_path):
+    path = tmp_path / "cues.json"
+    path.write_text(json.dumps({
+        "negocios": {"precio": ["licencia anual"]},
+        "soporte": {"urgente": {"prioridad": 2, "frases": ["no funciona"]}},
+    }), encoding="utf-8")
+    cues = load_cues(path)
+    assert cues["negocios"]["precio"] == (1, ["licencia anual"])
+    assert cues["negocios"]["objecion"] == DEFAULT_CUES["negocios"]["objecion"]
+    engine = TriggerEngine("soporte", cues=cues, clock=FakeClock())
+    assert engine.feed("el sistema no funciona")["priority"] == 2